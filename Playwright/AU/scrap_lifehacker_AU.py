@@ -7,56 +7,107 @@ Script Playwright pour scraper TOUS les codes Lifehacker (Australie)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from dual_flow import Steps, run_async, run_sync
 
+COOKIE_BUTTONS = "button:has-text('Accept'), button:has-text('Agree'), button:has-text('OK'), #onetrust-accept-btn-handler"
 
-def scrape_lifehacker_all(page, url):
+# ===================================================================
+# RÈGLES D'EXTRACTION (communes au déroulé navigateur et au mode HTTP)
+# ===================================================================
+
+# Boutons "Get Code": le code est dans le HTML (span), le titre dans un attribut du bouton
+BUTTON_SELECTOR = "div.btn-peel"
+CODE_SELECTOR = "span.btn-peel__secret"
+TITLE_ATTRIBUTE = "data-promotion-title"
+
+# Les codes expirés ont cette classe sur leur carte (div parent)
+EXPIRED_CARD_CLASS = "promotion-discount-card--expired"
+CARD_XPATH = "xpath=ancestor::div[contains(@class, 'promotion-discount-card')]"
+VALID_BUTTONS_XPATH = (f"xpath=//div[contains(@class, 'btn-peel')]"
+                       f"[not(ancestor::div[contains(@class, '{EXPIRED_CARD_CLASS}')])]")
+
+
+def is_expired_card(classes: str) -> bool:
+    """True si les classes d'une carte (ou d'un div parent) marquent une offre expirée."""
+    return EXPIRED_CARD_CLASS in (classes or "")
+
+
+def collect_codes(candidates: list, verbose: bool = True) -> list:
+    """
+    Codes retenus parmi les (code, titre) lus sur les boutons, dans l'ordre de la page.
+    Code ET titre obligatoires (pas de valeur par défaut), code d'au moins 3 caractères,
+    ni code ni titre en doublon.
     """
-    Scrape TOUS les codes d'une page Lifehacker AU avec Playwright.
+    results = []
+    processed_codes = set()
+    processed_titles = set()  # Éviter doublons de titres aussi
+    
+    for code, title in candidates:
+        code = code.strip() if code else None
+        if code and title and len(code) >= 3 and code not in processed_codes and title not in processed_titles:
+            processed_codes.add(code)
+            processed_titles.add(title)
+            results.append({
+                "success": True,
+                "code": code,
+                "title": title,
+                "message": "Code extrait avec succès"
+            })
+            if verbose:
+                print(f"[Lifehacker] ✅ Code: {code} -> {title[:50]}...")
+        elif not verbose:
+            continue
+        elif code and not title:
+            print(f"[Lifehacker] ⚠️ Titre non trouvé pour le code: {code}")
+        elif code:
+            print(f"[Lifehacker] ⚠️ Code doublon ignoré: {code}")
+        else:
+            print(f"[Lifehacker] ⚠️ Code invalide ou vide")
+    
+    return results
+
+
+def lifehacker_flow(steps, page, context, url):
+    """
+    Déroulé d'une page Lifehacker AU (générateur dual_flow, commun aux versions sync et async).
     
     Avantage: Les codes sont directement dans le HTML (span.btn-peel__secret)
     donc pas besoin de cliquer sur les boutons !
     
     On exclut les offres expirées (class promotion-discount-card--expired)
+    Pas de lien affilié (aucun clic), affiliate_link reste None.
     """
     results = []
+    affiliate_link = None
     
     try:
         print(f"[Lifehacker] Accès à l'URL: {url}")
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(3000)
+        yield steps.goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        # Codes dans le HTML: il suffit que les boutons soient dans le DOM
+        yield steps.wait_state(page, BUTTON_SELECTOR, "attached", timeout=3000, name="page_ready")
         
         # Fermer cookie banner si présent
-        try:
-            page.click("button:has-text('Accept'), button:has-text('Agree'), button:has-text('OK'), #onetrust-accept-btn-handler", timeout=3000)
-            page.wait_for_timeout(1000)
-        except:
-            pass
+        yield steps.consent(page, COOKIE_BUTTONS, timeout=3000, hidden_timeout=1000)
         
         # Trouver tous les boutons "Get Code" qui ne sont PAS dans une carte expirée
-        # Les codes expirés ont la classe "promotion-discount-card--expired" sur leur parent div
-        # On utilise XPath pour exclure ces cartes expirées
-        code_buttons = page.locator("xpath=//div[contains(@class, 'btn-peel')][not(ancestor::div[contains(@class, 'promotion-discount-card--expired')])]")
-        count = code_buttons.count()
+        code_buttons = page.locator(VALID_BUTTONS_XPATH)
+        count = yield code_buttons.count()
         
         if count == 0:
             # Fallback: essayer avec le sélecteur CSS standard si XPath ne trouve rien
-            code_buttons = page.locator("div.btn-peel")
-            count = code_buttons.count()
+            code_buttons = page.locator(BUTTON_SELECTOR)
+            count = yield code_buttons.count()
             # Filtrer manuellement les expirés
             valid_buttons = []
             for i in range(count):
                 btn = code_buttons.nth(i)
                 try:
-                    # Vérifier si le parent a la classe expired
-                    parent_classes = btn.locator("xpath=ancestor::div[contains(@class, 'promotion-discount-card')]").first.get_attribute("class") or ""
-                    if "expired" not in parent_classes:
+                    if not is_expired_card((yield btn.locator(CARD_XPATH).first.get_attribute("class"))):
                         valid_buttons.append(i)
                 except:
                     valid_buttons.append(i)  # En cas d'erreur, inclure
@@ -68,115 +119,77 @@ def scrape_lifehacker_all(page, url):
         
         if count == 0:
             print("[Lifehacker] Aucun code disponible sur cette page")
-            return results
+            return results, affiliate_link
         
-        processed_codes = set()
-        processed_titles = set()  # Éviter doublons de titres aussi
-        
-        # Extraire les codes directement depuis le HTML (pas besoin de cliquer!)
+        # Lire code et titre de chaque bouton directement dans le HTML (pas besoin de cliquer!)
+        candidates = []
         for idx in valid_buttons:
             try:
                 button = code_buttons.nth(idx)
-                
-                # Le code est dans span.btn-peel__secret
-                code_elem = button.locator("span.btn-peel__secret").first
+                code_elem = button.locator(CODE_SELECTOR).first
                 code = None
-                if code_elem.count() > 0:
-                    code = code_elem.inner_text().strip()
-                
-                # Le titre est dans l'attribut data-promotion-title du bouton
-                title = button.get_attribute("data-promotion-title")
-                # Ne pas mettre de valeur par défaut si titre non trouvé
-                
-                # N'ajouter que si code ET titre sont trouvés (pas de valeur par défaut)
-                if code and title and len(code) >= 3 and code not in processed_codes and title not in processed_titles:
-                    processed_codes.add(code)
-                    processed_titles.add(title)
-                    results.append({
-                        "success": True,
-                        "code": code,
-                        "title": title,
-                        "message": "Code extrait avec succès"
-                    })
-                    print(f"[Lifehacker] ✅ Code: {code} -> {title[:50]}...")
-                elif code and not title:
-                    print(f"[Lifehacker] ⚠️ Titre non trouvé pour le code: {code}")
-                elif code:
-                    print(f"[Lifehacker] ⚠️ Code doublon ignoré: {code}")
-                else:
-                    print(f"[Lifehacker] ⚠️ Code invalide ou vide")
-                    
+                if (yield code_elem.count()) > 0:
+                    code = yield code_elem.inner_text()
+                candidates.append((code, (yield button.get_attribute(TITLE_ATTRIBUTE))))
             except Exception as e:
                 print(f"[Lifehacker] ⚠️ Erreur extraction: {str(e)[:30]}")
         
+        results = collect_codes(candidates)
         print(f"[Lifehacker] Total: {len(results)} codes récupérés")
         
     except Exception as e:
-        print(f"[Lifehacker] ❌ Erreur générale: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link) from e
     
-    return results
+    return results, affiliate_link
 
 
-def main():
-    """Scrape Lifehacker AU depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("AU", "lifehacker")
-    print(f"📍 Lifehacker: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            try:
-                codes = scrape_lifehacker_all(page, url)
-                print(f"   ✅ {len(codes)} codes trouvés")
-                
-                for code_info in codes:
-                    all_results.append({
-                        "Date": datetime.now().strftime("%Y-%m-%d"),
-                        "Country": "AU",
-                        "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                        "Merchant_slug": merchant_slug,
-                        "GPN_URL": merchant_row.get("GPN_URL", ""),
-                        "Competitor_Source": "lifehacker",
-                        "Competitor_URL": url,
-                        "Affiliate_Link": "",
-                        "Code": code_info.get("code", ""),
-                        "Title": code_info.get("title", "")
-                    })
-            except Exception as e:
-                print(f"   ❌ Erreur: {str(e)[:50]}")
-            
-            print(f"   📝 Total: {len(all_results)} codes")
+def scrape_lifehacker_all(page, context, url):
+    """Scrape TOUS les codes d'une page Lifehacker AU avec Playwright (lifehacker_flow)."""
+    return run_sync(lifehacker_flow(Steps(), page, context, url))
+
+
+async def scrape_lifehacker_all_async(page, context, url):
+    """Version async de scrape_lifehacker_all (moteur async_engine), même déroulé."""
+    return await run_async(lifehacker_flow(Steps(is_async=True), page, context, url))
+
+
+def parse_lifehacker_html(tree, url):
+    """
+    Mode HTTP (http_fastpath): mêmes règles que scrape_lifehacker_all (sélecteurs,
+    exclusion des expirés, collect_codes), lues dans le HTML statique parsé par
+    selectolax (aucun navigateur).
+    """
+    candidates = []
+    for button in tree.css(BUTTON_SELECTOR):
+        # Exclure les cartes expirées (classe sur un div parent)
+        parent = button.parent
+        while parent is not None and not (parent.tag == "div" and is_expired_card(parent.attributes.get("class"))):
+            parent = parent.parent
+        if parent is not None:
+            continue
         
-        browser.close()
+        code_elem = button.css_first(CODE_SELECTOR)
+        candidates.append((code_elem.text() if code_elem else None, button.attributes.get(TITLE_ATTRIBUTE)))
     
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="Lifehacker AU")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ LIFEHACKER AU TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    results = collect_codes(candidates, verbose=False)
+    print(f"[Lifehacker] ⚡ HTTP: {len(results)} codes dans le HTML statique")
+    return results, None
+
+
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "Lifehacker AU",
+    "country": "AU",
+    "competitor": "lifehacker",
+    "competitor_source": "lifehacker",
+    # Codes présents dans le HTML statique: navigateur seulement si le parse ne trouve rien
+    "http_parse": parse_lifehacker_html
+}
+
+
+def main(**run_options):
+    """Scrape Lifehacker AU depuis Google Sheets"""
+    run_source(SOURCE, scrape_lifehacker_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -8,13 +8,28 @@ Script Playwright pour scraper TOUS les codes Sparwelt (DE)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from politeness import polite_click, polite_goto
+from affiliate_capture import AffiliateCapture
+from tab_manager import TabManager
+from consent_state import accept_consent
+from dom_extract import close_popup, popup_state
+from waits import wait_hidden, wait_visible
+
+COOKIE_BUTTONS = "button:has-text('Akzeptieren'), button:has-text('Accept'), #onetrust-accept-btn-handler"
+POPUP_CODE_SELECTOR = "div.p-4 div.border.font-bold span"
+
+# Popup: code sans espace de 30 caractères max, titre, croix de fermeture (svg)
+POPUP_SPEC = {
+    "code": [{"selector": POPUP_CODE_SELECTOR, "no_spaces": True, "max_len": 30}],
+    "title": [{"selector": "div.p-4 div.text-xl"}],
+    "close": ["svg.absolute.top-4.right-4, svg.fill-gray-400.absolute"],
+}
 
 
 def scrape_sparwelt_all(page, context, url):
@@ -24,17 +39,15 @@ def scrape_sparwelt_all(page, context, url):
     """
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "sparwelt")
+    tabs = TabManager(context, page)
     
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(3000)
+        polite_goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        wait_visible(page, "div[data-voucher-id]", timeout=5000, name="page_ready")
         
         # Fermer cookie banner si présent
-        try:
-            page.click("button:has-text('Akzeptieren'), button:has-text('Accept'), #onetrust-accept-btn-handler", timeout=3000)
-            page.wait_for_timeout(1000)
-        except:
-            pass
+        accept_consent(page, COOKIE_BUTTONS, timeout=3000, hidden_timeout=1500)
         
         # Sélecteur: boutons "Gutschein anzeigen" (pas "Zum Angebot" ni "Cashback")
         # EXCLURE les codes expirés qui ont la classe "filter grayscale"
@@ -44,35 +57,23 @@ def scrape_sparwelt_all(page, context, url):
         total_count = see_code_buttons.count()
         
         if total_count == 0:
-            return results
+            return results, affiliate_link
         
         processed_codes = set()
         
         # === ÉTAPE 1: Cliquer sur le premier bouton → ouvre nouvel onglet ===
         first_btn = see_code_buttons.first
         first_btn.scroll_into_view_if_needed()
-        page.wait_for_timeout(500)
-        
-        pages_before = len(context.pages)
-        page.evaluate("(el) => el.click()", first_btn.element_handle())
-        page.wait_for_timeout(2000)
         
         # Vérifier si nouvel onglet ouvert
-        if len(context.pages) > pages_before:
-            work_page = context.pages[-1]
-        else:
-            work_page = page
+        work_page = tabs.open(lambda: polite_click(page, first_btn, js=True), timeout=2000) or page
 
         # CAPTURE DU LIEN AFFILIÉ - La page ORIGINALE se redirige vers le marchand
         try:
-            for _ in range(10):
-                current_url = page.url
-                if "sparwelt" not in current_url.lower():
-                    affiliate_link = current_url
-                    print(f"[Sparwelt] 🔗 Affiliate captured: {affiliate_link[:60]}...")
-                    break
-                page.wait_for_timeout(500)
-            if not affiliate_link:
+            affiliate_link = affiliate.wait(timeout=5000)
+            if affiliate_link:
+                print(f"[Sparwelt] 🔗 Affiliate captured: {affiliate_link[:60]}...")
+            else:
                 print(f"[Sparwelt] ⚠️ No affiliate link captured (page stayed on sparwelt)")
         except Exception as e:
             print(f"[Sparwelt] ⚠️ Error capturing affiliate: {str(e)[:30]}")
@@ -81,28 +82,12 @@ def scrape_sparwelt_all(page, context, url):
         max_iterations = 50
         
         for iteration in range(max_iterations):
-            work_page.wait_for_timeout(2000)
+            wait_visible(work_page, POPUP_CODE_SELECTOR, timeout=4000, name="popup_code")
             
-            # 1. Récupérer le code dans la popup
-            code = None
-            try:
-                code_elem = work_page.locator("div.p-4 div.border.font-bold span").first
-                if code_elem.count() > 0:
-                    code = code_elem.inner_text().strip()
-                    # Filtrer codes invalides
-                    if not code or ' ' in code or len(code) > 30:
-                        code = None
-            except:
-                pass
-            
-            # 2. Récupérer le titre dans la popup
-            current_title = None
-            try:
-                title_elem = work_page.locator("div.p-4 div.text-xl").first
-                if title_elem.count() > 0:
-                    current_title = title_elem.inner_text().strip()
-            except:
-                pass
+            # 1-2. Récupérer le code et le titre dans la popup (un seul evaluate)
+            state = popup_state(work_page, POPUP_SPEC)
+            code = state["code"]
+            current_title = state["title"]
             
             if current_title is None:
                 current_title = f"Offre {iteration + 1}"
@@ -116,21 +101,11 @@ def scrape_sparwelt_all(page, context, url):
                 })
             
             # 3. Fermer la popup avec le X
-            try:
-                close_btn = work_page.locator("svg.absolute.top-4.right-4, svg.fill-gray-400.absolute").first
-                if close_btn.count() > 0:
-                    close_btn.click(timeout=3000)
-                    work_page.wait_for_timeout(1500)
-            except:
-                try:
-                    work_page.keyboard.press("Escape")
-                    work_page.wait_for_timeout(1000)
-                except:
-                    pass
+            close_popup(work_page, state, escape=True)
+            wait_hidden(work_page, POPUP_CODE_SELECTOR, timeout=1500, name="popup_close")
             
             # Scroll vers le haut
             work_page.evaluate("window.scrollTo(0, 0)")
-            work_page.wait_for_timeout(1000)
             
             # 4. Chercher le prochain bouton sur work_page
             next_buttons = work_page.locator(code_selector)
@@ -146,101 +121,44 @@ def scrape_sparwelt_all(page, context, url):
             
             try:
                 next_btn.scroll_into_view_if_needed(timeout=5000)
-                work_page.wait_for_timeout(500)
             except:
                 work_page.evaluate("window.scrollBy(0, 300)")
-                work_page.wait_for_timeout(500)
-            
-            pages_before = len(context.pages)
-            
-            try:
-                work_page.evaluate("(el) => el.click()", next_btn.element_handle())
-            except:
-                next_btn.click(force=True, timeout=5000)
             
-            work_page.wait_for_timeout(2000)
+            def click_next():
+                try:
+                    polite_click(work_page, next_btn, js=True)
+                except:
+                    next_btn.click(force=True, timeout=5000)
             
-            # Switch vers le nouvel onglet
-            if len(context.pages) > pages_before:
-                work_page = context.pages[-1]
+            # Switch vers le nouvel onglet (l'ancien onglet est fermé)
+            work_page = tabs.open(click_next, timeout=2000, replace=work_page) or work_page
         
     except PlaywrightTimeout:
         pass
     except Exception as e:
-        print(f"[Sparwelt] Erreur: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
+        tabs.close()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
+
 
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "Sparwelt DE",
+    "country": "DE",
+    "competitor": "sparwelt",
+    "competitor_source": "sparwelt",
+    "context_options": {
+        "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    }
+}
 
-def main():
+
+def main(**run_options):
     """Scrape Sparwelt DE depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("DE", "sparwelt")
-    print(f"📍 Sparwelt: {len(competitor_data)} URLs uniques")
-    
-    if len(competitor_data) == 0:
-        print("❌ Aucune URL Sparwelt trouvée")
-        return
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            try:
-                codes, affiliate_link = scrape_sparwelt_all(page, context, url)
-                
-                for code_info in codes:
-                    all_results.append({
-                        "Date": datetime.now().strftime("%Y-%m-%d"),
-                        "Country": "DE",
-                        "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                        "Merchant_slug": merchant_slug,
-                        "GPN_URL": merchant_row.get("GPN_URL", ""),
-                        "Competitor_Source": "sparwelt",
-                        "Competitor_URL": url,
-                        "Affiliate_Link": affiliate_link or "",
-                        "Code": code_info["code"],
-                        "Title": code_info["title"]
-                    })
-                
-                print(f"   → {len(codes)} codes trouvés")
-                
-            except Exception as e:
-                print(f"   ❌ Erreur: {str(e)[:50]}")
-            
-            # Fermer les onglets popup éventuels (garder la page principale)
-            while len(context.pages) > 1:
-                context.pages[-1].close()
-        
-        browser.close()
-    
-    # Sauvegarder les résultats
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="Sparwelt DE")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ SPARWELT DE TERMINÉ!")
-        print(f"{'='*60}")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-    else:
-        print("\n❌ Aucun code trouvé")
+    run_source(SOURCE, scrape_sparwelt_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -7,13 +7,30 @@ Script Playwright pour scraper TOUS les codes iGraal (FR)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from politeness import polite_click, polite_goto
+from affiliate_capture import AffiliateCapture
+from consent_state import accept_consent
+from waits import wait_scroll_growth, wait_until, wait_visible
+from dom_extract import extract_cards
+from site_descriptors import load_site
+
+# Cartes de codes (sélecteurs, marqueurs d'expiration): sites/igraal_fr.json
+SITE = load_site("igraal_fr")
+
+COOKIE_BUTTONS = "button:has-text('Accepter'), button:has-text('Accept'), #onetrust-accept-btn-handler"
+
+# Condition JS: le premier code valide est révélé (le bouton n'affiche plus "Afficher le code")
+CODES_REVEALED_JS = """
+    () => {
+        var btn = document.querySelector('div.horizontalbasecard.stt-vld button._1aujn430');
+        return !!btn && btn.textContent.trim() !== 'Afficher le code';
+    }
+"""
 
 
 def scrape_igraal_all(page, context, url):
@@ -24,49 +41,40 @@ def scrape_igraal_all(page, context, url):
     """
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "igraal")
     
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(3000)
+        polite_goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        wait_visible(page, "div.horizontalbasecard", timeout=5000, name="page_ready")
         
         # Fermer cookie banner si présent
-        try:
-            page.click("button:has-text('Accepter'), button:has-text('Accept'), #onetrust-accept-btn-handler", timeout=2000)
-            page.wait_for_timeout(500)
-        except:
-            pass
+        accept_consent(page, COOKIE_BUTTONS, timeout=2000, hidden_timeout=1000)
         
         # Trouver tous les boutons "Afficher le code"
         code_buttons = page.locator("button:has-text('Afficher le code')")
         count = code_buttons.count()
         
         if count == 0:
-            return results
+            return results, affiliate_link
         
         # Cliquer sur le premier bouton pour révéler les codes
         first_btn = code_buttons.first
         first_btn.scroll_into_view_if_needed()
-        page.wait_for_timeout(500)
         
         # Gérer le nouvel onglet potentiel
         with context.expect_page() as new_page_info:
-            first_btn.click()
+            polite_click(page, first_btn)
         
         try:
             new_page = new_page_info.value
             new_page.wait_for_load_state("domcontentloaded")
-            page.wait_for_timeout(2000)
 
             # CAPTURE DU LIEN AFFILIÉ - La page ORIGINALE se redirige vers le marchand
             try:
-                for _ in range(10):
-                    current_url = page.url
-                    if "igraal" not in current_url.lower():
-                        affiliate_link = current_url
-                        print(f"[iGraal] 🔗 Affiliate captured: {affiliate_link[:60]}...")
-                        break
-                    page.wait_for_timeout(500)
-                if not affiliate_link:
+                affiliate_link = affiliate.wait(timeout=7000)
+                if affiliate_link:
+                    print(f"[iGraal] 🔗 Affiliate captured: {affiliate_link[:60]}...")
+                else:
                     print(f"[iGraal] ⚠️ No affiliate link captured (page stayed on igraal)")
             except Exception as e:
                 print(f"[iGraal] ⚠️ Error capturing affiliate: {str(e)[:30]}")
@@ -80,12 +88,11 @@ def scrape_igraal_all(page, context, url):
         except:
             work_page = page
         
-        page.wait_for_timeout(2000)
+        wait_until(work_page, CODES_REVEALED_JS, timeout=4000, name="codes_revealed")
         
         # Fermer la popup si présente
         try:
             work_page.keyboard.press("Escape")
-            work_page.wait_for_timeout(1500)
         except:
             pass
         
@@ -93,49 +100,14 @@ def scrape_igraal_all(page, context, url):
         last_height = work_page.evaluate("document.body.scrollHeight")
         while True:
             work_page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            work_page.wait_for_timeout(1000)
-            new_height = work_page.evaluate("document.body.scrollHeight")
-            if new_height == last_height:
+            if not wait_scroll_growth(work_page, last_height, timeout=1000):
                 break
-            last_height = new_height
+            last_height = work_page.evaluate("document.body.scrollHeight")
         
         work_page.evaluate("window.scrollTo(0, 0)")
-        work_page.wait_for_timeout(1000)
         
-        # Récupérer tous les codes via JavaScript (même logique que RetailMeNot)
-        # IMPORTANT: Exclure les codes expirés (stt-vld = valide, stt-exp = expiré)
-        codes_data = work_page.evaluate("""
-            () => {
-                var results = [];
-                // Sélectionner les cartes de codes VALIDES uniquement
-                // EXCLURE les expirés (stt-exp)
-                var cards = document.querySelectorAll('div.horizontalbasecard.stt-vld:not(.stt-exp)');
-                
-                cards.forEach(function(card) {
-                    // Le code est dans le bouton (après révélation)
-                    var codeBtn = card.querySelector('button._1aujn430');
-                    var code = null;
-                    
-                    if (codeBtn) {
-                        var btnText = codeBtn.textContent.trim();
-                        // Si le texte n'est pas "Afficher le code", c'est le code
-                        if (btnText && btnText !== 'Afficher le code' && btnText !== 'Copier' && btnText.length >= 3) {
-                            code = btnText;
-                        }
-                    }
-                    
-                    // Le titre est dans h3._1t96igp3
-                    var titleH3 = card.querySelector('h3._1t96igp3, h3#offerbasecard-title');
-                    var title = titleH3 ? titleH3.textContent.trim() : null;
-                    
-                    if (code && title) {
-                        results.push({code: code, title: title});
-                    }
-                });
-                
-                return results;
-            }
-        """)
+        # Récupérer tous les codes en un seul evaluate (cartes valides: stt-vld, sans stt-exp)
+        codes_data = extract_cards(work_page, SITE["cards"])
         
         # Filtrer les doublons (uniquement sur le code)
         processed_codes = set()
@@ -179,109 +151,28 @@ def scrape_igraal_all(page, context, url):
                 pass
         
     except Exception as e:
-        print(f"      ❌ Erreur: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
 
 
-def main():
-    """Scrape iGraal FR depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("FR", "igraal")
-    print(f"📍 iGraal: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "iGraal FR",
+    "country": "FR",
+    "competitor": "igraal",
+    "competitor_source": "igraal",
     # Configuration pour éviter les "Page crashed"
-    PAGE_REFRESH_INTERVAL = 25
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            # Recréer la page périodiquement
-            if idx > 1 and (idx - 1) % PAGE_REFRESH_INTERVAL == 0:
-                print(f"\n🔄 Refresh de la page (prévention memory leak)...")
-                try:
-                    page.close()
-                except:
-                    pass
-                for p_tab in context.pages:
-                    try:
-                        p_tab.close()
-                    except:
-                        pass
-                page = context.new_page()
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            max_retries = 2
-            for attempt in range(max_retries):
-                try:
-                    codes, affiliate_link = scrape_igraal_all(page, context, url)
-                    print(f"   ✅ {len(codes)} codes trouvés")
-                    
-                    for code_info in codes:
-                        all_results.append({
-                            "Date": datetime.now().strftime("%Y-%m-%d"),
-                            "Country": "FR",
-                            "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                            "Merchant_slug": merchant_slug,
-                            "GPN_URL": merchant_row.get("GPN_URL", ""),
-                            "Competitor_Source": "igraal",
-                            "Competitor_URL": url,
-                            "Affiliate_Link": affiliate_link or "",
-                            "Code": code_info["code"],
-                            "Title": code_info["title"]
-                        })
-                    break
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    if "Page crashed" in error_msg or "Target closed" in error_msg:
-                        print(f"   ⚠️ Page crashed (attempt {attempt + 1}/{max_retries}), recréation...")
-                        try:
-                            page.close()
-                        except:
-                            pass
-                        for p_tab in context.pages:
-                            try:
-                                p_tab.close()
-                            except:
-                                pass
-                        page = context.new_page()
-                        if attempt == max_retries - 1:
-                            print(f"   ❌ Échec après {max_retries} tentatives")
-                    else:
-                        print(f"   ❌ Erreur: {error_msg[:50]}")
-                        break
-            
-            print(f"   📝 Total: {len(all_results)} codes")
-        
-        browser.close()
-    
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="iGraal FR")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ IGRAAL FR TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    "page_refresh_interval": 25,
+    "max_retries": 2
+}
+
+
+def main(**run_options):
+    """Scrape iGraal FR depuis Google Sheets"""
+    run_source(SOURCE, scrape_igraal_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -7,13 +7,28 @@ Script Playwright pour scraper TOUS les codes Ma-Reduc (FR)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from politeness import polite_click, polite_goto
+from affiliate_capture import AffiliateCapture
+from consent_state import accept_consent
+from waits import wait_hidden, wait_scroll_growth, wait_until, wait_visible
+from dom_extract import extract_cards
+from site_descriptors import load_site
+
+# Cartes de codes (sélecteurs, exclusions): sites/mareduc_fr.json
+SITE = load_site("mareduc_fr")
+
+COOKIE_BUTTONS = "button:has-text('Accepter'), button:has-text('Accept'), #onetrust-accept-btn-handler"
+CLOSE_POPUP_SELECTOR = "i.fa-xmark, button:has(i.fa-xmark), .o-dialog__close"
+
+# Condition JS: au moins un code révélé dans la page
+CODES_REVEALED_JS = """
+    () => Array.from(document.querySelectorAll('input.a-revealedCode__inputCode')).some(input => input.value)
+"""
 
 
 def scrape_mareduc_all(page, context, url):
@@ -24,17 +39,14 @@ def scrape_mareduc_all(page, context, url):
     """
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "ma-reduc")
     
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(3000)
+        polite_goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        wait_visible(page, "div.m-offer", timeout=5000, name="page_ready")
         
         # Fermer cookie banner si présent
-        try:
-            page.click("button:has-text('Accepter'), button:has-text('Accept'), #onetrust-accept-btn-handler", timeout=2000)
-            page.wait_for_timeout(500)
-        except:
-            pass
+        accept_consent(page, COOKIE_BUTTONS, timeout=2000, hidden_timeout=1000)
         
         # Trouver les boutons "Voir le code" UNIQUEMENT pour le marchand de la page
         # EXCLURE les offres d'autres marchands (competitor_outclick dans data-layer-push-on-click)
@@ -44,32 +56,26 @@ def scrape_mareduc_all(page, context, url):
         
         if count == 0:
             # Pas de codes pour ce marchand, retourner vide
-            return results
+            return results, affiliate_link
         
         # Cliquer sur le premier bouton pour révéler les codes
         first_btn = code_buttons.first
         first_btn.scroll_into_view_if_needed()
-        page.wait_for_timeout(500)
         
         # Gérer le nouvel onglet potentiel
         with context.expect_page() as new_page_info:
-            first_btn.click()
+            polite_click(page, first_btn)
         
         try:
             new_page = new_page_info.value
             new_page.wait_for_load_state("domcontentloaded")
-            page.wait_for_timeout(2000)
 
             # CAPTURE DU LIEN AFFILIÉ - La page ORIGINALE se redirige vers le marchand
             try:
-                for _ in range(10):
-                    current_url = page.url
-                    if "ma-reduc" not in current_url.lower():
-                        affiliate_link = current_url
-                        print(f"[Ma-Reduc] 🔗 Affiliate captured: {affiliate_link[:60]}...")
-                        break
-                    page.wait_for_timeout(500)
-                if not affiliate_link:
+                affiliate_link = affiliate.wait(timeout=7000)
+                if affiliate_link:
+                    print(f"[Ma-Reduc] 🔗 Affiliate captured: {affiliate_link[:60]}...")
+                else:
                     print(f"[Ma-Reduc] ⚠️ No affiliate link captured (page stayed on ma-reduc)")
             except Exception as e:
                 print(f"[Ma-Reduc] ⚠️ Error capturing affiliate: {str(e)[:30]}")
@@ -83,17 +89,16 @@ def scrape_mareduc_all(page, context, url):
         except:
             work_page = page
         
-        page.wait_for_timeout(2000)
+        wait_until(work_page, CODES_REVEALED_JS, timeout=4000, name="codes_revealed")
         
         # Fermer la popup si présente
         try:
-            close_btn = work_page.locator("i.fa-xmark, button:has(i.fa-xmark), .o-dialog__close").first
+            close_btn = work_page.locator(CLOSE_POPUP_SELECTOR).first
             if close_btn.count() > 0:
                 close_btn.click()
-                work_page.wait_for_timeout(1500)
+                wait_hidden(work_page, CLOSE_POPUP_SELECTOR, timeout=1500, name="popup_close")
             else:
                 work_page.keyboard.press("Escape")
-                work_page.wait_for_timeout(1500)
         except:
             pass
         
@@ -101,61 +106,16 @@ def scrape_mareduc_all(page, context, url):
         last_height = work_page.evaluate("document.body.scrollHeight")
         while True:
             work_page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            work_page.wait_for_timeout(1000)
-            new_height = work_page.evaluate("document.body.scrollHeight")
-            if new_height == last_height:
+            if not wait_scroll_growth(work_page, last_height, timeout=1000):
                 break
-            last_height = new_height
+            last_height = work_page.evaluate("document.body.scrollHeight")
         
         work_page.evaluate("window.scrollTo(0, 0)")
-        work_page.wait_for_timeout(1000)
         
-        # Récupérer tous les codes via JavaScript (même logique que RetailMeNot)
-        # IMPORTANT: Exclure les codes expirés (classe -disabled)
-        # IMPORTANT: Exclure les offres d'autres marchands (section similar-offers)
-        codes_data = work_page.evaluate("""
-            () => {
-                var results = [];
-                // Sélectionner uniquement les offres NON expirées (sans classe -disabled)
-                var offers = document.querySelectorAll('div.m-offer[data-offer-type="code"]:not(.-disabled)');
-                
-                offers.forEach(function(offer) {
-                    // EXCLURE les offres d'autres marchands (section similar-offers)
-                    // Ces offres ont un lien .m-offer__footer vers une autre page marchand
-                    var footerLink = offer.querySelector('a.m-offer__footer');
-                    if (footerLink) {
-                        // Si le footer contient "Plus d'offres" c'est une offre d'un autre marchand
-                        return;
-                    }
-                    
-                    // EXCLURE aussi les offres dans les conteneurs "similar-offers" ou "competitors"
-                    var parent = offer.closest('[class*="similar"], [class*="competitor"], [data-redirections*="similar"]');
-                    if (parent) {
-                        return;
-                    }
-                    
-                    // Vérifier aussi via data-layer-push-on-click s'il s'agit d'un "competitor"
-                    var dataLayer = offer.getAttribute('data-layer-push-on-click');
-                    if (dataLayer && dataLayer.includes('competitor')) {
-                        return;
-                    }
-                    
-                    // Le code est dans input.a-revealedCode__inputCode
-                    var codeInput = offer.querySelector('input.a-revealedCode__inputCode');
-                    var code = codeInput ? codeInput.value : null;
-                    
-                    // Le titre est dans h2.m-offer__title
-                    var titleH2 = offer.querySelector('h2.m-offer__title');
-                    var title = titleH2 ? titleH2.textContent.trim() : null;
-                    
-                    if (code && title && code.length >= 3) {
-                        results.push({code: code, title: title});
-                    }
-                });
-                
-                return results;
-            }
-        """)
+        # Récupérer tous les codes en un seul evaluate
+        # IMPORTANT: Exclure les codes expirés (classe -disabled) et les offres d'autres marchands
+        # (footer "Plus d'offres", section similar-offers, data-layer "competitor")
+        codes_data = extract_cards(work_page, SITE["cards"])
         
         # Filtrer les doublons (uniquement sur le code)
         processed_codes = set()
@@ -184,71 +144,25 @@ def scrape_mareduc_all(page, context, url):
                 pass
         
     except Exception as e:
-        print(f"      ❌ Erreur: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
+
+
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "Ma-Reduc FR",
+    "country": "FR",
+    "competitor": "ma-reduc",
+    "competitor_source": "mareduc"
+}
 
 
-def main():
+def main(**run_options):
     """Scrape Ma-Reduc FR depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("FR", "ma-reduc")
-    print(f"📍 Ma-Reduc: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            try:
-                codes, affiliate_link = scrape_mareduc_all(page, context, url)
-                print(f"   ✅ {len(codes)} codes trouvés")
-                
-                for code_info in codes:
-                    all_results.append({
-                        "Date": datetime.now().strftime("%Y-%m-%d"),
-                        "Country": "FR",
-                        "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                        "Merchant_slug": merchant_slug,
-                        "GPN_URL": merchant_row.get("GPN_URL", ""),
-                        "Competitor_Source": "mareduc",
-                        "Competitor_URL": url,
-                        "Affiliate_Link": affiliate_link or "",
-                        "Code": code_info["code"],
-                        "Title": code_info["title"]
-                    })
-            except Exception as e:
-                print(f"   ❌ Erreur: {str(e)[:50]}")
-            
-            print(f"   📝 Total: {len(all_results)} codes")
-        
-        browser.close()
-    
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="Ma-Reduc FR")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ MA-REDUC FR TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    run_source(SOURCE, scrape_mareduc_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -6,13 +6,28 @@ Script Playwright pour scraper TOUS les codes codice-sconto.net (Italie)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from politeness import polite_click, polite_goto
+from affiliate_capture import AffiliateCapture
+from tab_manager import TabManager
+from consent_state import accept_consent
+from dom_extract import close_popup, popup_state
+from waits import wait_hidden, wait_visible
+
+COOKIE_BUTTONS = "button:has-text('Accetta'), button:has-text('Accept'), button:has-text('OK')"
+POPUP_CODE_SELECTOR = "div.undefined.codicescontonet, span.undefined.codicescontonet"
+
+# Popup: code (div sans espace, sinon span) de 3 à 25 caractères, titre, fermeture (cd_close ou image)
+POPUP_SPEC = {
+    "code": [{"selector": "div.undefined.codicescontonet", "min_len": 3, "max_len": 25, "no_spaces": True},
+             {"selector": "span.undefined.codicescontonet", "min_len": 3, "max_len": 25}],
+    "title": [{"selector": "p.codice-scontonet_X1fs7j"}],
+    "close": ["div.cd_close", "xpath=//img[@alt='close icon']/ancestor::div[1]"],
+}
 
 
 def scrape_codicescontonet_all(page, context, url):
@@ -28,18 +43,16 @@ def scrape_codicescontonet_all(page, context, url):
     """
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "codice-sconto")
+    tabs = TabManager(context, page)
     
     try:
         print(f"[CodiceSconto] Accès à l'URL: {url}")
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(3000)
+        polite_goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        wait_visible(page, "a._code_btn", timeout=5000, name="page_ready")
         
         # Accepter cookies
-        try:
-            page.click("button:has-text('Accetta'), button:has-text('Accept'), button:has-text('OK')", timeout=3000)
-            page.wait_for_timeout(1000)
-        except:
-            pass
+        accept_consent(page, COOKIE_BUTTONS, timeout=3000, hidden_timeout=1500)
         
         # Trouver les boutons "Vedi il codice" (liens avec classe _code_btn)
         see_code_buttons = page.locator("a._code_btn")
@@ -51,7 +64,7 @@ def scrape_codicescontonet_all(page, context, url):
         
         if total_count == 0:
             print("[CodiceSconto] Aucun code disponible sur cette page")
-            return results
+            return results, affiliate_link
         
         print(f"[CodiceSconto] {total_count} boutons 'Vedi il codice' trouvés au total")
         
@@ -91,7 +104,7 @@ def scrape_codicescontonet_all(page, context, url):
         
         if total_count == 0:
             print("[CodiceSconto] Aucun code valide (non expiré) disponible sur cette page")
-            return results
+            return results, affiliate_link
         
         print(f"[CodiceSconto] {total_count} codes valides (non expirés) à scraper")
         
@@ -101,7 +114,6 @@ def scrape_codicescontonet_all(page, context, url):
         # === ÉTAPE 1: Cliquer sur le premier bouton pour ouvrir le nouvel onglet ===
         first_btn = see_code_buttons.first
         first_btn.scroll_into_view_if_needed()
-        page.wait_for_timeout(500)
         
         # Récupérer le titre du premier code
         first_title = None
@@ -116,31 +128,19 @@ def scrape_codicescontonet_all(page, context, url):
         else:
             print(f"[CodiceSconto] Clic sur le premier code (titre non trouvé)")
         
-        # Cliquer avec JavaScript (comme FastAPI)
-        pages_before = len(context.pages)
-        page.evaluate("(el) => el.click()", first_btn.element_handle())
-        page.wait_for_timeout(2000)
-        
-        # Vérifier si un nouvel onglet s'est ouvert
-        if len(context.pages) <= pages_before:
+        # Cliquer avec JavaScript (comme FastAPI), puis switcher vers le nouvel onglet
+        new_page = tabs.open(lambda: polite_click(page, first_btn, js=True), timeout=3000)
+        if new_page is None:
             print("[CodiceSconto] Aucun nouvel onglet ouvert")
-            return results
-        
-        # Switcher vers le nouvel onglet
-        new_page = context.pages[-1]
+            return results, affiliate_link
         print("[CodiceSconto] Switché vers le nouvel onglet")
-        new_page.wait_for_timeout(2000)
         
         # CAPTURE DU LIEN AFFILIÉ - La page ORIGINALE se redirige vers le marchand
         try:
-            for _ in range(10):
-                current_url = page.url
-                if "codice-sconto" not in current_url.lower():
-                    affiliate_link = current_url
-                    print(f"[CodiceSconto] 🔗 Affiliate captured: {affiliate_link[:60]}...")
-                    break
-                page.wait_for_timeout(500)
-            if not affiliate_link:
+            affiliate_link = affiliate.wait(timeout=5000)
+            if affiliate_link:
+                print(f"[CodiceSconto] 🔗 Affiliate captured: {affiliate_link[:60]}...")
+            else:
                 print(f"[CodiceSconto] ⚠️ No affiliate link captured (page stayed on codice-sconto)")
         except Exception as e:
             print(f"[CodiceSconto] ⚠️ Error capturing affiliate: {str(e)[:30]}")
@@ -152,42 +152,16 @@ def scrape_codicescontonet_all(page, context, url):
         for iteration in range(max_iterations):
             print(f"[CodiceSconto] --- Itération {iteration + 1} ---")
             
-            new_page.wait_for_timeout(2000)
-            
-            # 1. Récupérer le code affiché dans la popup
-            code = None
-            try:
-                code_elems = new_page.locator("div.undefined.codicescontonet")
-                for i in range(code_elems.count()):
-                    text = code_elems.nth(i).inner_text().strip()
-                    if text and 3 <= len(text) <= 25 and ' ' not in text:
-                        code = text
-                        print(f"[CodiceSconto] Code trouvé: {code}")
-                        break
-            except:
-                pass
-            
-            if not code:
-                try:
-                    code_elems = new_page.locator("span.undefined.codicescontonet")
-                    for i in range(code_elems.count()):
-                        text = code_elems.nth(i).inner_text().strip()
-                        if text and 3 <= len(text) <= 25:
-                            code = text
-                            print(f"[CodiceSconto] Code trouvé via span: {code}")
-                            break
-                except:
-                    pass
+            wait_visible(new_page, POPUP_CODE_SELECTOR, timeout=4000, name="popup_code")
             
-            # 2. Récupérer le titre de l'offre depuis la popup
-            current_title = None
-            try:
-                title_elem = new_page.locator("p.codice-scontonet_X1fs7j").first
-                if title_elem.count() > 0:
-                    current_title = title_elem.inner_text().strip()
-                    print(f"[CodiceSconto] Titre trouvé: {current_title[:50]}...")
-            except:
-                pass
+            # 1-2. Récupérer le code et le titre de l'offre dans la popup (un seul evaluate)
+            state = popup_state(new_page, POPUP_SPEC)
+            code = state["code"]
+            current_title = state["title"]
+            if code:
+                print(f"[CodiceSconto] Code trouvé: {code}")
+            if current_title:
+                print(f"[CodiceSconto] Titre trouvé: {current_title[:50]}...")
             
             # N'ajouter que si code ET titre sont trouvés (pas de valeur par défaut)
             if code and current_title and code not in processed_codes and current_title not in processed_titles:
@@ -203,25 +177,12 @@ def scrape_codicescontonet_all(page, context, url):
             else:
                 print(f"[CodiceSconto] ⚠️ Code ou titre non trouvé, ou doublon")
             
-            # 3. Fermer la popup en cliquant sur cd_close
-            try:
-                close_icon = new_page.locator("div.cd_close").first
-                if close_icon.count() > 0:
-                    close_icon.click(timeout=3000)
-                    print("[CodiceSconto] Popup fermée via cd_close")
-                    new_page.wait_for_timeout(1000)
-            except:
-                try:
-                    close_btn = new_page.locator("xpath=//img[@alt='close icon']/ancestor::div[1]").first
-                    if close_btn.count() > 0:
-                        close_btn.click(timeout=3000)
-                        print("[CodiceSconto] Popup fermée via close icon")
-                        new_page.wait_for_timeout(1000)
-                except:
-                    pass
+            # 3. Fermer la popup (cd_close, sinon l'image "close icon")
+            if close_popup(new_page, state):
+                print(f"[CodiceSconto] Popup fermée via {state['close'][:30]}")
+            wait_hidden(new_page, "div.cd_close", timeout=1000, name="popup_close")
             
             # 4. Chercher le prochain bouton "Vedi il codice" SUR CE NOUVEL ONGLET
-            new_page.wait_for_timeout(500)
             
             next_buttons = new_page.locator("a._code_btn")
             next_count = next_buttons.count()
@@ -245,19 +206,12 @@ def scrape_codicescontonet_all(page, context, url):
             next_btn = next_buttons.nth(clicked_count)
             try:
                 next_btn.scroll_into_view_if_needed()
-                new_page.wait_for_timeout(300)
                 
-                # Cliquer avec JavaScript pour ouvrir un nouvel onglet
-                pages_before = len(context.pages)
-                new_page.evaluate("(el) => el.click()", next_btn.element_handle())
-                new_page.wait_for_timeout(2000)
-                
-                # Si un nouvel onglet s'est ouvert, switcher
-                if len(context.pages) > pages_before:
-                    old_page = new_page
-                    new_page = context.pages[-1]
+                # Cliquer avec JavaScript pour ouvrir un nouvel onglet (l'ancien onglet est fermé)
+                next_page = tabs.open(lambda: polite_click(new_page, next_btn, js=True), timeout=2000, replace=new_page)
+                if next_page is not None:
+                    new_page = next_page
                     print(f"[CodiceSconto] Switché vers nouvel onglet pour code {clicked_count + 1}")
-                    new_page.wait_for_timeout(1000)
                 else:
                     print("[CodiceSconto] Pas de nouvel onglet détecté")
                 
@@ -265,106 +219,34 @@ def scrape_codicescontonet_all(page, context, url):
                 print(f"[CodiceSconto] Erreur clic suivant: {str(e)[:30]}")
                 break
         
-        # Fermer les onglets ouverts
-        for p in context.pages[1:]:
-            try:
-                p.close()
-            except:
-                pass
-        
         print(f"[CodiceSconto] Total: {len(results)} codes récupérés")
         
     except Exception as e:
-        print(f"[CodiceSconto] ❌ Erreur générale: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
+        tabs.close()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
+
 
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "Codicescontonet IT",
+    "country": "IT",
+    "competitor": "codice-sconto",
+    "competitor_source": "codice-sconto.net",
+    # Nouvelle page pour CHAQUE merchant (prévention crash mémoire max)
+    "page_per_merchant": True,
+    "max_retries": 2,
+    # Le bouton de fermeture de la popup est une image (xpath sur img[@alt])
+    "network_policy": {"allow_types": ["image"]}
+}
 
-def main():
+
+def main(**run_options):
     """Scrape Codice-Sconto.net IT depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("IT", "codice-sconto")
-    print(f"📍 Codicescontonet: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            # Créer une nouvelle page pour CHAQUE merchant (prévention crash mémoire max)
-            page = context.new_page()
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            # Tentative avec retry en cas de crash
-            max_retries = 2
-            for attempt in range(max_retries):
-                try:
-                    codes, affiliate_link = scrape_codicescontonet_all(page, context, url)
-                    print(f"   ✅ {len(codes)} codes trouvés")
-                    
-                    for code_info in codes:
-                        all_results.append({
-                            "Date": datetime.now().strftime("%Y-%m-%d"),
-                            "Country": "IT",
-                            "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                            "Merchant_slug": merchant_slug,
-                            "GPN_URL": merchant_row.get("GPN_URL", ""),
-                            "Competitor_Source": "codice-sconto.net",
-                            "Competitor_URL": url,
-                            "Affiliate_Link": affiliate_link or "",
-                            "Code": code_info.get("code", ""),
-                            "Title": code_info.get("title", "")
-                        })
-                    break  # Succès, sortir de la boucle retry
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    if "Page crashed" in error_msg or "Target closed" in error_msg:
-                        print(f"   ⚠️ Page crash détecté, tentative {attempt + 1}/{max_retries}...")
-                        try:
-                            page.close()
-                        except:
-                            pass
-                        page = context.new_page()
-                        if attempt == max_retries - 1:
-                            print(f"   ❌ Échec après {max_retries} tentatives")
-                    else:
-                        print(f"   ❌ Erreur: {error_msg[:50]}")
-                        break  # Erreur non-crash, pas de retry
-            
-            # Fermer la page après chaque merchant (nettoyage mémoire maximal)
-            try:
-                page.close()
-            except:
-                pass
-            
-            print(f"   📝 Total: {len(all_results)} codes")
-        
-        browser.close()
-    
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="Codicescontonet IT")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ CODICESCONTONET IT TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    run_source(SOURCE, scrape_codicescontonet_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+"""
+Configuration pytest des tests unitaires (les scripts test_*_single.py se lancent à la main).
+- Modules du dossier Playwright importables
+- État SQLite (checkpoint, ledger, planner...) dans un dossier temporaire par test
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_store
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    """Base d'état isolée: les schémas sont recréés dans une base vide."""
+    monkeypatch.setattr(state_store, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(state_store, "STATE_DB_PATH", str(tmp_path / "scraper_state.db"))
+    monkeypatch.setattr(state_store, "_initialized_schemas", set())
+    return tmp_path
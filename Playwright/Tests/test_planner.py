@@ -0,0 +1,65 @@
+"""Tests du planificateur à budget de temps (planner)."""
+
+import time
+
+import pytest
+
+import planner
+
+SOURCE = "Test FR"
+
+
+def make_items(count: int) -> list:
+    return [(idx, {"Merchant_slug": f"m{idx}"}, f"https://test.fr/{idx}") for idx in range(1, count + 1)]
+
+
+def deadline_in(seconds: float) -> float:
+    """Échéance qui laisse `seconds` de scraping après la marge d'écriture."""
+    return time.time() + planner.WRITE_MARGIN_SECONDS + seconds
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3])
+def test_plan_items_trims_to_budget(workers):
+    items = make_items(10)
+    for _, _, url in items:
+        planner.record_duration(SOURCE, url, 30)
+
+    planned, cut = planner.plan_items(SOURCE, items, deadline_in(100), workers=workers)
+
+    # 100 s par worker, 30 s par URL
+    assert len(planned) == 3 * workers
+    assert sorted(planned + cut) == items
+    assert 30 * len(planned) <= 100 * workers
+
+
+def test_plan_items_keeps_most_productive_urls():
+    items = make_items(4)
+    durations = {1: 50, 2: 10, 3: 10, 4: 40}
+    for idx, _, url in items:
+        planner.record_duration(SOURCE, url, durations[idx])
+    codes = {items[0][2]: 50, items[1][2]: 1, items[2][2]: 4, items[3][2]: 0}
+
+    planned, cut = planner.plan_items(SOURCE, items, deadline_in(75), codes_by_url=codes)
+
+    # Codes par seconde: 1 (50/50), 3 (4/10), 2 (1/10), 4 (0/40); 50 + 10 + 10 = 70 s sur 75
+    assert [idx for idx, _, _ in planned] == [1, 3, 2]
+    assert [idx for idx, _, _ in cut] == [4]
+
+
+def test_plan_items_uses_default_duration_for_unknown_urls():
+    planned, cut = planner.plan_items(SOURCE, make_items(5), deadline_in(planner.DEFAULT_URL_SECONDS * 2.5))
+    assert len(planned) == 2 and len(cut) == 3
+
+
+def test_plan_items_cuts_everything_past_deadline():
+    planned, cut = planner.plan_items(SOURCE, make_items(3), time.time())
+    assert planned == [] and len(cut) == 3
+
+
+def test_share_deadline_splits_remaining_time_between_sources():
+    deadline = time.time() + 600
+    assert planner.share_deadline(deadline, 1) == deadline
+    assert planner.share_deadline(None, 3) is None
+    assert planner.share_deadline(deadline, 3) - time.time() == pytest.approx(200, abs=1)
+    # 5 sources sur 2 workers: 3 vagues
+    assert planner.share_deadline(deadline, 5, workers=2) - time.time() == pytest.approx(200, abs=1)
@@ -0,0 +1,103 @@
+"""
+Tests du nettoyage en flux (gsheet_writer.ResultCleaner) et du sink d'écriture par lots
+(result_pipeline.ResultSink).
+"""
+
+import re
+
+import pytest
+
+import checkpoint
+from gsheet_writer import COMPETITOR_PREFIXES, EXCLUSIVE_KEYWORDS, ResultCleaner, clean_results
+from records import build_records, to_dicts
+from result_pipeline import ResultSink
+
+SOURCE = {"name": "Test FR", "country": "FR", "competitor": "test", "competitor_source": "test"}
+
+
+def legacy_clean(rows: list) -> list:
+    """Nettoyage de la liste complète tel qu'avant le flux (dicts Missing_Code, étape par étape)."""
+    seen = set()
+    deduped = []
+    for r in rows:
+        key = (r.get("Country", ""), str(r.get("Merchant_ID", "")), r.get("Code", ""))
+        if key not in seen:
+            seen.add(key)
+            deduped.append(r)
+    rows = [r for r in deduped if ' ' not in str(r.get("Code", ""))]
+    rows = [r for r in rows if not re.search('|'.join(EXCLUSIVE_KEYWORDS), str(r.get("Title", "")), re.IGNORECASE)]
+    return [r for r in rows if not re.match('^(' + '|'.join(COMPETITOR_PREFIXES) + ')', str(r.get("Code", "")).upper())]
+
+
+def merchant_records(merchant_id: int, codes: list) -> list:
+    merchant_row = {"Merchant_ID": merchant_id, "Merchant_slug": f"m{merchant_id}", "GPN_URL": ""}
+    return build_records(SOURCE, merchant_row, f"https://test.fr/{merchant_id}", codes)
+
+
+def sample_records() -> list:
+    """Lignes de plusieurs marchands avec doublons (y compris entre marchands) et lignes filtrées."""
+    return (
+        merchant_records(1, [{"code": "SAVE10", "title": "10%"}, {"code": "SAVE10", "title": "10% bis"},
+                             {"code": "TWO WORDS", "title": "Espaces"}, {"code": "VIP", "title": "Offre exclusive"}])
+        + merchant_records(2, [{"code": "SAVE10", "title": "Autre marchand"}, {"code": "IGRAAL5", "title": "Concurrent"},
+                               {"code": "WELCOME", "title": "Bienvenue"}])
+        + merchant_records(1, [{"code": "SAVE10", "title": "Doublon d'un autre lot"}, {"code": "NEW20", "title": "20%"}])
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 100])
+def test_cleaner_over_chunks_matches_full_list_cleaning(chunk_size):
+    records = sample_records()
+    cleaner = ResultCleaner()
+    streamed = []
+    for start in range(0, len(records), chunk_size):
+        streamed += cleaner.filter(records[start:start + chunk_size])
+
+    expected = legacy_clean(to_dicts(records))
+    assert to_dicts(streamed) == expected
+    assert to_dicts(clean_results(records)) == expected
+    assert [r["Code"] for r in expected] == ["SAVE10", "SAVE10", "WELCOME", "NEW20"]
+
+
+def test_sink_keeps_checkpoint_when_write_fails():
+    records = merchant_records(1, [{"code": "SAVE10", "title": "10%"}])
+    url = records[0].merchant.competitor_url
+    checkpoint.save_url(SOURCE["name"], url, "run", to_dicts(records))
+
+    def write(chunk):
+        raise RuntimeError("quota Google Sheets")
+
+    sink = ResultSink(write, on_written=lambda urls: checkpoint.mark_written(SOURCE["name"], urls=urls),
+                      flush_rows=1, flush_seconds=60)
+    sink.put(records)
+
+    with pytest.raises(RuntimeError, match="quota"):
+        sink.close()
+    # Lignes non écrites: le checkpoint les garde pour la reprise
+    assert checkpoint.load_checkpoint(SOURCE["name"])[url]["rows"] == to_dicts(records)
+    assert sink.written == 0
+
+
+def test_sink_retries_failed_chunk_and_clears_checkpoint_once_written():
+    first = merchant_records(1, [{"code": "SAVE10", "title": "10%"}])
+    second = merchant_records(2, [{"code": "WELCOME", "title": "Bienvenue"}])
+    for records in (first, second):
+        checkpoint.save_url(SOURCE["name"], records[0].merchant.competitor_url, "run", to_dicts(records))
+
+    attempts, written = [], []
+
+    def write(chunk):
+        attempts.append(len(chunk))
+        if len(attempts) == 1:
+            raise RuntimeError("erreur réseau")
+        written.extend(chunk)
+
+    sink = ResultSink(write, on_written=lambda urls: checkpoint.mark_written(SOURCE["name"], urls=urls),
+                      flush_rows=1, flush_seconds=60)
+    sink.put(first)
+    sink.put(second)
+    assert sink.close() == 2
+
+    # Le lot en échec est réécrit avec le suivant, puis les deux URLs sont vidées du checkpoint
+    assert [r.code for r in written] == ["SAVE10", "WELCOME"]
+    assert all(entry["rows"] == [] for entry in checkpoint.load_checkpoint(SOURCE["name"]).values())
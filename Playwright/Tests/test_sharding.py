@@ -0,0 +1,23 @@
+"""Tests du découpage d'une source en shards (scraper_runner.split_shards)."""
+
+import pytest
+
+from scraper_runner import split_shards
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 16, 17])
+@pytest.mark.parametrize("shards", [1, 2, 3, 4, 20])
+def test_split_shards_covers_every_item_exactly_once(count, shards):
+    items = [(idx, {"Merchant_slug": f"m{idx}"}, f"https://test.fr/{idx}") for idx in range(1, count + 1)]
+    chunks = split_shards(items, shards)
+
+    flattened = [item for chunk in chunks for item in chunk]
+    assert sorted(flattened) == items
+    assert len(flattened) == len(items)
+    # Jamais plus de shards que de marchands, et pas de shard vide si la liste ne l'est pas
+    assert len(chunks) == max(1, min(shards, count))
+    assert all(chunks) or not items
+
+
+def test_split_shards_interleaves_items():
+    assert split_shards(list(range(7)), 3) == [[0, 3, 6], [1, 4], [2, 5]]
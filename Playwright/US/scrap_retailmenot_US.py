@@ -6,210 +6,175 @@ Script Playwright pour scraper TOUS les codes RetailMeNot (US)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from affiliate_capture import AffiliateCapture
+from dual_flow import Steps, run_async, run_sync
 
+COOKIE_BUTTONS = "button:has-text('Accept'), button:has-text('Consent')"
+OFFER_SELECTOR = "a[data-component-class='offer_strip']"
 
-def scrape_retailmenot_all(page, context, url):
+# Condition JS: au moins un code révélé dans les offres
+CODES_REVEALED_JS = """
+    () => !!document.querySelector('a[data-component-class="offer_strip"] div.font-bold.tracking-wider')
+"""
+
+# Extraction de tous les codes de la page (même script que FastAPI)
+EXTRACT_CODES_JS = """
+    () => {
+        var results = [];
+        var offers = document.querySelectorAll('a[data-component-class="offer_strip"]');
+        
+        offers.forEach(function(offer) {
+            var codeDiv = offer.querySelector('div.font-bold.tracking-wider');
+            var code = codeDiv ? codeDiv.textContent.trim() : null;
+            
+            var titleH3 = offer.querySelector('h3');
+            var title = titleH3 ? titleH3.textContent.trim() : null;
+            
+            if (code && title && code.length >= 3) {
+                results.push({code: code, title: title});
+            }
+        });
+        
+        return results;
+    }
+"""
+
+# Textes de bouton qui ne sont pas des codes
+FAKE_CODES = ['get deal', 'see deal', 'show deal', 'view deal']
+
+
+def collect_codes(codes_data: list, affiliate_link: str = None) -> list:
+    """
+    Codes retenus parmi ceux lus par EXTRACT_CODES_JS:
+    faux codes filtrés, doublons filtrés uniquement sur le code, code ET titre obligatoires.
     """
-    Scrape TOUS les codes d'une page RetailMeNot avec Playwright.
+    results = []
+    processed_codes = set()
+    
+    for item in codes_data:
+        code = item['code']
+        title = item['title']
+        
+        # Ignorer les faux codes et les doublons
+        if code.lower() in FAKE_CODES or code in processed_codes:
+            continue
+        
+        if code and title:
+            processed_codes.add(code)
+            results.append({
+                "code": code,
+                "title": title,
+                "affiliate_link": affiliate_link
+            })
+    
+    return results
+
+
+def retailmenot_flow(steps, page, context, url):
+    """
+    Déroulé d'une page RetailMeNot (générateur dual_flow, commun aux versions sync et async).
     Même logique que le scraper FastAPI.
     """
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "retailmenot")
     
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(2000)
+        yield steps.goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        yield steps.wait_visible(page, OFFER_SELECTOR, timeout=3000, name="page_ready")
         
         # Fermer cookie banner
-        try:
-            page.click("button:has-text('Accept'), button:has-text('Consent')", timeout=1000)
-        except:
-            pass
+        yield steps.consent(page, COOKIE_BUTTONS, timeout=1000, hidden_timeout=500)
         
         # Trouver les offres
-        offer_links = page.locator("a[data-component-class='offer_strip']")
-        count = offer_links.count()
+        offer_links = page.locator(OFFER_SELECTOR)
+        count = yield offer_links.count()
         
         if count == 0:
-            return results
+            return results, affiliate_link
         
         # Cliquer sur la première offre pour révéler les codes
         first_offer = offer_links.first
-        first_offer.scroll_into_view_if_needed()
-        page.wait_for_timeout(500)
+        yield first_offer.scroll_into_view_if_needed()
         
         # Gérer le nouvel onglet potentiel
-        with context.expect_page() as new_page_info:
-            first_offer.click()
+        new_page = yield steps.expect_page(context, lambda: steps.click(page, first_offer))
         
         try:
-            new_page = new_page_info.value
-            new_page.wait_for_load_state("domcontentloaded")
-            page.wait_for_timeout(2000)
+            yield new_page.wait_for_load_state("domcontentloaded")
             
             # === CAPTURE AFFILIATE LINK ===
-            try:
-                for _ in range(10):
-                    current_url = page.url
-                    if "retailmenot" not in current_url:
-                        affiliate_link = current_url
-                        break
-                    page.wait_for_timeout(500)
-            except:
-                pass
+            affiliate_link = yield steps.affiliate_wait(affiliate, timeout=7000)
             
             # Vérifier si c'est une page RetailMeNot
             if "retailmenot" in new_page.url:
                 work_page = new_page
             else:
-                new_page.close()
+                yield new_page.close()
                 work_page = page
         except:
             work_page = page
         
-        page.wait_for_timeout(2000)
+        yield steps.wait_until(work_page, CODES_REVEALED_JS, timeout=4000, name="codes_revealed")
         
         # Scroll de la page pour charger tous les codes
-        last_height = work_page.evaluate("document.body.scrollHeight")
+        last_height = yield work_page.evaluate("document.body.scrollHeight")
         while True:
-            work_page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            work_page.wait_for_timeout(1000)
-            new_height = work_page.evaluate("document.body.scrollHeight")
-            if new_height == last_height:
+            yield work_page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            if not (yield steps.wait_scroll_growth(work_page, last_height, timeout=1000)):
                 break
-            last_height = new_height
+            last_height = yield work_page.evaluate("document.body.scrollHeight")
         
-        work_page.evaluate("window.scrollTo(0, 0)")
-        work_page.wait_for_timeout(1000)
+        yield work_page.evaluate("window.scrollTo(0, 0)")
         
         # Récupérer tous les codes via JavaScript (même script que FastAPI)
-        codes_data = work_page.evaluate("""
-            () => {
-                var results = [];
-                var offers = document.querySelectorAll('a[data-component-class="offer_strip"]');
-                
-                offers.forEach(function(offer) {
-                    var codeDiv = offer.querySelector('div.font-bold.tracking-wider');
-                    var code = codeDiv ? codeDiv.textContent.trim() : null;
-                    
-                    var titleH3 = offer.querySelector('h3');
-                    var title = titleH3 ? titleH3.textContent.trim() : null;
-                    
-                    if (code && title && code.length >= 3) {
-                        results.push({code: code, title: title});
-                    }
-                });
-                
-                return results;
-            }
-        """)
-        
-        # Filtrer les faux codes et doublons (uniquement sur le code)
-        processed_codes = set()
-        
-        for item in codes_data:
-            code = item['code']
-            title = item['title']
-            
-            # Ignorer les faux codes
-            if code.lower() in ['get deal', 'see deal', 'show deal', 'view deal']:
-                continue
-            
-            # Vérifier uniquement si le code est un doublon
-            if code in processed_codes:
-                continue
-            
-            # N'ajouter que si code ET titre sont présents
-            if code and title:
-                processed_codes.add(code)
-                results.append({
-                    "code": code,
-                    "title": title,
-                    "affiliate_link": affiliate_link
-                })
+        results = collect_codes((yield work_page.evaluate(EXTRACT_CODES_JS)), affiliate_link)
         
         # Fermer le nouvel onglet si on en a ouvert un
         if work_page != page:
             try:
-                work_page.close()
+                yield work_page.close()
             except:
                 pass
         
     except Exception as e:
-        print(f"      ❌ Erreur: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
+
+
+def scrape_retailmenot_all(page, context, url):
+    """Scrape TOUS les codes d'une page RetailMeNot avec Playwright (retailmenot_flow)."""
+    return run_sync(retailmenot_flow(Steps(), page, context, url))
+
+
+async def scrape_retailmenot_all_async(page, context, url):
+    """
+    Version async de scrape_retailmenot_all (moteur async_engine), même déroulé.
+    Le contexte est propre au marchand, context.expect_page ne capte que nos onglets.
+    """
+    return await run_async(retailmenot_flow(Steps(is_async=True), page, context, url))
 
 
-def main():
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "RetailMeNot US",
+    "country": "US",
+    "competitor": "retailmenot",
+    "competitor_source": "retailmenot"
+}
+
+
+def main(**run_options):
     """Scrape RetailMeNot US depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("US", "retailmenot")
-    print(f"📍 RetailMeNot: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            try:
-                codes, affiliate_link = scrape_retailmenot_all(page, context, url)
-                print(f"   ✅ {len(codes)} codes trouvés")
-                if affiliate_link:
-                    print(f"   🔗 Affiliate: {affiliate_link[:50]}...")
-                
-                for code_info in codes:
-                    all_results.append({
-                        "Date": datetime.now().strftime("%Y-%m-%d"),
-                        "Country": "US",
-                        "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                        "Merchant_slug": merchant_slug,
-                        "GPN_URL": merchant_row.get("GPN_URL", ""),
-                        "Competitor_Source": "retailmenot",
-                        "Competitor_URL": url,
-                        "Affiliate_Link": code_info.get("affiliate_link", ""),
-                        "Code": code_info["code"],
-                        "Title": code_info["title"]
-                    })
-            except Exception as e:
-                print(f"   ❌ Erreur: {str(e)[:50]}")
-            
-            print(f"   📝 Total: {len(all_results)} codes")
-        
-        browser.close()
-    
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="RetailMeNot US")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ RETAILMENOT US TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    run_source(SOURCE, scrape_retailmenot_all, **run_options)
 
 
 if __name__ == "__main__":
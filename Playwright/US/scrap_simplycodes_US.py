@@ -6,214 +6,181 @@ Script Playwright pour scraper TOUS les codes SimplyCodes (US)
 
 import os
 import sys
-from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 
-# Import du module gsheet_loader (dossier parent)
+# Import du module scraper_runner (dossier parent)
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from gsheet_loader import get_competitor_urls, load_competitors_data
-from gsheet_writer import append_to_gsheet
+from scraper_runner import run_source
+from records import ScrapeFailed
+from affiliate_capture import AffiliateCapture
+from dual_flow import Steps, run_async, run_sync
 
+CODE_BUTTON_SELECTOR = "[data-testid='promotion-copy-code-button']"
+CLOSE_BUTTON_SELECTOR = "button:has(span.i-ph\\:x), button:has(span[class*='i-ph'][class*='x'])"
+POPUP_SELECTOR = "[data-testid='promotion-subtitle']"
 
-def scrape_simplycodes_all(page, context, url):
-    """Scrape tous les codes d'une page SimplyCodes - VERSION OPTIMISÉE"""
+# Code (input readonly, sinon span), titre et bouton X de la popup ouverte par le premier clic
+POPUP_SPEC = {
+    "code": [{"selector": "input[readonly]", "prop": "value", "min_len": 3},
+             {"selector": "span.font-bold.uppercase.truncate", "min_len": 3}],
+    "title": [{"selector": POPUP_SELECTOR}],
+    "close": [CLOSE_BUTTON_SELECTOR],
+}
+
+# Extraction de tous les codes visibles de la page
+EXTRACT_CODES_JS = """() => {
+    const results = [];
+    document.querySelectorAll("[data-testid='promotion-copy-code-button']").forEach(btn => {
+        const parent = btn.closest('div');
+        if (!parent) return;
+        
+        const codeSpan = parent.querySelector('span.font-bold, span.uppercase, span[class*="truncate"]');
+        const code = codeSpan ? codeSpan.textContent.trim() : null;
+        
+        let card = btn;
+        for (let i = 0; i < 10; i++) {
+            card = card.parentElement;
+            if (!card) break;
+            const titleEl = card.querySelector("[data-testid='promotion-subtitle']");
+            if (titleEl) {
+                const title = titleEl.textContent.trim();
+                if (code && code.length >= 3 && !['Show Code', 'Copy', 'Copied!', 'Show code'].includes(code)) {
+                    results.push({code, title});
+                }
+                break;
+            }
+        }
+    });
+    return results;
+}"""
+
+# Textes de bouton qui ne sont pas des codes
+FAKE_CODES = ['Show Code', 'Copy', 'Copied!']
+
+# Bouton "Show more" (texte exact, sinon texte contenu), cliqué au plus SHOW_MORE_CLICKS fois
+SHOW_MORE_SELECTORS = ("button:text-is('Show more')", "button:has-text('Show more')")
+SHOW_MORE_CLICKS = 2
+
+
+def collect_codes(state: dict, all_codes: list, affiliate_link: str = None) -> list:
+    """
+    Codes retenus: d'abord celui de la popup
+    (popup_state), puis ceux de la page (EXTRACT_CODES_JS), dédupliqués sur le code.
+    """
+    results = []
+    if state["code"] and state["title"] and state["code"] not in FAKE_CODES:
+        results.append({"code": state["code"], "title": state["title"], "affiliate_link": affiliate_link})
+    
+    seen = {r["code"] for r in results}
+    for item in all_codes:
+        code = item.get('code')
+        title = item.get('title')
+        if code and title and code not in seen:
+            seen.add(code)
+            results.append({"code": code, "title": title, "affiliate_link": affiliate_link})
+    
+    return results
+
+
+def simplycodes_flow(steps, page, context, url):
+    """Déroulé d'une page SimplyCodes (générateur dual_flow, commun aux versions sync et async)."""
     results = []
     affiliate_link = None
+    affiliate = AffiliateCapture(page, "simplycodes")
     
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        page.wait_for_timeout(1500)
+        yield steps.goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        yield steps.wait_visible(page, CODE_BUTTON_SELECTOR, timeout=3000, name="page_ready")
         
         # Vérifier s'il y a des boutons "Show Code"
-        has_codes = page.locator("[data-testid='promotion-copy-code-button']").count()
+        has_codes = yield page.locator(CODE_BUTTON_SELECTOR).count()
         
         if has_codes == 0:
-            return results
+            return results, affiliate_link
         
         # UN SEUL clic pour déclencher l'authentification
-        first_btn = page.locator("[data-testid='promotion-copy-code-button']").first
+        first_btn = page.locator(CODE_BUTTON_SELECTOR).first
         
         try:
-            with context.expect_page(timeout=8000) as new_page_info:
-                first_btn.click()
-            new_page = new_page_info.value
-            new_page.wait_for_load_state("domcontentloaded")
-            new_page.wait_for_timeout(1000)
+            new_page = yield steps.expect_page(context, lambda: steps.click(page, first_btn), timeout=8000)
+            yield new_page.wait_for_load_state("domcontentloaded")
             
             # === CAPTURE AFFILIATE LINK ===
-            try:
-                for _ in range(10):
-                    current_url = page.url
-                    if "simplycodes" not in current_url:
-                        affiliate_link = current_url
-                        break
-                    page.wait_for_timeout(500)
-            except:
-                pass
+            affiliate_link = yield steps.affiliate_wait(affiliate, timeout=5000)
         except:
             new_page = page
-            new_page.wait_for_timeout(1000)
         
-        # D'ABORD: récupérer le code de la popup (premier code)
-        try:
-            popup_code = new_page.evaluate("""() => {
-                const input = document.querySelector('input[readonly]');
-                if (input && input.value && input.value.length >= 3) return input.value.trim();
-                const span = document.querySelector('span.font-bold.uppercase.truncate');
-                if (span && span.textContent.trim().length >= 3) return span.textContent.trim();
-                return null;
-            }""")
-            
-            popup_title = new_page.evaluate("""() => {
-                const el = document.querySelector("[data-testid='promotion-subtitle']");
-                return el ? el.textContent.trim() : null;
-            }""")
-            
-            if popup_code and popup_title and popup_code not in ['Show Code', 'Copy', 'Copied!']:
-                results.append({"code": popup_code, "title": popup_title, "affiliate_link": affiliate_link})
-        except:
-            pass
+        # D'ABORD: récupérer le code de la popup (premier code), un seul evaluate
+        yield steps.wait_visible(new_page, POPUP_SELECTOR, timeout=3000, name="popup_code")
+        state = yield steps.popup_state(new_page, POPUP_SPEC)
         
         # FERMER LA POPUP avec le bouton X ou clic extérieur
         try:
-            close_btn = new_page.locator("button:has(span.i-ph\\:x), button:has(span[class*='i-ph'][class*='x'])").first
-            if close_btn.count() > 0:
-                close_btn.click()
-                new_page.wait_for_timeout(500)
+            if state["close"]:
+                yield new_page.locator(state["close"]).first.click()
             else:
-                new_page.mouse.click(10, 10)
-                new_page.wait_for_timeout(500)
+                yield new_page.mouse.click(10, 10)
+            yield steps.wait_hidden(new_page, CLOSE_BUTTON_SELECTOR, timeout=1000, name="popup_close")
         except:
             pass
         
-        # Cliquer sur "Show more" 2 fois pour afficher plus de codes
-        for i in range(2):
+        # Cliquer sur "Show more" pour afficher plus de codes
+        for i in range(SHOW_MORE_CLICKS):
             try:
-                show_more = new_page.locator("button:text-is('Show more')").first
-                if show_more.count() == 0:
-                    show_more = new_page.locator("button:has-text('Show more')").first
+                show_more = new_page.locator(SHOW_MORE_SELECTORS[0]).first
+                if (yield show_more.count()) == 0:
+                    show_more = new_page.locator(SHOW_MORE_SELECTORS[1]).first
                 
-                if show_more.count() > 0:
-                    show_more.scroll_into_view_if_needed()
-                    new_page.wait_for_timeout(200)
-                    show_more.click(force=True)
-                    new_page.wait_for_timeout(1000)
+                if (yield show_more.count()) > 0:
+                    yield show_more.scroll_into_view_if_needed()
+                    codes_before = yield new_page.locator(CODE_BUTTON_SELECTOR).count()
+                    yield show_more.click(force=True)
+                    yield steps.wait_count_above(new_page, CODE_BUTTON_SELECTOR, codes_before, timeout=2000,
+                                                 name="show_more")
                 else:
                     break
             except:
                 break
         
-        # EXTRACTION COMPLÈTE VIA JAVASCRIPT - INSTANTANÉ
-        all_codes = new_page.evaluate("""() => {
-            const results = [];
-            document.querySelectorAll("[data-testid='promotion-copy-code-button']").forEach(btn => {
-                const parent = btn.closest('div');
-                if (!parent) return;
-                
-                const codeSpan = parent.querySelector('span.font-bold, span.uppercase, span[class*="truncate"]');
-                const code = codeSpan ? codeSpan.textContent.trim() : null;
-                
-                let card = btn;
-                for (let i = 0; i < 10; i++) {
-                    card = card.parentElement;
-                    if (!card) break;
-                    const titleEl = card.querySelector("[data-testid='promotion-subtitle']");
-                    if (titleEl) {
-                        const title = titleEl.textContent.trim();
-                        if (code && code.length >= 3 && !['Show Code', 'Copy', 'Copied!', 'Show code'].includes(code)) {
-                            results.push({code, title});
-                        }
-                        break;
-                    }
-                }
-            });
-            return results;
-        }""")
-        
-        # Dédupliquer
-        seen = {r["code"] for r in results}
-        for item in all_codes:
-            code = item.get('code')
-            title = item.get('title')
-            if code and title and code not in seen:
-                seen.add(code)
-                results.append({"code": code, "title": title, "affiliate_link": affiliate_link})
+        # EXTRACTION COMPLÈTE VIA JAVASCRIPT - INSTANTANÉ (popup en premier, puis dédoublonnage)
+        results = collect_codes(state, (yield new_page.evaluate(EXTRACT_CODES_JS)), affiliate_link)
         
         # Fermer le nouvel onglet
         if new_page != page:
             try:
-                new_page.close()
+                yield new_page.close()
             except:
                 pass
         
     except Exception as e:
-        print(f"      ❌ Erreur: {str(e)[:50]}")
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        affiliate.stop()
     
-    return results, affiliate_link
+    return results, affiliate_link or affiliate.link
+
+
+def scrape_simplycodes_all(page, context, url):
+    """Scrape tous les codes d'une page SimplyCodes - VERSION OPTIMISÉE (simplycodes_flow)"""
+    return run_sync(simplycodes_flow(Steps(), page, context, url))
 
 
-def main():
+async def scrape_simplycodes_all_async(page, context, url):
+    """Version async de scrape_simplycodes_all (moteur async_engine), même déroulé"""
+    return await run_async(simplycodes_flow(Steps(is_async=True), page, context, url))
+
+
+# Descripteur de la source pour scraper_runner
+SOURCE = {
+    "name": "SimplyCodes US",
+    "country": "US",
+    "competitor": "simplycodes",
+    "competitor_source": "simplycodes"
+}
+
+
+def main(**run_options):
     """Scrape SimplyCodes US depuis Google Sheets"""
-    print(f"📖 Chargement depuis Google Sheets...")
-    
-    # Charger les URLs depuis Google Sheets
-    competitor_data = get_competitor_urls("US", "simplycodes")
-    print(f"📍 SimplyCodes: {len(competitor_data)} URLs uniques")
-    
-    all_results = []
-    
-    print(f"\n🚀 Lancement de Playwright...")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        page = context.new_page()
-        
-        for idx, (merchant_row, url) in enumerate(competitor_data, 1):
-            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
-            
-            print(f"\n[{idx}/{len(competitor_data)}] 🏪 {merchant_slug}")
-            print(f"   URL: {url[:60]}...")
-            
-            try:
-                codes, affiliate_link = scrape_simplycodes_all(page, context, url)
-                print(f"   ✅ {len(codes)} codes trouvés")
-                if affiliate_link:
-                    print(f"   🔗 Affiliate: {affiliate_link[:50]}...")
-                
-                for code_info in codes:
-                    all_results.append({
-                        "Date": datetime.now().strftime("%Y-%m-%d"),
-                        "Country": "US",
-                        "Merchant_ID": merchant_row.get("Merchant_ID", ""),
-                        "Merchant_slug": merchant_slug,
-                        "GPN_URL": merchant_row.get("GPN_URL", ""),
-                        "Competitor_Source": "simplycodes",
-                        "Competitor_URL": url,
-                        "Affiliate_Link": code_info.get("affiliate_link", ""),
-                        "Code": code_info["code"],
-                        "Title": code_info["title"]
-                    })
-            except Exception as e:
-                print(f"   ❌ Erreur: {str(e)[:50]}")
-            
-            print(f"   📝 Total: {len(all_results)} codes")
-        
-        browser.close()
-    
-    if all_results:
-        # Écriture directe dans Google Sheets
-        append_to_gsheet(all_results, source_name="SimplyCodes US")
-        
-        print(f"\n{'='*60}")
-        print(f"✅ SIMPLYCODES US TERMINÉ!")
-        print(f"📊 {len(all_results)} codes récupérés et envoyés à Google Sheets")
-        print(f"{'='*60}")
-    else:
-        print(f"\n⚠️ Aucun code trouvé")
+    run_source(SOURCE, scrape_simplycodes_all, **run_options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+"""
+Capture du lien affilié par événements de navigation (au lieu de sonder page.url).
+
+Au clic sur un code, la page d'origine est redirigée vers le marchand via une chaîne
+de redirections (tracker d'affiliation, réseau, site marchand). Les écouteurs
+page.on("request") et page.on("framenavigated") du cadre principal enregistrent cette
+chaîne dès le premier saut, y compris les redirections HTTP qui ne sont jamais
+visibles dans page.url:
+- link: première URL hors du site concurrent (le lien d'affiliation)
+- final_url: dernière URL de la chaîne (l'URL marchand finale)
+- hops: nombre d'URLs de la chaîne hors du site concurrent
+
+L'attente se termine dès le premier saut hors concurrent, sans attendre le chargement
+de la page marchand. Les événements ne comptent qu'une fois la page sur le site concurrent
+(une page réutilisée peut encore naviguer sur le marchand précédent).
+
+Usage dans un scraper:
+    affiliate = AffiliateCapture(page, "hotukdeals")    # avant polite_goto
+    ...
+    affiliate_link = affiliate.wait(timeout=5000)       # après le 1er clic
+    ...
+    affiliate.stop()                                    # dans le finally du scraper
+"""
+
+import threading
+import time
+import weakref
+
+from waits import record_wait, scaled_timeout
+
+# Capture active par page: une nouvelle capture détache la précédente (pages réutilisées)
+_active = weakref.WeakKeyDictionary()
+_active_lock = threading.Lock()
+
+
+class AffiliateCapture:
+    """Chaîne de redirection de la page d'origine, pour un marchand."""
+
+    def __init__(self, page, competitor: str):
+        self.page = page
+        self.competitor = competitor.lower()
+        self.chain = []             # URLs du cadre principal, dans l'ordre
+        self.link = None
+        # Page déjà sur le site concurrent (préchargée par le runner): rien à attendre
+        self._armed = self._is_competitor(getattr(page, "url", "") or "")
+        self._lock = threading.Lock()
+        self._attach()
+
+    # --- Écouteurs ---
+
+    def _attach(self):
+        with _active_lock:
+            previous = _active.get(self.page)
+            _active[self.page] = self
+        if previous is not None:
+            previous.stop()
+        try:
+            self.page.on("request", self._on_request)
+            self.page.on("framenavigated", self._on_navigated)
+        except Exception:
+            pass
+
+    def _is_competitor(self, url: str) -> bool:
+        return self.competitor in url.lower()
+
+    def _is_exit(self, url: str) -> bool:
+        return url.startswith("http") and not self._is_competitor(url)
+
+    def _add(self, url: str):
+        with self._lock:
+            if not self._armed:
+                self._armed = self._is_competitor(url)
+                return
+            if self.chain and self.chain[-1] == url:
+                return
+            self.chain.append(url)
+            if self.link is None and self._is_exit(url):
+                self.link = url
+
+    def _main_frame_navigation(self, request) -> bool:
+        try:
+            return request.is_navigation_request() and request.frame == self.page.main_frame
+        except Exception:
+            return False
+
+    def _on_request(self, request):
+        if self._main_frame_navigation(request):
+            self._add(request.url)
+
+    def _on_navigated(self, frame):
+        try:
+            if frame == self.page.main_frame:
+                self._add(frame.url)
+        except Exception:
+            pass
+
+    def _exit_request(self, request) -> bool:
+        """Prédicat de wait_for_event: requête de navigation qui quitte le site concurrent."""
+        return self._armed and self._main_frame_navigation(request) and self._is_exit(request.url)
+
+    # --- Résultat ---
+
+    @property
+    def final_url(self):
+        """Dernière URL de la chaîne une fois le site concurrent quitté (None sinon)."""
+        with self._lock:
+            return self.chain[-1] if self.link else None
+
+    @property
+    def hops(self) -> int:
+        """Nombre d'URLs visitées hors du site concurrent (lien affilié compris)."""
+        with self._lock:
+            if self.link is None:
+                return 0
+            return len(self.chain) - self.chain.index(self.link)
+
+    def wait(self, timeout: int = 5000, name: str = "affiliate"):
+        """
+        Attend le premier saut hors du site concurrent (ne lève jamais).
+
+        Returns:
+            Le lien affilié (première URL hors concurrent), ou None
+        """
+        started = time.monotonic()
+        if self.link is None:
+            try:
+                request = self.page.wait_for_event("request", predicate=self._exit_request,
+                                                   timeout=scaled_timeout(timeout))
+                self._add(request.url)
+            except Exception:
+                pass
+        record_wait(name, started, self.link is not None)
+        return self.link
+
+    async def wait_async(self, timeout: int = 5000, name: str = "affiliate"):
+        """Version async de wait."""
+        started = time.monotonic()
+        if self.link is None:
+            try:
+                request = await self.page.wait_for_event("request", predicate=self._exit_request,
+                                                         timeout=scaled_timeout(timeout))
+                self._add(request.url)
+            except Exception:
+                pass
+        record_wait(name, started, self.link is not None)
+        return self.link
+
+    def stop(self):
+        """Retire les écouteurs de la page (la page est réutilisée pour le marchand suivant)."""
+        with _active_lock:
+            if _active.get(self.page) is self:
+                del _active[self.page]
+        for event, handler in (("request", self._on_request), ("framenavigated", self._on_navigated)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
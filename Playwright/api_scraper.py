@@ -2,24 +2,92 @@
 FastAPI pour tester les scrapers Playwright en local.
 Lance avec: uvicorn api_scraper:app --reload
 Accède à: http://127.0.0.1:8000/docs (interface Swagger)
+
+Chaque POST /scrape/... crée un job et répond immédiatement avec son job_id.
+Le suivi se fait via GET /jobs/{job_id} (état, progression, durées, résultats)
+ou en direct via GET /jobs/{job_id}/events (Server-Sent Events).
 """
 
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import JSONResponse
-from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+import threading
 import sys
 import os
 
 # Ajouter le dossier courant au path pour les imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import browser_pool
+from async_engine import run_scrapers_async
+from scraper_pool import MAX_WORKERS, SCRAPER_GROUPS, get_scrapers, run_scrapers
+import job_registry
+import planner
+import progress_events
+
+# Nombre de jobs exécutés en même temps par ce process API
+JOB_WORKERS = int(os.environ.get("SCRAPER_JOB_WORKERS", "2"))
+
+# Threads qui exécutent les jobs (les scrapers eux-mêmes tournent dans ces threads
+# ou dans des processus workers en mode parallèle)
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="scrape-job")
+
+# Vérification "scraper déjà actif" + création du job de façon atomique
+_enqueue_lock = threading.Lock()
+
+# Moteur par défaut des jobs: "sync" (threads/processus) ou "async" (boucle asyncio de l'API)
+DEFAULT_ENGINE = os.environ.get("SCRAPER_ENGINE", "sync")
+
+# Boucle asyncio de l'API (jobs du moteur async), renseignée au démarrage
+_event_loop = None
+
+# Flux SSE: intervalle de lecture des événements et de keep-alive (secondes)
+EVENTS_POLL_SECONDS = float(os.environ.get("SCRAPER_EVENTS_POLL_SECONDS", "1"))
+EVENTS_HEARTBEAT_SECONDS = 15
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _event_loop
+    _event_loop = asyncio.get_running_loop()
+
+    # Les jobs restés actifs d'un process précédent ne tourneront plus jamais
+    interrupted = job_registry.mark_interrupted_jobs()
+    if interrupted:
+        print(f"⚠️ {interrupted} job(s) d'un process précédent marqués 'interrupted'")
+
+    # Pool de navigateurs partagé par tous les jobs de ce process (et leurs workers)
+    if browser_pool.POOL_SIZE > 0:
+        try:
+            # Playwright sync ne peut pas tourner dans la boucle asyncio
+            await asyncio.to_thread(browser_pool.start_pool)
+        except Exception as e:
+            print(f"⚠️ Pool de navigateurs non démarré: {str(e)[:50]}")
+    yield
+    job_executor.shutdown(wait=False, cancel_futures=True)
+    browser_pool.stop_pool()
+
+
 app = FastAPI(
     title="🕷️ Scraper API - Missing Codes",
     description="""
     API pour lancer les scrapers de codes promo.
-    
+
     Les résultats sont écrits directement dans Google Sheets (Missing_Code).
-    
+
+    Chaque lancement crée un job: la réponse contient un `job_id`,
+    à suivre via `GET /jobs/{job_id}`, ou en direct via `GET /jobs/{job_id}/events`
+    (Server-Sent Events: un événement par marchand terminé, avec codes et latence).
+
+    Option `engine=async`: les sources qui ont une version async tournent dans la boucle
+    asyncio de l'API (des dizaines de pages en parallèle, limitées par domaine).
+
+    Option `budget_minutes`: le job planifie les URLs d'après leurs durées passées, s'arrête
+    avant l'échéance et écrit les résultats partiels (URLs non visitées dans les logs).
+
     ## Scrapers disponibles:
     - 🇦🇺 AU: Lifehacker, Cuponation
     - 🇺🇸 US: RetailMeNot, SimplyCodes
@@ -29,16 +97,25 @@ app = FastAPI(
     - 🇪🇸 ES: Chollometro, Cuponation
     - 🇮🇹 IT: Codice-Sconto, Cuponation
     """,
-    version="1.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
-# Variable globale pour suivre le statut
-scraper_status = {
-    "running": False,
-    "last_run": None,
-    "last_source": None,
-    "last_result": None
-}
+
+def get_status_summary():
+    """Résumé du statut: jobs actifs et dernier job."""
+    active_jobs = [
+        job for state in job_registry.ACTIVE_STATES
+        for job in job_registry.list_jobs(state=state)
+    ]
+    last_jobs = job_registry.list_jobs(limit=1)
+    pool = browser_pool.get_pool()
+    return {
+        "running": any(job["state"] == job_registry.JOB_RUNNING for job in active_jobs),
+        "active_jobs": active_jobs,
+        "last_job": last_jobs[0] if last_jobs else None,
+        "browser_pool": pool.stats() if pool else None
+    }
 
 
 @app.get("/", tags=["Info"])
@@ -47,14 +124,238 @@ def root():
     return {
         "message": "🕷️ Scraper API - Missing Codes",
         "docs": "Accédez à /docs pour l'interface Swagger",
-        "status": scraper_status
+        "status": get_status_summary()
     }
 
 
 @app.get("/status", tags=["Info"])
 def get_status():
-    """Vérifie le statut du scraper."""
-    return scraper_status
+    """Vérifie le statut des scrapers (jobs actifs et dernier job)."""
+    return get_status_summary()
+
+
+# ===================================================================
+# JOBS
+# ===================================================================
+
+def get_run_options(
+    shards: int = Query(None, ge=1, le=16, description="Nombre de navigateurs en parallèle par source (sharding des URLs)"),
+    engine: str = Query(None, pattern="^(sync|async)$", description="Moteur: sync (threads/processus) ou async (asyncio)"),
+    resume: bool = Query(None, description="Reprendre le checkpoint du jour (URLs déjà terminées sautées)"),
+    incremental: bool = Query(None, description="Sauter les URLs scrapées récemment et réutiliser leurs codes"),
+    ttl_hours: float = Query(None, gt=0, le=168, description="Validité d'un résultat en mode incrémental (heures)"),
+    budget_minutes: float = Query(None, gt=0, le=24 * 60, description="Budget de temps du job: URLs planifiées et résultats partiels écrits avant l'échéance")
+) -> dict:
+    """
+    Options de lancement communes à tous les endpoints /scrape/....
+    Toutes sont passées aux main(), sauf "engine" qui choisit le moteur du job.
+    """
+    options = {
+        "shards": shards, "engine": engine, "resume": resume, "incremental": incremental, "ttl_hours": ttl_hours,
+        "budget_minutes": budget_minutes
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def _job_run_options(job_id: str, run_options: dict = None) -> dict:
+    """
+    Options passées aux scrapers au démarrage du job: le budget devient une échéance
+    absolue commune à toutes les sources du job (et aux processus workers), et le job_id
+    permet aux runners de publier leur progression.
+    """
+    run_options = dict(run_options or {}, job_id=job_id)
+    budget_minutes = run_options.pop("budget_minutes", None)
+    if budget_minutes:
+        run_options["deadline"] = planner.deadline_from_budget(budget_minutes)
+    return run_options
+
+
+def _start(job_id: str, scrapers: list):
+    job_registry.start_job(job_id)
+    progress_events.emit(job_id, "job_started", {"sources": [name for name, _, _ in scrapers]})
+
+
+def _on_result(job_id: str):
+    """Callback on_result des runs: registre du job + événement de progression."""
+    def on_result(name, success, error, duration):
+        job_registry.record_source_result(job_id, name, success=success, error=error, duration=duration)
+        progress_events.emit(job_id, "source_result", {
+            "source": name, "success": success, "error": error, "duration": round(duration, 1)
+        })
+    return on_result
+
+
+def _finish(job_id: str, results: list, errors: list, log_label: str = None):
+    status_prefix = f"{log_label}: " if log_label else ""
+    job_registry.finish_job(
+        job_id,
+        message=f"{status_prefix}✅ {len(results)} succès, {len(errors)} erreurs",
+        success=results,
+        errors=errors
+    )
+    progress_events.emit(job_id, "job_finished", {
+        "state": job_registry.JOB_COMPLETED, "success": results, "errors": errors
+    })
+
+
+def _fail(job_id: str, error: Exception):
+    job_registry.finish_job(job_id, state=job_registry.JOB_FAILED, message=f"❌ Erreur: {str(error)[:100]}")
+    progress_events.emit(job_id, "job_finished", {"state": job_registry.JOB_FAILED, "error": str(error)[:100]})
+
+
+def _execute_job(job_id: str, scrapers: list, parallel: bool, max_workers: int, log_label: str = None,
+                 run_options: dict = None):
+    """Exécute un job dans un thread de job_executor et met à jour le registre."""
+    _start(job_id, scrapers)
+    run_options = _job_run_options(job_id, run_options)
+
+    try:
+        results, errors = run_scrapers(
+            scrapers, parallel=parallel, max_workers=max_workers, label=log_label, on_result=_on_result(job_id),
+            run_options=run_options
+        )
+        _finish(job_id, results, errors, log_label)
+    except Exception as e:
+        _fail(job_id, e)
+
+
+async def _execute_job_async(job_id: str, scrapers: list, parallel: bool, max_workers: int, log_label: str = None,
+                             run_options: dict = None):
+    """
+    Exécute un job directement dans la boucle asyncio de l'API (moteur async).
+    Les écritures SQLite (registre, événements) passent par des threads: la boucle reste libre.
+    """
+    await asyncio.to_thread(_start, job_id, scrapers)
+    run_options = _job_run_options(job_id, run_options)
+
+    try:
+        results, errors = await run_scrapers_async(
+            scrapers, label=log_label, on_result=_on_result(job_id), run_options=run_options,
+            parallel=parallel, max_workers=max_workers
+        )
+        await asyncio.to_thread(_finish, job_id, results, errors, log_label)
+    except Exception as e:
+        await asyncio.to_thread(_fail, job_id, e)
+
+
+def _enqueue_job(label: str, names: list = None, parallel: bool = False, max_workers: int = MAX_WORKERS, log_label: str = None,
+                 run_options: dict = None):
+    """
+    Crée un job pour les scrapers demandés et le lance en arrière-plan.
+
+    Args:
+        label: Libellé du job (ex: "GROUP1 (AU+IT)")
+        names: Noms des scrapers (None = tous)
+        parallel: Si True, lance les scrapers dans des processus séparés
+        max_workers: Nombre max de scrapers simultanés en mode parallèle
+        log_label: Préfixe des logs (ex: "GROUP1")
+        run_options: Options de lancement (voir get_run_options)
+
+    Returns:
+        JSONResponse 202 avec le job_id
+    """
+    scrapers = get_scrapers(names)
+    source_names = [name for name, _, _ in scrapers]
+
+    with _enqueue_lock:
+        # Un même scraper ne tourne jamais deux fois en même temps
+        busy = job_registry.get_active_sources().intersection(source_names)
+        if busy:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Scraper(s) déjà en cours d'exécution: {', '.join(sorted(busy))}"
+            )
+
+        run_options = dict(run_options or {})
+        engine = run_options.pop("engine", DEFAULT_ENGINE)
+        options = {"parallel": parallel, "max_workers": max_workers, "engine": engine, **run_options}
+        job = job_registry.create_job(label, source_names, options)
+
+    if engine == "async" and _event_loop is not None:
+        # Le job tourne dans la boucle de l'API: aucun thread bloqué
+        asyncio.run_coroutine_threadsafe(
+            _execute_job_async(job["job_id"], scrapers, parallel, max_workers, log_label, run_options), _event_loop
+        )
+    else:
+        job_executor.submit(_execute_job, job["job_id"], scrapers, parallel, max_workers, log_label, run_options)
+
+    return JSONResponse(status_code=202, content={
+        "status": "queued",
+        "job_id": job["job_id"],
+        "label": label,
+        "sources": source_names,
+        "job_url": f"/jobs/{job['job_id']}"
+    })
+
+
+@app.get("/jobs", tags=["Jobs"])
+def list_jobs(
+    state: str = Query(None, description="Filtrer par état (queued, running, completed, failed, interrupted)"),
+    limit: int = Query(50, ge=1, le=500, description="Nombre max de jobs")
+):
+    """Liste les jobs, du plus récent au plus ancien."""
+    return {"jobs": job_registry.list_jobs(state=state, limit=limit)}
+
+
+@app.get("/jobs/{job_id}", tags=["Jobs"])
+def get_job(job_id: str):
+    """État, progression, durées et résultats d'un job (dont les URLs non visitées par budget, par source)."""
+    job = job_registry.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job introuvable: {job_id}")
+    job["unvisited"] = progress_events.unvisited_urls(job_id)
+    return job
+
+
+def _format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+async def _stream_events(job_id: str, after_id: int):
+    """Générateur SSE: relit les événements du job jusqu'à sa fin."""
+    idle = 0.0
+    while True:
+        events = await asyncio.to_thread(progress_events.fetch_events, job_id, after_id)
+        for event in events:
+            after_id = event["id"]
+            yield _format_event(event)
+        if events:
+            idle = 0.0
+            continue
+
+        # Job terminé et tous ses événements envoyés: fin du flux
+        job = await asyncio.to_thread(job_registry.get_job, job_id)
+        if job is None or job["state"] not in job_registry.ACTIVE_STATES:
+            return
+
+        idle += EVENTS_POLL_SECONDS
+        if idle >= EVENTS_HEARTBEAT_SECONDS:
+            # Commentaire SSE: garde la connexion ouverte derrière les proxies
+            idle = 0.0
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+
+@app.get("/jobs/{job_id}/events", tags=["Jobs"])
+def stream_job_events(
+    job_id: str,
+    after: int = Query(0, ge=0, description="Reprendre après cet id d'événement"),
+    last_event_id: int = Header(None, description="Reconnexion EventSource (prioritaire sur after)")
+):
+    """
+    Progression du job en direct (Server-Sent Events).
+
+    Événements: job_started, source_started, merchant (index, total, codes, latence),
+    source_finished, source_result, job_finished. Le flux se ferme à la fin du job.
+    """
+    if job_registry.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job introuvable: {job_id}")
+    after_id = last_event_id if last_event_id is not None else after
+    return StreamingResponse(
+        _stream_events(job_id, after_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ===================================================================
@@ -62,62 +363,19 @@ def get_status():
 # ===================================================================
 
 @app.post("/scrape/au/lifehacker", tags=["🇦🇺 Australie"])
-def scrape_lifehacker_au():
+def scrape_lifehacker_au(run_options: dict = Depends(get_run_options)):
     """
     🇦🇺 Lance le scraper Lifehacker Australie.
-    
+
     Les codes sont écrits directement dans Google Sheets.
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Lifehacker AU"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        # Import et exécution du scraper
-        from AU.scrap_lifehacker_AU import main as scrape_lifehacker
-        scrape_lifehacker()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Lifehacker AU terminé", "source": "Lifehacker AU"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Lifehacker AU", ["AU/Lifehacker"], run_options=run_options)
 
 
 @app.post("/scrape/au/cuponation", tags=["🇦🇺 Australie"])
-def scrape_cuponation_au():
+def scrape_cuponation_au(run_options: dict = Depends(get_run_options)):
     """🇦🇺 Lance le scraper Cuponation Australie."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Cuponation AU"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from AU.scrap_cuponation_AU import main as scrape_cuponation
-        scrape_cuponation()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Cuponation AU terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Cuponation AU", ["AU/Cuponation"], run_options=run_options)
 
 
 # ===================================================================
@@ -125,57 +383,15 @@ def scrape_cuponation_au():
 # ===================================================================
 
 @app.post("/scrape/us/retailmenot", tags=["🇺🇸 USA"])
-def scrape_retailmenot_us():
+def scrape_retailmenot_us(run_options: dict = Depends(get_run_options)):
     """🇺🇸 Lance le scraper RetailMeNot USA."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "RetailMeNot US"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from US.scrap_retailmenot_US import main as scrape_retailmenot
-        scrape_retailmenot()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping RetailMeNot US terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("RetailMeNot US", ["US/RetailMeNot"], run_options=run_options)
 
 
 @app.post("/scrape/us/simplycodes", tags=["🇺🇸 USA"])
-def scrape_simplycodes_us():
+def scrape_simplycodes_us(run_options: dict = Depends(get_run_options)):
     """🇺🇸 Lance le scraper SimplyCodes USA."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "SimplyCodes US"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from US.scrap_simplycodes_US import main as scrape_simplycodes
-        scrape_simplycodes()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping SimplyCodes US terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("SimplyCodes US", ["US/SimplyCodes"], run_options=run_options)
 
 
 # ===================================================================
@@ -183,57 +399,15 @@ def scrape_simplycodes_us():
 # ===================================================================
 
 @app.post("/scrape/uk/hotukdeals", tags=["🇬🇧 UK"])
-def scrape_hotukdeals_uk():
+def scrape_hotukdeals_uk(run_options: dict = Depends(get_run_options)):
     """🇬🇧 Lance le scraper HotUKDeals UK."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "HotUKDeals UK"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from UK.scrap_hotukdeals_UK import main as scrape_hotukdeals
-        scrape_hotukdeals()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping HotUKDeals UK terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("HotUKDeals UK", ["UK/HotUKDeals"], run_options=run_options)
 
 
 @app.post("/scrape/uk/vouchercodes", tags=["🇬🇧 UK"])
-def scrape_vouchercodes_uk():
+def scrape_vouchercodes_uk(run_options: dict = Depends(get_run_options)):
     """🇬🇧 Lance le scraper VoucherCodes UK."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "VoucherCodes UK"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from UK.scrap_vouchercodes_UK import main as scrape_vouchercodes
-        scrape_vouchercodes()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping VoucherCodes UK terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("VoucherCodes UK", ["UK/VoucherCodes"], run_options=run_options)
 
 
 # ===================================================================
@@ -241,57 +415,15 @@ def scrape_vouchercodes_uk():
 # ===================================================================
 
 @app.post("/scrape/de/mydealz", tags=["🇩🇪 Allemagne"])
-def scrape_mydealz_de():
+def scrape_mydealz_de(run_options: dict = Depends(get_run_options)):
     """🇩🇪 Lance le scraper MyDealz Allemagne."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "MyDealz DE"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from DE.scrap_mydealz_DE import main as scrape_mydealz
-        scrape_mydealz()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping MyDealz DE terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("MyDealz DE", ["DE/MyDealz"], run_options=run_options)
 
 
 @app.post("/scrape/de/sparwelt", tags=["🇩🇪 Allemagne"])
-def scrape_sparwelt_de():
+def scrape_sparwelt_de(run_options: dict = Depends(get_run_options)):
     """🇩🇪 Lance le scraper Sparwelt Allemagne."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Sparwelt DE"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from DE.scrap_sparwelt_DE import main as scrape_sparwelt
-        scrape_sparwelt()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Sparwelt DE terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Sparwelt DE", ["DE/Sparwelt"], run_options=run_options)
 
 
 # ===================================================================
@@ -299,57 +431,15 @@ def scrape_sparwelt_de():
 # ===================================================================
 
 @app.post("/scrape/fr/igraal", tags=["🇫🇷 France"])
-def scrape_igraal_fr():
+def scrape_igraal_fr(run_options: dict = Depends(get_run_options)):
     """🇫🇷 Lance le scraper iGraal France."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "iGraal FR"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from FR.scrap_igraal_FR import main as scrape_igraal
-        scrape_igraal()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping iGraal FR terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("iGraal FR", ["FR/iGraal"], run_options=run_options)
 
 
 @app.post("/scrape/fr/mareduc", tags=["🇫🇷 France"])
-def scrape_mareduc_fr():
+def scrape_mareduc_fr(run_options: dict = Depends(get_run_options)):
     """🇫🇷 Lance le scraper Ma-Reduc France."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Ma-Reduc FR"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from FR.scrap_mareduc_FR import main as scrape_mareduc
-        scrape_mareduc()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Ma-Reduc FR terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Ma-Reduc FR", ["FR/Ma-Reduc"], run_options=run_options)
 
 
 # ===================================================================
@@ -357,57 +447,15 @@ def scrape_mareduc_fr():
 # ===================================================================
 
 @app.post("/scrape/es/chollometro", tags=["🇪🇸 Espagne"])
-def scrape_chollometro_es():
+def scrape_chollometro_es(run_options: dict = Depends(get_run_options)):
     """🇪🇸 Lance le scraper Chollometro Espagne."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Chollometro ES"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from ES.scrap_chollometro_ES import main as scrape_chollometro
-        scrape_chollometro()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Chollometro ES terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Chollometro ES", ["ES/Chollometro"], run_options=run_options)
 
 
 @app.post("/scrape/es/cuponation", tags=["🇪🇸 Espagne"])
-def scrape_cuponation_es():
+def scrape_cuponation_es(run_options: dict = Depends(get_run_options)):
     """🇪🇸 Lance le scraper Cuponation Espagne."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Cuponation ES"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from ES.scrap_cuponation_ES import main as scrape_cuponation
-        scrape_cuponation()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Cuponation ES terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Cuponation ES", ["ES/Cuponation"], run_options=run_options)
 
 
 # ===================================================================
@@ -415,57 +463,15 @@ def scrape_cuponation_es():
 # ===================================================================
 
 @app.post("/scrape/it/codicescontonet", tags=["🇮🇹 Italie"])
-def scrape_codicescontonet_it():
+def scrape_codicescontonet_it(run_options: dict = Depends(get_run_options)):
     """🇮🇹 Lance le scraper Codice-Sconto.net Italie."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Codicescontonet IT"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from IT.scrap_codicescontonet_IT import main as scrape_codicescontonet
-        scrape_codicescontonet()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Codicescontonet IT terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Codicescontonet IT", ["IT/Codicescontonet"], run_options=run_options)
 
 
 @app.post("/scrape/it/cuponation", tags=["🇮🇹 Italie"])
-def scrape_cuponation_it():
+def scrape_cuponation_it(run_options: dict = Depends(get_run_options)):
     """🇮🇹 Lance le scraper Cuponation Italie."""
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    try:
-        scraper_status["running"] = True
-        scraper_status["last_source"] = "Cuponation IT"
-        scraper_status["last_run"] = datetime.now().isoformat()
-        
-        from IT.scrap_cuponation_IT import main as scrape_cuponation
-        scrape_cuponation()
-        
-        scraper_status["last_result"] = "✅ Succès"
-        return {"status": "success", "message": "Scraping Cuponation IT terminé"}
-    
-    except Exception as e:
-        scraper_status["last_result"] = f"❌ Erreur: {str(e)[:100]}"
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("Cuponation IT", ["IT/Cuponation"], run_options=run_options)
 
 
 # ===================================================================
@@ -473,235 +479,89 @@ def scrape_cuponation_it():
 # ===================================================================
 
 @app.post("/scrape/group1", tags=["📦 Groupes"])
-def scrape_group1():
+def scrape_group1(
+    parallel: bool = Query(True, description="Lancer les scrapers en parallèle (processus séparés, parallel=false: l'un après l'autre)"),
+    max_workers: int = Query(MAX_WORKERS, ge=1, description="Nombre max de scrapers simultanés"),
+    run_options: dict = Depends(get_run_options)
+):
     """
     📦 Groupe 1: AU + IT (4 scrapers)
-    
+
     - 🇦🇺 Lifehacker AU
     - 🇦🇺 Cuponation AU
     - 🇮🇹 Codicescontonet IT
     - 🇮🇹 Cuponation IT
-    
-    ⏱️ Durée estimée: 30-45 minutes
+
+    ⏱️ Durée estimée: durée du scraper le plus long (parallel=false: 30-45 minutes)
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    results = []
-    errors = []
-    
-    scrapers = [
-        ("AU/Lifehacker", "AU.scrap_lifehacker_AU", "main"),
-        ("AU/Cuponation", "AU.scrap_cuponation_AU", "main"),
-        ("IT/Codicescontonet", "IT.scrap_codicescontonet_IT", "main"),
-        ("IT/Cuponation", "IT.scrap_cuponation_IT", "main"),
-    ]
-    
-    scraper_status["running"] = True
-    scraper_status["last_source"] = "GROUP1 (AU+IT)"
-    scraper_status["last_run"] = datetime.now().isoformat()
-    
-    try:
-        for name, module, func in scrapers:
-            try:
-                print(f"\n{'='*60}")
-                print(f"🚀 [GROUP1] Lancement de {name}...")
-                print(f"{'='*60}")
-                
-                mod = __import__(module, fromlist=[func])
-                getattr(mod, func)()
-                results.append(f"✅ {name}")
-            except Exception as e:
-                errors.append(f"❌ {name}: {str(e)[:50]}")
-        
-        scraper_status["last_result"] = f"GROUP1: ✅ {len(results)} succès, {len(errors)} erreurs"
-        
-        return {
-            "status": "completed",
-            "group": "GROUP1 (AU+IT)",
-            "success": results,
-            "errors": errors,
-            "total_success": len(results),
-            "total_errors": len(errors)
-        }
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job(
+        "GROUP1 (AU+IT)", SCRAPER_GROUPS["GROUP1"], parallel, max_workers,
+        log_label="GROUP1", run_options=run_options
+    )
 
 
 @app.post("/scrape/group2", tags=["📦 Groupes"])
-def scrape_group2():
+def scrape_group2(
+    parallel: bool = Query(True, description="Lancer les scrapers en parallèle (processus séparés, parallel=false: l'un après l'autre)"),
+    max_workers: int = Query(MAX_WORKERS, ge=1, description="Nombre max de scrapers simultanés"),
+    run_options: dict = Depends(get_run_options)
+):
     """
     📦 Groupe 2: UK + US (4 scrapers)
-    
+
     - 🇬🇧 HotUKDeals UK
     - 🇬🇧 VoucherCodes UK
     - 🇺🇸 RetailMeNot US
     - 🇺🇸 SimplyCodes US
-    
-    ⏱️ Durée estimée: 1h - 1h30
+
+    ⏱️ Durée estimée: durée du scraper le plus long (parallel=false: 1h - 1h30)
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    results = []
-    errors = []
-    
-    scrapers = [
-        ("UK/HotUKDeals", "UK.scrap_hotukdeals_UK", "main"),
-        ("UK/VoucherCodes", "UK.scrap_vouchercodes_UK", "main"),
-        ("US/RetailMeNot", "US.scrap_retailmenot_US", "main"),
-        ("US/SimplyCodes", "US.scrap_simplycodes_US", "main"),
-    ]
-    
-    scraper_status["running"] = True
-    scraper_status["last_source"] = "GROUP2 (UK+US)"
-    scraper_status["last_run"] = datetime.now().isoformat()
-    
-    try:
-        for name, module, func in scrapers:
-            try:
-                print(f"\n{'='*60}")
-                print(f"🚀 [GROUP2] Lancement de {name}...")
-                print(f"{'='*60}")
-                
-                mod = __import__(module, fromlist=[func])
-                getattr(mod, func)()
-                results.append(f"✅ {name}")
-            except Exception as e:
-                errors.append(f"❌ {name}: {str(e)[:50]}")
-        
-        scraper_status["last_result"] = f"GROUP2: ✅ {len(results)} succès, {len(errors)} erreurs"
-        
-        return {
-            "status": "completed",
-            "group": "GROUP2 (UK+US)",
-            "success": results,
-            "errors": errors,
-            "total_success": len(results),
-            "total_errors": len(errors)
-        }
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job(
+        "GROUP2 (UK+US)", SCRAPER_GROUPS["GROUP2"], parallel, max_workers,
+        log_label="GROUP2", run_options=run_options
+    )
 
 
 @app.post("/scrape/group3", tags=["📦 Groupes"])
-def scrape_group3():
+def scrape_group3(
+    parallel: bool = Query(True, description="Lancer les scrapers en parallèle (processus séparés, parallel=false: l'un après l'autre)"),
+    max_workers: int = Query(MAX_WORKERS, ge=1, description="Nombre max de scrapers simultanés"),
+    run_options: dict = Depends(get_run_options)
+):
     """
     📦 Groupe 3: DE + FR (4 scrapers)
-    
+
     - 🇩🇪 MyDealz DE
     - 🇩🇪 Sparwelt DE
     - 🇫🇷 iGraal FR
     - 🇫🇷 Ma-Reduc FR
-    
-    ⏱️ Durée estimée: 1h - 1h30
+
+    ⏱️ Durée estimée: durée du scraper le plus long (parallel=false: 1h - 1h30)
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    results = []
-    errors = []
-    
-    scrapers = [
-        ("DE/MyDealz", "DE.scrap_mydealz_DE", "main"),
-        ("DE/Sparwelt", "DE.scrap_sparwelt_DE", "main"),
-        ("FR/iGraal", "FR.scrap_igraal_FR", "main"),
-        ("FR/Ma-Reduc", "FR.scrap_mareduc_FR", "main"),
-    ]
-    
-    scraper_status["running"] = True
-    scraper_status["last_source"] = "GROUP3 (DE+FR)"
-    scraper_status["last_run"] = datetime.now().isoformat()
-    
-    try:
-        for name, module, func in scrapers:
-            try:
-                print(f"\n{'='*60}")
-                print(f"🚀 [GROUP3] Lancement de {name}...")
-                print(f"{'='*60}")
-                
-                mod = __import__(module, fromlist=[func])
-                getattr(mod, func)()
-                results.append(f"✅ {name}")
-            except Exception as e:
-                errors.append(f"❌ {name}: {str(e)[:50]}")
-        
-        scraper_status["last_result"] = f"GROUP3: ✅ {len(results)} succès, {len(errors)} erreurs"
-        
-        return {
-            "status": "completed",
-            "group": "GROUP3 (DE+FR)",
-            "success": results,
-            "errors": errors,
-            "total_success": len(results),
-            "total_errors": len(errors)
-        }
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job(
+        "GROUP3 (DE+FR)", SCRAPER_GROUPS["GROUP3"], parallel, max_workers,
+        log_label="GROUP3", run_options=run_options
+    )
 
 
 @app.post("/scrape/group4", tags=["📦 Groupes"])
-def scrape_group4():
+def scrape_group4(
+    parallel: bool = Query(True, description="Lancer les scrapers en parallèle (processus séparés, parallel=false: l'un après l'autre)"),
+    max_workers: int = Query(MAX_WORKERS, ge=1, description="Nombre max de scrapers simultanés"),
+    run_options: dict = Depends(get_run_options)
+):
     """
     📦 Groupe 4: ES (2 scrapers)
-    
+
     - 🇪🇸 Chollometro ES
     - 🇪🇸 Cuponation ES
-    
-    ⏱️ Durée estimée: 30-45 minutes
+
+    ⏱️ Durée estimée: durée du scraper le plus long (parallel=false: 30-45 minutes)
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    results = []
-    errors = []
-    
-    scrapers = [
-        ("ES/Chollometro", "ES.scrap_chollometro_ES", "main"),
-        ("ES/Cuponation", "ES.scrap_cuponation_ES", "main"),
-    ]
-    
-    scraper_status["running"] = True
-    scraper_status["last_source"] = "GROUP4 (ES)"
-    scraper_status["last_run"] = datetime.now().isoformat()
-    
-    try:
-        for name, module, func in scrapers:
-            try:
-                print(f"\n{'='*60}")
-                print(f"🚀 [GROUP4] Lancement de {name}...")
-                print(f"{'='*60}")
-                
-                mod = __import__(module, fromlist=[func])
-                getattr(mod, func)()
-                results.append(f"✅ {name}")
-            except Exception as e:
-                errors.append(f"❌ {name}: {str(e)[:50]}")
-        
-        scraper_status["last_result"] = f"GROUP4: ✅ {len(results)} succès, {len(errors)} erreurs"
-        
-        return {
-            "status": "completed",
-            "group": "GROUP4 (ES)",
-            "success": results,
-            "errors": errors,
-            "total_success": len(results),
-            "total_errors": len(errors)
-        }
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job(
+        "GROUP4 (ES)", SCRAPER_GROUPS["GROUP4"], parallel, max_workers,
+        log_label="GROUP4", run_options=run_options
+    )
 
 
 # ===================================================================
@@ -709,66 +569,21 @@ def scrape_group4():
 # ===================================================================
 
 @app.post("/scrape/all", tags=["🌍 Tous"])
-def scrape_all():
+def scrape_all(
+    parallel: bool = Query(True, description="Lancer les scrapers en parallèle (processus séparés, parallel=false: l'un après l'autre)"),
+    max_workers: int = Query(MAX_WORKERS, ge=1, description="Nombre max de scrapers simultanés"),
+    run_options: dict = Depends(get_run_options)
+):
     """
     🌍 Lance TOUS les scrapers (14 au total).
-    
+
     ⚠️ Attention: Cela peut prendre plusieurs minutes!
+
+    Par défaut, jusqu'à max_workers scrapers tournent en même temps (un processus
+    par scraper): le run dure à peu près le temps du scraper le plus long.
+    parallel=false les lance l'un après l'autre.
     """
-    global scraper_status
-    
-    if scraper_status["running"]:
-        raise HTTPException(status_code=409, detail="Un scraper est déjà en cours d'exécution")
-    
-    results = []
-    errors = []
-    
-    scrapers = [
-        ("AU/Lifehacker", "AU.scrap_lifehacker_AU", "main"),
-        ("AU/Cuponation", "AU.scrap_cuponation_AU", "main"),
-        ("US/RetailMeNot", "US.scrap_retailmenot_US", "main"),
-        ("US/SimplyCodes", "US.scrap_simplycodes_US", "main"),
-        ("UK/HotUKDeals", "UK.scrap_hotukdeals_UK", "main"),
-        ("UK/VoucherCodes", "UK.scrap_vouchercodes_UK", "main"),
-        ("DE/MyDealz", "DE.scrap_mydealz_DE", "main"),
-        ("DE/Sparwelt", "DE.scrap_sparwelt_DE", "main"),
-        ("FR/iGraal", "FR.scrap_igraal_FR", "main"),
-        ("FR/Ma-Reduc", "FR.scrap_mareduc_FR", "main"),
-        ("ES/Chollometro", "ES.scrap_chollometro_ES", "main"),
-        ("ES/Cuponation", "ES.scrap_cuponation_ES", "main"),
-        ("IT/Codicescontonet", "IT.scrap_codicescontonet_IT", "main"),
-        ("IT/Cuponation", "IT.scrap_cuponation_IT", "main"),
-    ]
-    
-    scraper_status["running"] = True
-    scraper_status["last_source"] = "ALL"
-    scraper_status["last_run"] = datetime.now().isoformat()
-    
-    try:
-        for name, module, func in scrapers:
-            try:
-                print(f"\n{'='*60}")
-                print(f"🚀 Lancement de {name}...")
-                print(f"{'='*60}")
-                
-                mod = __import__(module, fromlist=[func])
-                getattr(mod, func)()
-                results.append(f"✅ {name}")
-            except Exception as e:
-                errors.append(f"❌ {name}: {str(e)[:50]}")
-        
-        scraper_status["last_result"] = f"✅ {len(results)} succès, {len(errors)} erreurs"
-        
-        return {
-            "status": "completed",
-            "success": results,
-            "errors": errors,
-            "total_success": len(results),
-            "total_errors": len(errors)
-        }
-    
-    finally:
-        scraper_status["running"] = False
+    return _enqueue_job("ALL", None, parallel, max_workers, run_options=run_options)
 
 
 if __name__ == "__main__":
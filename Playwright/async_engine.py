@@ -0,0 +1,352 @@
+"""
+Moteur de scraping asyncio (playwright.async_api).
+
+Le runner sync pilote une page à la fois par thread et passe l'essentiel de son temps
+bloqué dans wait_for_timeout. Ici, une seule boucle asyncio pilote des dizaines de pages:
+- Chaque marchand a son propre contexte (cookies et onglets isolés, context.expect_page sûr)
+- Un asyncio.Semaphore par domaine limite le nombre de pages simultanées sur un même site
+- Un plafond global (ASYNC_MAX_PAGES) limite la mémoire du navigateur
+
+Seules les sources qui ont une version async de leur scrape_*_all (registre ASYNC_SCRAPERS,
+même déroulé que la version sync via dual_flow) tournent dans la boucle; les autres passent par le runner sync dans un thread (chacune avec
+son Chromium), au plus max_workers à la fois comme scraper_pool.run_scrapers.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from browser_pool import get_pool
+from scraper_pool import MAX_WORKERS, run_scraper, share_run_options
+import checkpoint
+import consent_state
+import http_fastpath
+import network_policy
+import planner
+import progress_events
+import selector_cascade
+import waits
+from records import build_records, partial_records
+from scraper_runner import (CRASH_MARKERS, DEFAULT_CONTEXT_OPTIONS, INCREMENTAL_ENABLED, RESUME_ENABLED,
+                            chain_callbacks, load_items, open_sink, plan_for_deadline, record_merchant,
+                            report_unvisited, resume_items, skip_fresh_items, write_results)
+
+# Pages simultanées max par domaine (surchargeable par source: "domain_concurrency")
+DOMAIN_CONCURRENCY = int(os.environ.get("ASYNC_DOMAIN_CONCURRENCY", "6"))
+
+# Pages simultanées max pour tout le process
+MAX_PAGES = int(os.environ.get("ASYNC_MAX_PAGES", "32"))
+
+# ===================================================================
+# REGISTRE DES SCRAPERS ASYNC: nom scraper_pool -> (module, fonction async)
+# ===================================================================
+
+ASYNC_SCRAPERS = {
+    "AU/Lifehacker": ("AU.scrap_lifehacker_AU", "scrape_lifehacker_all_async"),
+    "US/RetailMeNot": ("US.scrap_retailmenot_US", "scrape_retailmenot_all_async"),
+    "US/SimplyCodes": ("US.scrap_simplycodes_US", "scrape_simplycodes_all_async"),
+}
+
+# Sémaphores par boucle asyncio (un asyncio.Semaphore est lié à sa boucle)
+_loop_limits = weakref.WeakKeyDictionary()
+
+
+def _limits():
+    """Retourne (sémaphore global, sémaphores par domaine) de la boucle courante."""
+    loop = asyncio.get_running_loop()
+    if loop not in _loop_limits:
+        _loop_limits[loop] = (asyncio.Semaphore(MAX_PAGES), {})
+    return _loop_limits[loop]
+
+
+def domain_semaphore(url: str, limit: int = None) -> asyncio.Semaphore:
+    """Sémaphore partagé par toutes les pages d'un même domaine (toutes sources confondues)."""
+    domain = urlparse(url).netloc.lower().removeprefix("www.")
+    _, domains = _limits()
+    if domain not in domains:
+        domains[domain] = asyncio.Semaphore(limit or DOMAIN_CONCURRENCY)
+    return domains[domain]
+
+
+async def _scrape_merchant(browser, source: dict, scrape_func, idx: int, merchant_row: dict, url: str, total: int,
+                           on_merchant=None, deadline: float = None):
+    """
+    Scrape un marchand dans un contexte neuf, sous les limites domaine + globale.
+    on_merchant, deadline: comme scraper_runner._scrape_items (None si le marchand n'est pas visité)
+    on_merchant est bloquant (SQLite, sink): il tourne dans un thread pour ne pas bloquer la boucle.
+    """
+    context_options = {**DEFAULT_CONTEXT_OPTIONS, **source.get("context_options", {})}
+    max_retries = source.get("max_retries", 1)
+    merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
+    prefix = f"[{source['name']}] [{idx}/{total}]"
+    global_limit, _ = _limits()
+
+    async with domain_semaphore(url, source.get("domain_concurrency")), global_limit:
+        if deadline and time.time() >= deadline - planner.WRITE_MARGIN_SECONDS:
+            return None
+
+        print(f"{prefix} 🏪 {merchant_slug}")
+        started = time.monotonic()
+
+        # Mode HTTP (codes dans le HTML statique): pas de contexte navigateur si le parse suffit
+        fast = await http_fastpath.scrape_async(source, url)
+        if fast:
+            codes, affiliate_link = fast
+            print(f"{prefix} ⚡ {len(codes)} codes trouvés (HTTP)")
+            rows = build_records(source, merchant_row, url, codes, affiliate_link)
+            if on_merchant:
+                await asyncio.to_thread(on_merchant, idx, merchant_row, url, rows, True, time.monotonic() - started)
+            return idx, rows
+
+        for attempt in range(max_retries):
+            options = await asyncio.to_thread(consent_state.with_storage_state, context_options, url)
+            context = await browser.new_context(**options)
+            consent_state.tag_context(context, options, url)
+            try:
+                if source.get("init_script"):
+                    await context.add_init_script(source["init_script"])
+                net_stats = await network_policy.install_async(context, source)
+                page = await context.new_page()
+                codes, affiliate_link = await scrape_func(page, context, url)
+                print(f"{prefix} ✅ {len(codes)} codes trouvés")
+                if net_stats:
+                    print(f"{prefix} {network_policy.format_stats(net_stats.take())}")
+                rows = build_records(source, merchant_row, url, codes, affiliate_link)
+                if on_merchant:
+                    await asyncio.to_thread(on_merchant, idx, merchant_row, url, rows, True,
+                                            time.monotonic() - started)
+                return idx, rows
+
+            except Exception as e:
+                error_msg = str(e)
+                if attempt < max_retries - 1 and any(marker in error_msg for marker in CRASH_MARKERS):
+                    print(f"{prefix} ⚠️ Page crashed (attempt {attempt + 1}/{max_retries}), nouveau contexte...")
+                    continue
+                # Codes récupérés avant l'erreur (ScrapeFailed): écrits, mais ni checkpoint ni ledger
+                rows = partial_records(e, source, merchant_row, url)
+                print(f"{prefix} ❌ Erreur: {error_msg[:50]} ({len(rows)} codes avant l'erreur)")
+                if on_merchant:
+                    await asyncio.to_thread(on_merchant, idx, merchant_row, url, rows, False,
+                                            time.monotonic() - started)
+                return idx, rows
+            finally:
+                try:
+                    await context.close()
+                except:
+                    pass
+    return idx, []
+
+
+@asynccontextmanager
+async def open_async_browser(browser_args: list = None):
+    """
+    Navigateur async: navigateur du pool (connect_over_cdp) si disponible,
+    sinon Chromium dédié. Même règle que browser_pool.open_browser.
+    """
+    pool = None if browser_args else get_pool()
+
+    async with async_playwright() as p:
+        if pool is None:
+            browser = await p.chromium.launch(headless=True, args=browser_args)
+            try:
+                yield browser
+            finally:
+                await browser.close()
+            return
+
+        # acquire() fait des health checks HTTP bloquants
+        pooled = await asyncio.to_thread(pool.acquire)
+        try:
+            browser = await p.chromium.connect_over_cdp(pooled.endpoint)
+            try:
+                yield browser
+            finally:
+                await browser.close()
+        finally:
+            pool.release(pooled)
+
+
+async def run_source_async(source: dict, scrape_func, browser=None, resume: bool = None, incremental: bool = None,
+                           ttl_hours: float = None, budget_minutes: float = None, deadline: float = None,
+                           job_id: str = None):
+    """
+    Version async de scraper_runner.run_source: tous les marchands de la source
+    sont lancés en même temps, bornés par les sémaphores.
+
+    Args:
+        source: Descripteur de la source (voir scraper_runner)
+        scrape_func: Coroutine scrape_*_all_async(page, context, url) -> (codes, affiliate_link)
+        browser: Navigateur async déjà lancé (partagé entre sources), sinon lancé ici
+        resume, incremental, ttl_hours, budget_minutes, deadline, job_id: Voir scraper_runner.run_source
+
+    Returns:
+        int: Nombre de codes récupérés (avant nettoyage)
+    """
+    items = await asyncio.to_thread(load_items, source)
+    if not items:
+        await asyncio.to_thread(progress_events.emit, job_id, "source_finished", {"source": source["name"], "codes": 0})
+        return 0
+
+    total = len(items)
+    resumed_rows = []
+    if resume is None:
+        resume = RESUME_ENABLED
+    if incremental is None:
+        incremental = INCREMENTAL_ENABLED
+    deadline = planner.deadline_from_budget(budget_minutes, deadline)
+    run_id = checkpoint.new_run_id()
+
+    if resume:
+        items, resumed_rows = await asyncio.to_thread(resume_items, source, items)
+    if incremental:
+        items, cached_rows = await asyncio.to_thread(skip_fresh_items, source, items, ttl_hours)
+        resumed_rows += cached_rows
+
+    planned, cut = items, []
+    if deadline and items:
+        workers = source.get("domain_concurrency") or DOMAIN_CONCURRENCY
+        planned, cut = await asyncio.to_thread(plan_for_deadline, source, items, deadline, workers)
+
+    await asyncio.to_thread(progress_events.emit, job_id, "source_started", {
+        "source": source["name"], "total": total, "reused": len(resumed_rows), "to_scrape": len(planned)
+    })
+    # Écriture en flux (voir scraper_runner.open_sink): sink en dernier dans la chaîne
+    sink = open_sink(source)
+    if sink is not None:
+        await asyncio.to_thread(sink.feed, resumed_rows)
+    on_merchant = chain_callbacks(
+        record_merchant(source, run_id),
+        progress_events.merchant_progress(job_id, source, total, already_done=len(resumed_rows)) if job_id else None,
+        sink.on_merchant if sink is not None else None
+    )
+
+    async def scrape_all(browser):
+        outcomes = await asyncio.gather(*[
+            _scrape_merchant(browser, source, scrape_func, idx, merchant_row, url, total, on_merchant, deadline)
+            for idx, merchant_row, url in planned
+        ])
+        return [outcome for outcome in outcomes if outcome is not None]
+
+    try:
+        if not planned:
+            merchant_rows = []
+        elif browser is None:
+            async with open_async_browser(source.get("browser_args")) as own_browser:
+                merchant_rows = await scrape_all(own_browser)
+        else:
+            merchant_rows = await scrape_all(browser)
+    except BaseException:
+        # Les lignes déjà reçues sont écrites malgré l'erreur
+        if sink is not None:
+            await asyncio.to_thread(sink.close)
+        raise
+
+    unvisited = []
+    if deadline:
+        unvisited = await asyncio.to_thread(report_unvisited, source, run_id, deadline, planned, cut, merchant_rows)
+
+    codes = await asyncio.to_thread(write_results, source, resumed_rows + merchant_rows, not unvisited, sink)
+    print(waits.format_wait_stats(waits.get_wait_stats(reset=True)))
+    await asyncio.to_thread(selector_cascade.flush)
+    await asyncio.to_thread(progress_events.emit, job_id, "source_finished", {
+        "source": source["name"], "codes": codes, "complete": not unvisited, "unvisited": unvisited
+    })
+    return codes
+
+
+async def _run_one(name: str, module: str, func: str, browser, label: str = None, run_options: dict = None):
+    """Lance une source: dans la boucle si elle a une version async, sinon runner sync dans un thread."""
+    if name not in ASYNC_SCRAPERS:
+        return await asyncio.to_thread(run_scraper, name, module, func, label, run_options)
+
+    async_module, async_func = ASYNC_SCRAPERS[name]
+    prefix = f"[{label}] " if label else ""
+    print(f"\n{'='*60}")
+    print(f"🚀 {prefix}Lancement de {name} (async)...")
+    print(f"{'='*60}")
+
+    start = time.monotonic()
+    try:
+        mod = __import__(async_module, fromlist=[async_func])
+        # Options du runner qui s'appliquent aussi au moteur async (pas de shards)
+        options = {key: value for key, value in (run_options or {}).items() if key != "shards"}
+        await run_source_async(mod.SOURCE, getattr(mod, async_func), browser=browser, **options)
+        return f"✅ {name}", None, time.monotonic() - start
+    except Exception as e:
+        return None, f"❌ {name}: {str(e)[:50]}", time.monotonic() - start
+
+
+async def run_scrapers_async(scrapers: list, label: str = None, on_result=None, run_options: dict = None,
+                             parallel: bool = True, max_workers: int = None):
+    """
+    Équivalent async de scraper_pool.run_scrapers: les sources async tournent en même
+    temps dans la boucle courante, sur un navigateur partagé; les sources sync tournent
+    dans des threads, au plus `max_workers` à la fois (une seule si parallel=False).
+
+    Args:
+        scrapers: Liste de tuples (nom, module, fonction) de scraper_pool
+        label: Préfixe pour les logs (ex: "GROUP1")
+        on_result: Callback (nom, succès, erreur, durée) appelé à la fin de chaque source
+                   (dans un thread: il peut écrire dans SQLite sans bloquer la boucle)
+        run_options: Options du runner (shards: sources sans version async uniquement)
+        parallel: Si False, les sources sync tournent l'une après l'autre
+        max_workers: Nombre max de sources sync simultanées (défaut: MAX_WORKERS)
+
+    Returns:
+        Tuple (results, errors) dans l'ordre de `scrapers`
+    """
+    workers = max(1, max_workers or MAX_WORKERS) if parallel else 1
+    sync_limit = asyncio.Semaphore(workers)
+    # Sources sync pas encore terminées: chacune démarre avec sa part du budget restant
+    sync_left = sum(1 for name, _, _ in scrapers if name not in ASYNC_SCRAPERS)
+
+    async def run_sync_source(name, module, func):
+        nonlocal sync_left
+        async with sync_limit:
+            options = share_run_options(run_options, sync_left, workers)
+            try:
+                return await _run_one(name, module, func, None, label, options)
+            finally:
+                sync_left -= 1
+
+    async def run_and_report(browser, name, module, func):
+        if name in ASYNC_SCRAPERS:
+            outcome = await _run_one(name, module, func, browser, label, run_options)
+        else:
+            outcome = await run_sync_source(name, module, func)
+        if on_result:
+            await asyncio.to_thread(on_result, name, *outcome)
+        return outcome
+
+    async def run_all(browser):
+        return await asyncio.gather(*[
+            run_and_report(browser, name, module, func) for name, module, func in scrapers
+        ])
+
+    # Pas de navigateur async si aucune source n'a de version async
+    if any(name in ASYNC_SCRAPERS for name, _, _ in scrapers):
+        async with open_async_browser() as browser:
+            outcomes = await run_all(browser)
+    else:
+        outcomes = await run_all(None)
+
+    results = [success for success, _, _ in outcomes if success]
+    errors = [error for success, error, _ in outcomes if not success]
+    return results, errors
+
+
+if __name__ == "__main__":
+    # Usage: python async_engine.py [AU/Lifehacker US/RetailMeNot ...]
+    from scraper_pool import get_scrapers
+
+    names = sys.argv[1:] or list(ASYNC_SCRAPERS)
+    results, errors = asyncio.run(run_scrapers_async(get_scrapers(names)))
+    print(f"\n✅ {len(results)} succès, ❌ {len(errors)} erreurs")
+    for error in errors:
+        print(error)
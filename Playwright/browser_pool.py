@@ -0,0 +1,321 @@
+"""
+Pool de navigateurs Chromium partagés entre les scrapers.
+
+Le pool lance N processus Chromium une seule fois (par run ou par process API) avec
+un port de debug CDP. Chaque scraper s'y connecte (connect_over_cdp) et reçoit un
+contexte isolé (cookies, cache, onglets): plus de lancement de navigateur par source.
+
+- Health check: GET /json/version sur le port CDP avant chaque attribution
+- Recyclage: un navigateur est relancé après RECYCLE_AFTER contextes ou s'il ne répond plus
+- Processus workers: les endpoints sont transmis via la variable SCRAPER_BROWSER_POOL,
+  les workers s'y connectent sans relancer de navigateur. Leurs contextes ne passent pas
+  par les compteurs du process parent: un navigateur n'est recyclé pour usure que si
+  aucune page n'y est ouverte (GET /json/list), et il est relancé sur le même port pour
+  que les endpoints déjà transmis restent valides (republiés après chaque recyclage)
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+# Nombre de navigateurs du pool (0 = pas de pool, chaque scraper lance son navigateur)
+POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "0"))
+
+# Relancer un navigateur après N contextes attribués (limite les fuites mémoire)
+RECYCLE_AFTER = int(os.environ.get("BROWSER_POOL_RECYCLE_AFTER", "50"))
+
+# Variable d'environnement qui transmet les endpoints CDP aux processus workers
+POOL_ENV_VAR = "SCRAPER_BROWSER_POOL"
+
+# Arguments Chromium des navigateurs du pool
+POOL_BROWSER_ARGS = [
+    "--headless=new",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+]
+
+# Délai max pour qu'un navigateur lancé réponde sur son port CDP
+STARTUP_TIMEOUT = 15
+
+
+def _free_port() -> int:
+    """Retourne un port TCP libre sur localhost."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _chromium_executable() -> str:
+    """Chemin du Chromium installé par Playwright."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def open_pages(endpoint: str, timeout: float = 2):
+    """Nombre de pages ouvertes sur le navigateur, tous process confondus (None si injoignable)."""
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/list", timeout=timeout) as response:
+            return sum(1 for target in json.loads(response.read()) if target.get("type") == "page")
+    except Exception:
+        return None
+
+
+def is_healthy(endpoint: str, timeout: float = 2) -> bool:
+    """Vérifie qu'un navigateur répond sur son endpoint CDP."""
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/version", timeout=timeout) as response:
+            return "Browser" in json.loads(response.read())
+    except Exception:
+        return False
+
+
+class PooledBrowser:
+    """Un navigateur du pool: endpoint CDP + compteurs d'utilisation."""
+
+    def __init__(self, endpoint: str, process=None, user_data_dir: str = None):
+        self.endpoint = endpoint
+        self.process = process              # None si le navigateur appartient à un autre process
+        self.user_data_dir = user_data_dir
+        self.active = 0                     # Contextes en cours sur ce navigateur
+        self.leases = 0                     # Contextes attribués depuis le (re)lancement
+
+    @property
+    def owned(self) -> bool:
+        return self.process is not None
+
+
+class BrowserPool:
+    """
+    Pool de navigateurs Chromium joignables en CDP.
+
+    Usage:
+        pool = BrowserPool(size=3).start()
+        with pool.lease() as endpoint:
+            browser = p.chromium.connect_over_cdp(endpoint)
+        pool.close()
+    """
+
+    def __init__(self, size: int = None, recycle_after: int = RECYCLE_AFTER, browser_args: list = None):
+        self.size = size or POOL_SIZE or 1
+        self.recycle_after = recycle_after
+        self.browser_args = POOL_BROWSER_ARGS + (browser_args or [])
+        self.browsers = []
+        self.published = False              # Endpoints publiés pour les processus workers
+        self._executable = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_endpoints(cls, endpoints: list):
+        """Pool "client" sur des navigateurs lancés par un autre process (pas de recyclage)."""
+        pool = cls(size=len(endpoints))
+        pool.browsers = [PooledBrowser(endpoint) for endpoint in endpoints]
+        return pool
+
+    @property
+    def endpoints(self) -> list:
+        return [b.endpoint for b in self.browsers]
+
+    def _launch(self, port: int = None) -> PooledBrowser:
+        """Lance un Chromium avec un port CDP (défaut: port libre) et attend qu'il réponde."""
+        if self._executable is None:
+            self._executable = _chromium_executable()
+
+        port = port or _free_port()
+        user_data_dir = tempfile.mkdtemp(prefix="scraper-pool-")
+        process = subprocess.Popen(
+            [self._executable, f"--remote-debugging-port={port}", f"--user-data-dir={user_data_dir}",
+             *self.browser_args, "about:blank"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        endpoint = f"http://127.0.0.1:{port}"
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if is_healthy(endpoint, timeout=1):
+                return PooledBrowser(endpoint, process, user_data_dir)
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+
+        self._kill(PooledBrowser(endpoint, process, user_data_dir))
+        raise RuntimeError(f"Chromium du pool non joignable sur {endpoint}")
+
+    @staticmethod
+    def _kill(browser: PooledBrowser):
+        """Arrête un navigateur du pool et supprime son profil temporaire."""
+        if browser.process is not None:
+            try:
+                browser.process.terminate()
+                browser.process.wait(timeout=10)
+            except Exception:
+                browser.process.kill()
+        if browser.user_data_dir:
+            shutil.rmtree(browser.user_data_dir, ignore_errors=True)
+
+    def start(self):
+        """Lance les navigateurs du pool."""
+        print(f"🌐 Lancement du pool de navigateurs ({self.size} Chromium)...")
+        self.browsers = [self._launch() for _ in range(self.size)]
+        return self
+
+    def publish(self):
+        """Publie les endpoints pour les processus workers (hérités via l'environnement)."""
+        os.environ[POOL_ENV_VAR] = ",".join(self.endpoints)
+        self.published = True
+
+    def _recycle(self, index: int, reason: str):
+        old = self.browsers[index]
+        print(f"♻️ Recyclage du navigateur {index + 1} du pool ({reason})")
+        self._kill(old)
+        # Même port: les workers qui ont reçu l'endpoint peuvent toujours s'y connecter
+        try:
+            self.browsers[index] = self._launch(port=int(old.endpoint.rsplit(":", 1)[1]))
+        except RuntimeError:
+            self.browsers[index] = self._launch()
+        if self.published:
+            self.publish()
+
+    @staticmethod
+    def _in_use(browser: PooledBrowser) -> bool:
+        """True si un contexte est ouvert sur le navigateur, dans ce process ou dans un worker."""
+        if browser.active:
+            return True
+        # Seule la page about:blank du lancement: aucun contexte de scraper
+        pages = open_pages(browser.endpoint)
+        return pages is None or pages > 1
+
+    def acquire(self) -> PooledBrowser:
+        """
+        Attribue le navigateur sain le moins chargé.
+        Les navigateurs morts, ou usés (RECYCLE_AFTER) et inutilisés, sont relancés au passage.
+        """
+        with self._lock:
+            for index, browser in enumerate(self.browsers):
+                if not browser.owned:
+                    continue
+                if not is_healthy(browser.endpoint):
+                    self._recycle(index, "health check KO")
+                elif browser.leases >= self.recycle_after and not self._in_use(browser):
+                    self._recycle(index, f"{browser.leases} contextes")
+
+            candidates = [b for b in self.browsers if b.owned or is_healthy(b.endpoint)]
+            if not candidates:
+                raise RuntimeError("Aucun navigateur disponible dans le pool")
+
+            browser = min(candidates, key=lambda b: (b.active, b.leases))
+            browser.active += 1
+            browser.leases += 1
+            return browser
+
+    def release(self, browser: PooledBrowser):
+        with self._lock:
+            browser.active = max(0, browser.active - 1)
+
+    @contextmanager
+    def lease(self):
+        """Context manager: attribue un navigateur et retourne son endpoint CDP."""
+        browser = self.acquire()
+        try:
+            yield browser.endpoint
+        finally:
+            self.release(browser)
+
+    def stats(self) -> list:
+        """État des navigateurs du pool (pour /status)."""
+        return [
+            {"endpoint": b.endpoint, "active_contexts": b.active, "leases": b.leases, "owned": b.owned}
+            for b in self.browsers
+        ]
+
+    def close(self):
+        """Arrête tous les navigateurs possédés par ce pool."""
+        for browser in self.browsers:
+            if browser.owned:
+                self._kill(browser)
+        self.browsers = []
+
+
+# ===================================================================
+# POOL DU PROCESS
+# ===================================================================
+
+_pool = None
+
+
+def get_pool():
+    """
+    Retourne le pool du process courant:
+    - celui démarré par start_pool() (process API ou run standalone)
+    - sinon un pool client sur les endpoints hérités du process parent
+    - sinon None (pas de pool)
+    """
+    global _pool
+    if _pool is None and os.environ.get(POOL_ENV_VAR):
+        _pool = BrowserPool.from_endpoints(os.environ[POOL_ENV_VAR].split(","))
+    return _pool
+
+
+def start_pool(size: int = None) -> BrowserPool:
+    """Démarre le pool du process et publie ses endpoints pour les processus workers."""
+    global _pool
+    _pool = BrowserPool(size=size).start()
+    _pool.publish()
+    return _pool
+
+
+def stop_pool():
+    """Arrête le pool du process (si ce process l'a démarré)."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+    os.environ.pop(POOL_ENV_VAR, None)
+
+
+def uses_pool(browser_args: list = None) -> bool:
+    """True si open_browser fournira un navigateur du pool (partagé) plutôt qu'un navigateur dédié."""
+    return not browser_args and get_pool() is not None
+
+
+@contextmanager
+def open_browser(playwright, browser_args: list = None):
+    """
+    Fournit un navigateur au scraper: connexion au pool si disponible,
+    sinon lancement d'un Chromium dédié (comportement historique).
+
+    Les sources avec des browser_args spécifiques (ex: stealth VoucherCodes) ont
+    toujours un navigateur dédié: les navigateurs du pool sont lancés sans ces options.
+
+    Yields:
+        Browser Playwright (fermer les contextes créés reste à la charge de l'appelant)
+    """
+    pool = None if browser_args else get_pool()
+
+    if pool is None:
+        browser = playwright.chromium.launch(headless=True, args=browser_args)
+        try:
+            yield browser
+        finally:
+            browser.close()
+        return
+
+    with pool.lease() as endpoint:
+        browser = playwright.chromium.connect_over_cdp(endpoint)
+        try:
+            yield browser
+        finally:
+            # Sur un navigateur connecté en CDP, close() ferme nos contextes et se déconnecte
+            # sans arrêter le navigateur du pool
+            browser.close()
@@ -0,0 +1,121 @@
+"""
+Checkpoints par URL des runs de scraping (persistés dans SQLite via state_store).
+
+Chaque marchand terminé est enregistré avec ses lignes Missing_Code. Si le run
+s'arrête avant l'écriture Google Sheets (crash, timeout Cloud Run), un nouveau run
+de la même source le même jour reprend là où le précédent s'est arrêté.
+Une fois les résultats écrits, le checkpoint de la source est effacé; si le run était
+partiel (budget de temps), il est gardé mais vidé de ses lignes déjà écrites.
+En flux (result_pipeline), les lignes sont vidées URL par URL à chaque lot écrit: un run
+interrompu ne réécrit pas à la reprise ce qui est déjà dans Google Sheets.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from state_store import get_connection
+
+# Checkpoints gardés N jours (runs jamais repris), purgés à la fin de chaque source
+KEEP_DAYS = int(os.environ.get("CHECKPOINT_KEEP_DAYS", "7"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    source TEXT NOT NULL,
+    run_day TEXT NOT NULL,
+    url TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (source, run_day, url)
+);
+"""
+
+
+def _connect():
+    return get_connection("checkpoints", _SCHEMA)
+
+
+def _today() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def load_checkpoint(source: str, day: str = None) -> dict:
+    """
+    URLs déjà terminées pour une source et un jour.
+
+    Returns:
+        Dict {url: {"run_id": ..., "rows": [lignes Missing_Code]}}
+    """
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT url, run_id, rows FROM checkpoints WHERE source = ? AND run_day = ?",
+            (source, day or _today())
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["url"]: {"run_id": row["run_id"], "rows": json.loads(row["rows"])} for row in rows}
+
+
+def save_url(source: str, url: str, run_id: str, rows: list, day: str = None):
+    """Enregistre une URL terminée et ses lignes (appelé après chaque marchand)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (source, run_day, url, run_id, rows, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (source, day or _today(), url, run_id, json.dumps(rows), datetime.now().isoformat(timespec="seconds"))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def clear_checkpoint(source: str, day: str = None):
+    """Efface le checkpoint d'une source (run terminé et écrit)."""
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM checkpoints WHERE source = ? AND run_day = ?", (source, day or _today()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def mark_written(source: str, day: str = None, urls=None):
+    """
+    Run partiel écrit: les URLs restent terminées pour la reprise, mais leurs lignes
+    (déjà dans Google Sheets) ne seront pas réécrites.
+
+    Args:
+        urls: URLs dont les lignes sont écrites (défaut: toutes celles de la source)
+    """
+    day = day or _today()
+    conn = _connect()
+    try:
+        if urls is None:
+            conn.execute("UPDATE checkpoints SET rows = '[]' WHERE source = ? AND run_day = ?", (source, day))
+        else:
+            conn.executemany(
+                "UPDATE checkpoints SET rows = '[]' WHERE source = ? AND run_day = ? AND url = ?",
+                [(source, day, url) for url in urls]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def purge_checkpoints(keep_days: int = None) -> int:
+    """Supprime les checkpoints de plus de `keep_days` jours (défaut: KEEP_DAYS)."""
+    limit = (datetime.now() - timedelta(days=KEEP_DAYS if keep_days is None else keep_days)).strftime("%Y-%m-%d")
+    conn = _connect()
+    try:
+        cursor = conn.execute("DELETE FROM checkpoints WHERE run_day < ?", (limit,))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
@@ -0,0 +1,236 @@
+"""
+Consentement cookies persisté par domaine concurrent (storage_state Playwright).
+
+Sans cache, chaque marchand paie une tentative de clic sur la bannière cookies (jusqu'à
+3s de timeout quand elle n'apparaît pas). Après le premier consentement réussi sur un
+domaine, les cookies et le localStorage de ce domaine sont enregistrés dans SQLite
+(via state_store), puis chargés dans les nouveaux contextes (option storage_state):
+- accept_consent ne tente plus le clic dans les contextes créés avec ce consentement
+  (marqués par tag_context), pour le reste du run et pour les runs suivants; un contexte
+  créé sans (ex: ouvert avant qu'un autre shard n'enregistre le consentement) attend la
+  bannière comme avant
+- l'état expire après CONSENT_TTL_HOURS (la bannière est alors de nouveau acceptée)
+- seuls les cookies / origines du domaine concurrent sont gardés (pas ceux des marchands)
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+
+from politeness import get_domain
+from state_store import get_connection
+from waits import wait_hidden, wait_hidden_async
+
+# Désactivable pour le debug (CONSENT_STATE_ENABLED=0)
+CONSENT_STATE_ENABLED = os.environ.get("CONSENT_STATE_ENABLED", "1") != "0"
+
+# Durée de validité d'un consentement enregistré
+CONSENT_TTL_HOURS = float(os.environ.get("CONSENT_TTL_HOURS", "72"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consent_states (
+    domain TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+"""
+
+# Cache du process: {domaine: (saved_at, storage_state)}
+_cache = {}
+_cache_lock = threading.Lock()
+
+# Contextes qui portent le consentement: {contexte: domaine}
+_consented = weakref.WeakKeyDictionary()
+
+
+def _connect():
+    return get_connection("consent_states", _SCHEMA)
+
+
+def _matches(host: str, domain: str) -> bool:
+    host = host.lstrip(".").removeprefix("www.")
+    return host == domain or host.endswith("." + domain)
+
+
+def _expired(saved_at: float) -> bool:
+    return time.time() - saved_at > CONSENT_TTL_HOURS * 3600
+
+
+def filter_state(state: dict, domain: str) -> dict:
+    """Garde uniquement les cookies et origines du domaine (et de ses sous-domaines)."""
+    return {
+        "cookies": [c for c in state.get("cookies", []) if _matches(c.get("domain", ""), domain)],
+        "origins": [o for o in state.get("origins", []) if _matches(get_domain(o.get("origin", "")), domain)],
+    }
+
+
+def load(domain: str):
+    """
+    storage_state enregistré pour un domaine.
+
+    Returns:
+        Dict {"cookies": [...], "origins": [...]}, ou None si absent ou expiré
+    """
+    with _cache_lock:
+        cached = _cache.get(domain)
+    if cached:
+        return None if _expired(cached[0]) else cached[1]
+
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT state, saved_at FROM consent_states WHERE domain = ?", (domain,)).fetchone()
+    finally:
+        conn.close()
+    if not row or _expired(row["saved_at"]):
+        return None
+
+    state = json.loads(row["state"])
+    with _cache_lock:
+        _cache[domain] = (row["saved_at"], state)
+    return state
+
+
+def save(domain: str, state: dict):
+    """Enregistre le storage_state d'un domaine (filtré) sur disque et dans le cache."""
+    state = filter_state(state, domain)
+    saved_at = time.time()
+    with _cache_lock:
+        _cache[domain] = (saved_at, state)
+
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO consent_states (domain, state, saved_at) VALUES (?, ?, ?)",
+            (domain, json.dumps(state), saved_at)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def clear(domain: str = None):
+    """Oublie le consentement d'un domaine (ou de tous)."""
+    with _cache_lock:
+        if domain:
+            _cache.pop(domain, None)
+        else:
+            _cache.clear()
+
+    conn = _connect()
+    try:
+        if domain:
+            conn.execute("DELETE FROM consent_states WHERE domain = ?", (domain,))
+        else:
+            conn.execute("DELETE FROM consent_states")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def storage_state_for(url: str):
+    """
+    storage_state à passer à new_context pour une URL concurrente.
+    Charge aussi le consentement dans le cache du process pour tout le run.
+
+    Returns:
+        Dict storage_state, ou None (aucun consentement valide ou cache désactivé)
+    """
+    if not CONSENT_STATE_ENABLED or not url:
+        return None
+    try:
+        return load(get_domain(url))
+    except Exception:
+        return None
+
+
+def with_storage_state(context_options: dict, url: str) -> dict:
+    """Options de new_context complétées par le consentement enregistré (sauf storage_state explicite)."""
+    if "storage_state" in context_options:
+        return context_options
+    state = storage_state_for(url)
+    return {**context_options, "storage_state": state} if state else context_options
+
+
+def tag_context(context, context_options: dict, url: str, consented: bool = False):
+    """
+    Marque un contexte créé avec le consentement du domaine: storage_state enregistré
+    (with_storage_state), ou hérité d'un contexte qui le portait (consented=True).
+    Seuls les contextes marqués sautent l'attente de la bannière dans accept_consent.
+    """
+    if not CONSENT_STATE_ENABLED or not url:
+        return
+    state = context_options.get("storage_state")
+    if not state:
+        return
+    domain = get_domain(url)
+    try:
+        stored = consented or state == load(domain)
+    except Exception:
+        return
+    if stored:
+        _consented[context] = domain
+
+
+def context_consented(context, url: str) -> bool:
+    """True si le contexte porte le consentement du domaine de l'URL (voir tag_context)."""
+    return bool(url) and _consented.get(context) == get_domain(url)
+
+
+def accept_consent(page, selector: str, timeout: int = 3000, hidden_timeout: int = 1000) -> bool:
+    """
+    Accepte la bannière cookies, sauf si le contexte porte déjà le consentement du domaine
+    et qu'aucune bannière n'est affichée. Enregistre le storage_state après un clic réussi.
+
+    Returns:
+        True si la bannière a été cliquée
+    """
+    domain = get_domain(page.url)
+    if CONSENT_STATE_ENABLED and _consented.get(page.context) == domain:
+        try:
+            if not page.locator(selector).first.is_visible():
+                return False
+        except Exception:
+            return False
+
+    try:
+        page.click(selector, timeout=timeout)
+    except Exception:
+        return False
+    wait_hidden(page, selector, timeout=hidden_timeout, name="cookie_banner")
+
+    if CONSENT_STATE_ENABLED:
+        _consented[page.context] = domain
+        try:
+            save(domain, page.context.storage_state())
+        except Exception as e:
+            print(f"      ⚠️ Consentement non enregistré: {str(e)[:50]}")
+    return True
+
+
+async def accept_consent_async(page, selector: str, timeout: int = 3000, hidden_timeout: int = 1000) -> bool:
+    """Version async de accept_consent."""
+    domain = get_domain(page.url)
+    if CONSENT_STATE_ENABLED and _consented.get(page.context) == domain:
+        try:
+            if not await page.locator(selector).first.is_visible():
+                return False
+        except Exception:
+            return False
+
+    try:
+        await page.click(selector, timeout=timeout)
+    except Exception:
+        return False
+    await wait_hidden_async(page, selector, timeout=hidden_timeout, name="cookie_banner")
+
+    if CONSENT_STATE_ENABLED:
+        _consented[page.context] = domain
+        try:
+            state = await page.context.storage_state()
+            await asyncio.to_thread(save, domain, state)
+        except Exception as e:
+            print(f"      ⚠️ Consentement non enregistré: {str(e)[:50]}")
+    return True
@@ -0,0 +1,179 @@
+"""
+Extraction groupée de l'état d'une popup de code en UN SEUL page.evaluate.
+
+Avant: chaque champ coûtait plusieurs allers-retours Playwright (count(), nth(i),
+inner_text(), get_attribute()...), et les fallbacks bouclaient sur tous les éléments.
+Ici, un descripteur (spec) décrit les règles de chaque champ; le script les applique
+dans la page et renvoie code, titre, tag "exclusive" et bouton de fermeture en un seul JSON.
+
+Descripteur:
+    {
+        "code":  [règle, ...],         # règles essayées dans l'ordre, premier texte valide gagné
+        "title": [règle, ...],
+        "exclusive": "css",           # optionnel: tag cherché dans le parent direct du titre
+        "close": ["css", ...],        # optionnel: premier sélecteur dont le 1er élément est visible
+    }
+
+Règle: {"selector": css ou "xpath=...", "prop": None, "min_len": 1, "max_len": None, "no_spaces": False,
+        "exclude": [textes refusés], "not_class": "classe refusée", "not_code": False}
+    prop: propriété lue à la place du texte (ex: "value" pour un input)
+
+Les boutons de fermeture gardent l'ordre du descripteur: plusieurs peuvent être visibles en
+même temps, et le premier visible dans cet ordre est celui qui est cliqué. Ils sont tous
+testés dans le même evaluate, un ordre appris (selector_cascade) n'économiserait aucun
+aller-retour et changerait le bouton cliqué.
+
+extract_cards applique le même principe à une liste de cartes (pages qui révèlent tous
+les codes d'un coup): un seul evaluate renvoie les {code, title} de toutes les cartes
+valides, au lieu d'un script écrit à la main par site. Spec compilée par site_descriptors:
+    {"card": "css", "has": ["css", ...], "within": "css" ou None,
+     "fields": {"code": [règle, ...], "title": [règle, ...]}}
+    Les sélecteurs des règles sont relatifs à la carte (xpath=.//... pour un XPath).
+"""
+
+_POPUP_STATE_JS = """
+(spec) => {
+    const query = (selector) => {
+        if (selector.startsWith('xpath=')) {
+            const snap = document.evaluate(selector.slice(6), document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return Array.from({length: snap.snapshotLength}, (_, i) => snap.snapshotItem(i));
+        }
+        return Array.from(document.querySelectorAll(selector));
+    };
+    const visible = (el) => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden';
+    const pick = (rules, code) => {
+        for (const rule of rules || []) {
+            for (const el of query(rule.selector)) {
+                const text = String((rule.prop ? el[rule.prop] : el.innerText || el.textContent) || '').trim();
+                if (!text || text.length < (rule.min_len || 1)) continue;
+                if (rule.max_len && text.length > rule.max_len) continue;
+                if (rule.no_spaces && text.includes(' ')) continue;
+                if (rule.exclude && rule.exclude.includes(text)) continue;
+                if (rule.not_class && (el.getAttribute('class') || '').includes(rule.not_class)) continue;
+                if (rule.not_code && text === code) continue;
+                return [text, el];
+            }
+        }
+        return [null, null];
+    };
+
+    const [code] = pick(spec.code);
+    const [title, titleEl] = pick(spec.title, code);
+    const exclusive = !!(spec.exclusive && titleEl && titleEl.parentElement
+                         && titleEl.parentElement.querySelector(spec.exclusive));
+    const close = (spec.close || []).find((selector) => {
+        const first = query(selector)[0];
+        return first && visible(first);
+    }) || null;
+    return {code, title, exclusive, close};
+}
+"""
+
+_CARDS_JS = """
+(spec) => {
+    const query = (root, selector) => {
+        if (selector.startsWith('xpath=')) {
+            const snap = document.evaluate(selector.slice(6), root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return Array.from({length: snap.snapshotLength}, (_, i) => snap.snapshotItem(i));
+        }
+        return Array.from(root.querySelectorAll(selector));
+    };
+    const pick = (root, rules) => {
+        for (const rule of rules || []) {
+            for (const el of query(root, rule.selector)) {
+                const text = String((rule.prop ? el[rule.prop] : el.textContent) || '').trim();
+                if (!text || text.length < (rule.min_len || 1)) continue;
+                if (rule.max_len && text.length > rule.max_len) continue;
+                if (rule.no_spaces && text.includes(' ')) continue;
+                if (rule.exclude && rule.exclude.includes(text)) continue;
+                if (rule.not_class && (el.getAttribute('class') || '').includes(rule.not_class)) continue;
+                return text;
+            }
+        }
+        return null;
+    };
+
+    const results = [];
+    for (const card of document.querySelectorAll(spec.card)) {
+        if ((spec.has || []).some((selector) => card.querySelector(selector))) continue;
+        if (spec.within && card.closest(spec.within)) continue;
+        const code = pick(card, spec.fields.code);
+        const title = pick(card, spec.fields.title);
+        if (code && title) results.push({code, title});
+    }
+    return results;
+}
+"""
+
+EMPTY_STATE = {"code": None, "title": None, "exclusive": False, "close": None}
+
+
+def popup_state(page, spec: dict) -> dict:
+    """
+    État de la popup en un aller-retour.
+
+    Returns:
+        Dict {"code", "title", "exclusive", "close"} (valeurs vides si l'évaluation échoue)
+    """
+    try:
+        return page.evaluate(_POPUP_STATE_JS, spec)
+    except Exception:
+        return dict(EMPTY_STATE)
+
+
+def extract_cards(page, spec: dict) -> list:
+    """
+    {code, title} de toutes les cartes valides en un aller-retour.
+
+    Returns:
+        Liste de dicts (vide si l'évaluation échoue)
+    """
+    try:
+        return page.evaluate(_CARDS_JS, spec)
+    except Exception:
+        return []
+
+
+def close_popup(page, state: dict, escape: bool = False, timeout: int = 3000) -> bool:
+    """
+    Clique sur le bouton de fermeture trouvé par popup_state (Escape en dernier recours si escape=True).
+
+    Returns:
+        True si le bouton de fermeture a été cliqué
+    """
+    if state.get("close"):
+        try:
+            page.locator(state["close"]).first.click(timeout=timeout)
+            return True
+        except Exception:
+            pass
+    if escape:
+        try:
+            page.keyboard.press("Escape")
+        except Exception:
+            pass
+    return False
+
+
+async def popup_state_async(page, spec: dict) -> dict:
+    """Version async de popup_state."""
+    try:
+        return await page.evaluate(_POPUP_STATE_JS, spec)
+    except Exception:
+        return dict(EMPTY_STATE)
+
+
+async def close_popup_async(page, state: dict, escape: bool = False, timeout: int = 3000) -> bool:
+    """Version async de close_popup."""
+    if state.get("close"):
+        try:
+            await page.locator(state["close"]).first.click(timeout=timeout)
+            return True
+        except Exception:
+            pass
+    if escape:
+        try:
+            await page.keyboard.press("Escape")
+        except Exception:
+            pass
+    return False
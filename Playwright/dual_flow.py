@@ -0,0 +1,100 @@
+"""
+Un seul déroulé par source pour le moteur sync (scraper_runner) et le moteur async (async_engine).
+
+Les sources portées en async avaient deux copies du même déroulé (scrape_*_all et
+scrape_*_all_async), à faire évoluer en parallèle. Ici le déroulé est écrit une fois,
+comme un générateur où chaque appel Playwright ou helper s'écrit `valeur = yield ...`:
+- Appels directs (page.evaluate, locator.count...): même écriture dans les deux API,
+  l'API async renvoie une coroutine
+- Helpers à deux versions (polite_goto / polite_goto_async...): via Steps, qui donne
+  la version du moteur (steps.goto, steps.wait_visible, steps.expect_page...)
+- run_sync: l'appel est déjà fait, sa valeur est renvoyée telle quelle au générateur
+- run_async: la coroutine est attendue; une erreur est relancée dans le générateur,
+  à l'endroit du yield (ses try/except/finally s'appliquent comme en sync)
+"""
+
+import inspect
+
+from consent_state import accept_consent, accept_consent_async
+from dom_extract import popup_state, popup_state_async
+from politeness import polite_click, polite_click_async, polite_goto, polite_goto_async
+from waits import (wait_count_above, wait_count_above_async, wait_hidden, wait_hidden_async, wait_scroll_growth,
+                   wait_scroll_growth_async, wait_state, wait_state_async, wait_until, wait_until_async,
+                   wait_visible, wait_visible_async)
+
+
+class Steps:
+    """Helpers du moteur courant: appel direct (sync) ou coroutine à yield (async)."""
+
+    # nom -> (version sync, version async)
+    _HELPERS = {
+        "goto": (polite_goto, polite_goto_async),
+        "click": (polite_click, polite_click_async),
+        "consent": (accept_consent, accept_consent_async),
+        "popup_state": (popup_state, popup_state_async),
+        "wait_count_above": (wait_count_above, wait_count_above_async),
+        "wait_hidden": (wait_hidden, wait_hidden_async),
+        "wait_scroll_growth": (wait_scroll_growth, wait_scroll_growth_async),
+        "wait_state": (wait_state, wait_state_async),
+        "wait_until": (wait_until, wait_until_async),
+        "wait_visible": (wait_visible, wait_visible_async),
+    }
+
+    def __init__(self, is_async: bool = False):
+        self.is_async = is_async
+
+    def __getattr__(self, name):
+        try:
+            return self._HELPERS[name][self.is_async]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def affiliate_wait(self, affiliate, timeout: int = 5000):
+        """Lien affilié capturé (voir AffiliateCapture.wait)."""
+        return affiliate.wait_async(timeout=timeout) if self.is_async else affiliate.wait(timeout=timeout)
+
+    def expect_page(self, context, action, timeout: int = None):
+        """
+        Nouvel onglet ouvert par action(), ex: lambda: steps.click(page, bouton).
+
+        Returns:
+            Page (sync) ou coroutine de la Page (async)
+        """
+        options = {"timeout": timeout} if timeout else {}
+        if self.is_async:
+            return self._expect_page_async(context, action, options)
+        with context.expect_page(**options) as new_page_info:
+            action()
+        return new_page_info.value
+
+    @staticmethod
+    async def _expect_page_async(context, action, options: dict):
+        async with context.expect_page(**options) as new_page_info:
+            await action()
+        return await new_page_info.value
+
+
+def run_sync(flow):
+    """Exécute un déroulé avec l'API sync et renvoie sa valeur de retour."""
+    value = None
+    while True:
+        try:
+            value = flow.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+
+async def run_async(flow):
+    """Exécute un déroulé avec l'API async et renvoie sa valeur de retour."""
+    send, value = flow.send, None
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as stop:
+            return stop.value
+        try:
+            value = await step if inspect.isawaitable(step) else step
+            send = flow.send
+        except BaseException as e:
+            # Comme dans une coroutine: l'erreur (annulation comprise) remonte dans le déroulé
+            send, value = flow.throw, e
@@ -2,13 +2,13 @@
 Module pour écrire les résultats de scraping dans Google Sheets.
 Écrit directement dans la sheet Missing_Code.
 Applique automatiquement le nettoyage des données (déduplication, filtres).
+Les résultats sont des records.CodeRecord (même objet de l'extraction à l'écriture).
 """
 
 import gspread
 from google.oauth2.service_account import Credentials
 import os
 import re
-from datetime import datetime
 
 # Configuration
 MISSING_CODE_SPREADSHEET_ID = "16wrx_aKk0FfCKlLXZMp3WKvfwQp5-d6uaJhynqDhXdc"
@@ -58,18 +58,81 @@ COMPETITOR_PREFIXES = [
 ]
 
 
+# Filtres compilés une fois (appliqués à chaque ligne, y compris en flux)
+_EXCLUSIVE_PATTERN = re.compile('|'.join(EXCLUSIVE_KEYWORDS), re.IGNORECASE)
+_COMPETITOR_PATTERN = re.compile('^(' + '|'.join(COMPETITOR_PREFIXES) + ')')
+
+
+class ResultCleaner:
+    """
+    Filtres de nettoyage appliqués ligne par ligne.
+    
+    Garde l'état nécessaire à la déduplication (clés déjà vues): les lignes peuvent
+    arriver par lots successifs (pipeline en flux) avec le même résultat qu'un
+    nettoyage de la liste complète.
+    """
+    
+    def __init__(self):
+        self.seen = set()
+        self.removed = {"dupes": 0, "spaces": 0, "exclusive": 0, "competitors": 0}
+        self.kept = 0
+    
+    def accept(self, r) -> bool:
+        """True si la ligne passe tous les filtres (dans l'ordre de clean_results)."""
+        # ÉTAPE 1: Déduplication (Country + Merchant_ID + Code)
+        key = (r.merchant.country, str(r.merchant.merchant_id), r.code)
+        if key in self.seen:
+            self.removed["dupes"] += 1
+            return False
+        self.seen.add(key)
+        
+        # ÉTAPE 2: Codes avec espaces
+        if ' ' in str(r.code):
+            self.removed["spaces"] += 1
+            return False
+        
+        # ÉTAPE 3: "exclusive" dans le titre
+        if _EXCLUSIVE_PATTERN.search(str(r.title)):
+            self.removed["exclusive"] += 1
+            return False
+        
+        # ÉTAPE 4: Codes concurrents (préfixes affiliés)
+        if _COMPETITOR_PATTERN.match(str(r.code).upper()):
+            self.removed["competitors"] += 1
+            return False
+        
+        self.kept += 1
+        return True
+    
+    def filter(self, results: list) -> list:
+        return [r for r in results if self.accept(r)]
+    
+    def report(self):
+        """Affiche le bilan du nettoyage."""
+        labels = {
+            "dupes": "doublons supprimés",
+            "spaces": "codes avec espaces supprimés",
+            "exclusive": "codes 'exclusive' supprimés",
+            "competitors": "codes concurrents supprimés",
+        }
+        for name, label in labels.items():
+            if self.removed[name] > 0:
+                print(f"   ✅ {self.removed[name]} {label}")
+        print(f"   📊 {self.kept} résultats après nettoyage ({sum(self.removed.values())} supprimés)")
+
+
 def clean_results(results: list) -> list:
     """
     Applique tous les filtrages et nettoyages aux résultats avant écriture.
     
-    Étapes:
+    Étapes (voir ResultCleaner):
     1. Suppression des doublons (Country + Merchant_ID + Code)
     2. Suppression des codes avec espaces (plusieurs mots)
     3. Suppression des lignes avec "exclusive" dans le titre
     4. Suppression des codes de concurrents (préfixes affiliés)
     
     Args:
-        results: Liste de dictionnaires avec les données scrappées
+        results: Liste de CodeRecord
     
     Returns:
         Liste filtrée et nettoyée
@@ -79,45 +142,9 @@ def clean_results(results: list) -> list:
     
     print(f"\n🧹 Nettoyage de {len(results)} résultats...")
     
-    # ÉTAPE 1: Déduplication (Country + Merchant_ID + Code)
-    seen = set()
-    deduped = []
-    for r in results:
-        key = (r.get("Country", ""), str(r.get("Merchant_ID", "")), r.get("Code", ""))
-        if key not in seen:
-            seen.add(key)
-            deduped.append(r)
-    
-    removed_dupes = len(results) - len(deduped)
-    if removed_dupes > 0:
-        print(f"   ✅ {removed_dupes} doublons supprimés")
-    results = deduped
-    
-    # ÉTAPE 2: Supprimer les codes avec espaces
-    before = len(results)
-    results = [r for r in results if ' ' not in str(r.get("Code", ""))]
-    removed_spaces = before - len(results)
-    if removed_spaces > 0:
-        print(f"   ✅ {removed_spaces} codes avec espaces supprimés")
-    
-    # ÉTAPE 3: Supprimer les lignes avec "exclusive" dans le titre
-    before = len(results)
-    pattern = '|'.join(EXCLUSIVE_KEYWORDS)
-    results = [r for r in results if not re.search(pattern, str(r.get("Title", "")), re.IGNORECASE)]
-    removed_exclusive = before - len(results)
-    if removed_exclusive > 0:
-        print(f"   ✅ {removed_exclusive} codes 'exclusive' supprimés")
-    
-    # ÉTAPE 4: Supprimer les codes concurrents (préfixes affiliés)
-    before = len(results)
-    prefix_pattern = '^(' + '|'.join(COMPETITOR_PREFIXES) + ')'
-    results = [r for r in results if not re.match(prefix_pattern, str(r.get("Code", "")).upper())]
-    removed_competitors = before - len(results)
-    if removed_competitors > 0:
-        print(f"   ✅ {removed_competitors} codes concurrents supprimés")
-    
-    total_removed = removed_dupes + removed_spaces + removed_exclusive + removed_competitors
-    print(f"   📊 {len(results)} résultats après nettoyage ({total_removed} supprimés)")
+    cleaner = ResultCleaner()
+    results = cleaner.filter(results)
+    cleaner.report()
     
     return results
 
@@ -135,9 +162,7 @@ def append_to_gsheet(results: list, source_name: str = None, skip_cleaning: bool
     Applique automatiquement le nettoyage sauf si skip_cleaning=True.
     
     Args:
-        results: Liste de dictionnaires avec les données scrappées.
-                 Chaque dict doit avoir: Date, Country, Merchant_ID, Merchant_slug,
-                 GPN_URL, Competitor_Source, Competitor_URL, Code, Title
+        results: Liste de CodeRecord (colonnes records.COLUMNS)
         source_name: Nom de la source pour le logging (optionnel)
         skip_cleaning: Si True, n'applique pas le nettoyage (défaut: False)
     
@@ -163,31 +188,10 @@ def append_to_gsheet(results: list, source_name: str = None, skip_cleaning: bool
         spreadsheet = client.open_by_key(MISSING_CODE_SPREADSHEET_ID)
         worksheet = spreadsheet.worksheet(MISSING_CODE_SHEET_NAME)
         
-        # Colonnes attendues dans l'ordre (doit correspondre au spreadsheet)
-        columns = [
-            "Date", "Country", "Merchant_ID", "Merchant_slug", "GPN_URL",
-            "Competitor_Source", "Competitor_URL", "Affiliate_Link", "Code", "Title",
-            "Actioned by", "Comments"
-        ]
-
-        # Préparer les lignes à ajouter
-        rows_to_add = []
-        for result in results:
-            row = [
-                result.get("Date", datetime.now().strftime("%Y-%m-%d")),
-                result.get("Country", ""),
-                result.get("Merchant_ID", ""),
-                result.get("Merchant_slug", ""),
-                result.get("GPN_URL", ""),
-                result.get("Competitor_Source", ""),
-                result.get("Competitor_URL", ""),
-                result.get("Affiliate_Link", ""),  # Affiliate_Link entre Competitor_URL et Code
-                result.get("Code", ""),
-                result.get("Title", ""),
-                "",  # Actioned by - laissé vide pour remplissage manuel
-                ""   # Comments - laissé vide pour remplissage manuel
-            ]
-            rows_to_add.append(row)
+        # Colonnes de la sheet: records.COLUMNS, puis "Actioned by" et "Comments"
+        # laissées vides pour remplissage manuel
+        manual_columns = ["", ""]
+        rows_to_add = [result.to_row() + manual_columns for result in results]
         
         # Ajouter toutes les lignes d'un coup (plus efficace)
         worksheet.append_rows(rows_to_add, value_input_option="USER_ENTERED")
@@ -257,7 +261,7 @@ def append_unique_results(results: list, source_name: str = None):
     Vérifie les doublons par (Merchant_ID, Code).
     
     Args:
-        results: Liste de dictionnaires avec les données scrappées
+        results: Liste de CodeRecord
         source_name: Nom de la source pour le logging
     
     Returns:
@@ -276,8 +280,8 @@ def append_unique_results(results: list, source_name: str = None):
     # Filtrer les nouveaux résultats
     new_results = []
     for result in results:
-        merchant_id = str(result.get("Merchant_ID", ""))
-        code = str(result.get("Code", ""))
+        merchant_id = str(result.merchant.merchant_id)
+        code = str(result.code)
         
         if (merchant_id, code) not in existing_codes:
             new_results.append(result)
@@ -0,0 +1,110 @@
+"""
+Extraction sans navigateur pour les sources dont les codes sont dans le HTML statique.
+
+La page est téléchargée avec un client HTTP réutilisé (httpx, connexions keep-alive) puis
+parsée avec selectolax: pas de Chromium, pas de rendu, pas d'attente du DOM.
+- Une source l'active en déclarant un parseur dans son descripteur (clé "http_parse")
+- Le navigateur reste le fallback: page en erreur, bloquée ou parse sans aucun code
+- Les requêtes passent par la politesse du domaine (politeness.throttle), comme les goto
+
+httpx et selectolax sont importés à la demande: sans eux, le mode est simplement désactivé.
+
+Clé "http_parse" du descripteur de source:
+    Fonction parse(tree, url) -> (codes, affiliate_link), tree = selectolax LexborHTMLParser
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+
+from politeness import throttle, throttle_async
+
+# Désactivable pour le debug (HTTP_FASTPATH_ENABLED=0)
+HTTP_FASTPATH_ENABLED = os.environ.get("HTTP_FASTPATH_ENABLED", "1") != "0"
+
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_FASTPATH_TIMEOUT", "15"))
+
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+}
+
+# Un client par thread (shards) et par boucle asyncio (moteur async)
+_local = threading.local()
+_async_clients = weakref.WeakKeyDictionary()
+_missing_deps_logged = False
+
+
+def _load_deps():
+    """Imports à la demande: (httpx, HTMLParser), ou None si une dépendance manque."""
+    global _missing_deps_logged
+    try:
+        import httpx
+        from selectolax.lexbor import LexborHTMLParser
+        return httpx, LexborHTMLParser
+    except ImportError as e:
+        if not _missing_deps_logged:
+            _missing_deps_logged = True
+            print(f"⚠️ Mode HTTP désactivé ({e}): pip install httpx selectolax")
+        return None
+
+
+def is_enabled(source: dict) -> bool:
+    """True si la source déclare un parseur HTTP et que le mode est disponible."""
+    return HTTP_FASTPATH_ENABLED and bool(source.get("http_parse")) and _load_deps() is not None
+
+
+def _client(httpx):
+    if getattr(_local, "client", None) is None:
+        _local.client = httpx.Client(headers=HTTP_HEADERS, timeout=HTTP_TIMEOUT_SECONDS,
+                                     follow_redirects=True)
+    return _local.client
+
+
+def _async_client(httpx, loop):
+    if loop not in _async_clients:
+        _async_clients[loop] = httpx.AsyncClient(headers=HTTP_HEADERS, timeout=HTTP_TIMEOUT_SECONDS,
+                                                 follow_redirects=True)
+    return _async_clients[loop]
+
+
+def _parse(source: dict, html: str, url: str, HTMLParser):
+    """Applique le parseur de la source; None si aucun code (le navigateur prend le relais)."""
+    codes, affiliate_link = source["http_parse"](HTMLParser(html), url)
+    return (codes, affiliate_link) if codes else None
+
+
+def scrape(source: dict, url: str):
+    """
+    Scrape un marchand sans navigateur.
+
+    Returns:
+        (codes, affiliate_link), ou None si le mode ne s'applique pas ou n'a rien trouvé
+    """
+    if not is_enabled(source):
+        return None
+    httpx, HTMLParser = _load_deps()
+    try:
+        with throttle(url):
+            response = _client(httpx).get(url)
+        response.raise_for_status()
+        return _parse(source, response.text, url, HTMLParser)
+    except Exception as e:
+        print(f"      ⚠️ HTTP: {str(e)[:50]} → navigateur")
+        return None
+
+
+async def scrape_async(source: dict, url: str):
+    """Version async de scrape (client partagé par la boucle)."""
+    if not is_enabled(source):
+        return None
+    httpx, HTMLParser = _load_deps()
+    try:
+        async with throttle_async(url):
+            response = await _async_client(httpx, asyncio.get_running_loop()).get(url)
+        response.raise_for_status()
+        return _parse(source, response.text, url, HTMLParser)
+    except Exception as e:
+        print(f"      ⚠️ HTTP: {str(e)[:50]} → navigateur")
+        return None
@@ -0,0 +1,239 @@
+"""
+Registre des jobs de scraping (persisté dans SQLite via state_store).
+Chaque POST /scrape/... crée un job; l'API renvoie son job_id immédiatement
+et le job est suivi via GET /jobs/{job_id}.
+"""
+
+import json
+import uuid
+from datetime import datetime
+
+from state_store import get_connection
+
+# États possibles d'un job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted"
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    sources TEXT NOT NULL,
+    options TEXT NOT NULL,
+    state TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    success TEXT NOT NULL DEFAULT '[]',
+    errors TEXT NOT NULL DEFAULT '[]',
+    timings TEXT NOT NULL DEFAULT '{}',
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at);
+"""
+
+
+def _connect():
+    return get_connection("jobs", _SCHEMA)
+
+
+def _row_to_job(row) -> dict:
+    """Convertit une ligne SQLite en dict JSON-sérialisable."""
+    job = dict(row)
+    for key in ("sources", "options", "success", "errors", "timings"):
+        job[key] = json.loads(job[key])
+
+    job["progress"] = {
+        "total": job.pop("total"),
+        "done": job.pop("done"),
+        "total_success": len(job["success"]),
+        "total_errors": len(job["errors"]),
+    }
+
+    # Durée: jusqu'à la fin du job, ou jusqu'à maintenant s'il tourne encore
+    duration = None
+    if job["started_at"]:
+        end = datetime.fromisoformat(job["finished_at"]) if job["finished_at"] else datetime.now()
+        duration = round((end - datetime.fromisoformat(job["started_at"])).total_seconds(), 1)
+    job["duration_seconds"] = duration
+
+    return job
+
+
+def create_job(label: str, sources: list, options: dict = None) -> dict:
+    """
+    Crée un job en état "queued".
+
+    Args:
+        label: Libellé du job (ex: "GROUP1 (AU+IT)", "HotUKDeals UK")
+        sources: Noms des scrapers du job (ex: ["UK/HotUKDeals"])
+        options: Options de lancement (parallel, max_workers...)
+
+    Returns:
+        dict: Le job créé
+    """
+    job_id = uuid.uuid4().hex[:12]
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, label, sources, options, state, created_at, total) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, label, json.dumps(sources), json.dumps(options or {}),
+                 JOB_QUEUED, datetime.now().isoformat(), len(sources))
+            )
+    finally:
+        conn.close()
+    return get_job(job_id)
+
+
+def start_job(job_id: str):
+    """Passe un job en état "running"."""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, started_at = ? WHERE job_id = ?",
+                (JOB_RUNNING, datetime.now().isoformat(), job_id)
+            )
+    finally:
+        conn.close()
+
+
+def record_source_result(job_id: str, name: str, success: str = None, error: str = None, duration: float = None):
+    """
+    Enregistre le résultat d'un scraper du job (incrémente la progression).
+
+    Args:
+        job_id: Identifiant du job
+        name: Nom du scraper (ex: "UK/HotUKDeals")
+        success: Message de succès ("✅ ...") ou None
+        error: Message d'erreur ("❌ ...") ou None
+        duration: Durée du scraper en secondes
+    """
+    conn = _connect()
+    try:
+        with conn:
+            # BEGIN IMMEDIATE: lecture-modification-écriture atomique entre threads
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT done, success, errors, timings FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return
+
+            successes = json.loads(row["success"])
+            errors = json.loads(row["errors"])
+            timings = json.loads(row["timings"])
+            if success:
+                successes.append(success)
+            if error:
+                errors.append(error)
+            if duration is not None:
+                timings[name] = round(duration, 1)
+
+            conn.execute(
+                "UPDATE jobs SET done = ?, success = ?, errors = ?, timings = ? WHERE job_id = ?",
+                (row["done"] + 1, json.dumps(successes), json.dumps(errors), json.dumps(timings), job_id)
+            )
+    finally:
+        conn.close()
+
+
+def finish_job(job_id: str, state: str = JOB_COMPLETED, message: str = None, success: list = None, errors: list = None):
+    """
+    Termine un job.
+
+    Args:
+        job_id: Identifiant du job
+        state: État final (completed, failed, interrupted)
+        message: Résumé du job
+        success: Liste finale des succès (remplace la liste incrémentale, ordre du registre)
+        errors: Liste finale des erreurs (idem)
+    """
+    fields = ["state = ?", "finished_at = ?", "message = ?"]
+    values = [state, datetime.now().isoformat(), message]
+    if success is not None:
+        fields.append("success = ?")
+        values.append(json.dumps(success))
+    if errors is not None:
+        fields.append("errors = ?")
+        values.append(json.dumps(errors))
+
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(f"UPDATE jobs SET {', '.join(fields)} WHERE job_id = ?", (*values, job_id))
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str):
+    """Retourne un job (dict) ou None s'il n'existe pas."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(state: str = None, limit: int = 50) -> list:
+    """
+    Liste les jobs, du plus récent au plus ancien.
+
+    Args:
+        state: Filtrer par état (optionnel)
+        limit: Nombre max de jobs renvoyés
+    """
+    query = "SELECT * FROM jobs"
+    params = []
+    if state:
+        query += " WHERE state = ?"
+        params.append(state)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+
+    conn = _connect()
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_job(row) for row in rows]
+
+
+def get_active_sources() -> set:
+    """Retourne les noms des scrapers présents dans un job queued ou running."""
+    active = set()
+    for state in ACTIVE_STATES:
+        for job in list_jobs(state=state, limit=1000):
+            active.update(job["sources"])
+    return active
+
+
+def mark_interrupted_jobs() -> int:
+    """
+    Marque "interrupted" les jobs restés queued/running d'un process précédent.
+    À appeler au démarrage de l'API (les threads qui les exécutaient n'existent plus).
+
+    Returns:
+        int: Nombre de jobs marqués
+    """
+    conn = _connect()
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, message = ? WHERE state IN (?, ?)",
+                (JOB_INTERRUPTED, datetime.now().isoformat(), "Process API redémarré", *ACTIVE_STATES)
+            )
+    finally:
+        conn.close()
+    return cursor.rowcount
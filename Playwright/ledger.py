@@ -0,0 +1,68 @@
+"""
+Registre par URL: dernière date de scraping et dernier résultat (SQLite via state_store).
+
+Alimenté à chaque marchand scrapé avec succès. En mode incrémental, les URLs scrapées
+il y a moins de `ttl_hours` ne sont pas rescrapées: leurs derniers codes sont réutilisés.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from state_store import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_ledger (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    last_scraped TEXT NOT NULL,
+    codes_count INTEGER NOT NULL,
+    rows TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+"""
+
+
+def _connect():
+    return get_connection("url_ledger", _SCHEMA)
+
+
+def record(source: str, url: str, rows: list):
+    """Enregistre le dernier résultat d'une URL (lignes Missing_Code)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO url_ledger (source, url, last_scraped, codes_count, rows) VALUES (?, ?, ?, ?, ?)",
+            (source, url, datetime.now().isoformat(timespec="seconds"), len(rows), json.dumps(rows))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_fresh(source: str, ttl_hours: float) -> dict:
+    """
+    URLs d'une source scrapées il y a moins de `ttl_hours`.
+
+    Returns:
+        Dict {url: {"last_scraped": iso, "rows": [lignes Missing_Code]}}
+    """
+    limit = (datetime.now() - timedelta(hours=ttl_hours)).isoformat(timespec="seconds")
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT url, last_scraped, rows FROM url_ledger WHERE source = ? AND last_scraped >= ?",
+            (source, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["url"]: {"last_scraped": row["last_scraped"], "rows": json.loads(row["rows"])} for row in rows}
+
+
+def load_codes_counts(source: str) -> dict:
+    """Dernier nombre de codes par URL d'une source: {url: nombre}."""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT url, codes_count FROM url_ledger WHERE source = ?", (source,)).fetchall()
+    finally:
+        conn.close()
+    return {row["url"]: row["codes_count"] for row in rows}
@@ -0,0 +1,149 @@
+"""
+Politique réseau des contextes Playwright: blocage des ressources inutiles.
+
+Les scrapers ne lisent que quelques nœuds texte (h4, span...): images, polices, vidéos
+et scripts de pub/analytics sont bloqués via context.route avant d'être téléchargés.
+- Les navigations (document principal, popups, redirections d'affiliation) ne sont jamais
+  bloquées, seules les iframes de pub le sont
+- Chaque source peut réautoriser des types ou des domaines (clé "network_policy" du descripteur)
+- Les requêtes bloquées et les octets économisés (estimés par type) sont comptés par marchand
+
+Clé "network_policy" du descripteur de source:
+    False                       Aucun blocage pour cette source
+    {"allow_types": [...]}      Types de ressources à laisser passer (ex: ["image"])
+    {"allow_domains": [...]}    Domaines à laisser passer même s'ils sont dans TRACKER_DOMAINS
+    {"block_domains": [...]}    Domaines supplémentaires à bloquer
+"""
+
+import os
+import threading
+
+from politeness import get_domain
+
+# Désactivable pour le debug (NETWORK_POLICY_ENABLED=0)
+NETWORK_POLICY_ENABLED = os.environ.get("NETWORK_POLICY_ENABLED", "1") != "0"
+
+# Types de ressources bloqués par défaut (les feuilles de style restent: les scrapers
+# testent la visibilité des boutons)
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "texttrack", "manifest"}
+
+# Domaines de pub / analytics bloqués (et leurs sous-domaines), complétés par NETWORK_BLOCKED_DOMAINS
+TRACKER_DOMAINS = {
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "googleadservices.com",
+    "doubleclick.net", "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com",
+    "criteo.com", "criteo.net", "taboola.com", "outbrain.com", "amazon-adsystem.com", "adnxs.com",
+    "scorecardresearch.com", "quantserve.com", "newrelic.com", "nr-data.net", "segment.io",
+    "clarity.ms", "bat.bing.com", "analytics.tiktok.com", "ct.pinterest.com", "sc-static.net",
+    "optimizely.com", "mouseflow.com", "fullstory.com",
+}
+TRACKER_DOMAINS |= {domain.strip() for domain in os.environ.get("NETWORK_BLOCKED_DOMAINS", "").split(",") if domain.strip()}
+
+# Taille moyenne d'une ressource bloquée, pour estimer les octets économisés
+AVERAGE_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 35_000,
+    "script": 30_000,
+    "stylesheet": 20_000,
+}
+DEFAULT_AVERAGE_BYTES = 2_000
+
+
+def _matches(domain: str, domains) -> bool:
+    return any(domain == key or domain.endswith("." + key) for key in domains)
+
+
+class NetworkStats:
+    """Compteurs de requêtes bloquées d'un contexte (partagés entre ses pages)."""
+
+    def __init__(self):
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.allowed = 0
+        self._lock = threading.Lock()
+
+    def add(self, resource_type: str, blocked: bool):
+        with self._lock:
+            if blocked:
+                self.blocked += 1
+                self.bytes_saved += AVERAGE_BYTES.get(resource_type, DEFAULT_AVERAGE_BYTES)
+            else:
+                self.allowed += 1
+
+    def take(self) -> dict:
+        """Compteurs depuis le dernier appel (un marchand), puis remise à zéro."""
+        with self._lock:
+            stats = {"blocked": self.blocked, "bytes_saved": self.bytes_saved, "allowed": self.allowed}
+            self.blocked = self.bytes_saved = self.allowed = 0
+        return stats
+
+
+def get_rules(source: dict):
+    """Règles de blocage d'une source (None si la politique est désactivée)."""
+    policy = source.get("network_policy", {})
+    if not NETWORK_POLICY_ENABLED or policy is False:
+        return None
+    return {
+        "types": BLOCKED_RESOURCE_TYPES - set(policy.get("allow_types", [])),
+        "domains": (TRACKER_DOMAINS | set(policy.get("block_domains", []))) - set(policy.get("allow_domains", [])),
+    }
+
+
+def should_block(request, rules: dict) -> bool:
+    """True si la requête doit être bloquée (jamais la navigation d'une page ou d'une popup)."""
+    domain = get_domain(request.url)
+    if request.is_navigation_request():
+        # Iframe de pub: bloquée; page principale: toujours chargée
+        return request.frame.parent_frame is not None and _matches(domain, rules["domains"])
+    if request.resource_type in rules["types"]:
+        return True
+    return _matches(domain, rules["domains"])
+
+
+def install(context, source: dict):
+    """
+    Installe la politique réseau sur un contexte sync.
+
+    Returns:
+        NetworkStats du contexte (None si la politique est désactivée pour la source)
+    """
+    rules = get_rules(source)
+    if rules is None:
+        return None
+    stats = NetworkStats()
+
+    def handle(route):
+        blocked = should_block(route.request, rules)
+        stats.add(route.request.resource_type, blocked)
+        if blocked:
+            route.abort("blockedbyclient")
+        else:
+            # fallback: laisse la main aux autres routes du contexte
+            route.fallback()
+
+    context.route("**/*", handle)
+    return stats
+
+
+async def install_async(context, source: dict):
+    """Version async de install."""
+    rules = get_rules(source)
+    if rules is None:
+        return None
+    stats = NetworkStats()
+
+    async def handle(route):
+        blocked = should_block(route.request, rules)
+        stats.add(route.request.resource_type, blocked)
+        if blocked:
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    await context.route("**/*", handle)
+    return stats
+
+
+def format_stats(stats: dict) -> str:
+    """Résumé pour les logs (ex: "🚫 42 requêtes bloquées (~1.3 Mo économisés)")."""
+    return f"🚫 {stats['blocked']} requêtes bloquées (~{stats['bytes_saved'] / 1_000_000:.1f} Mo économisés)"
@@ -0,0 +1,169 @@
+"""
+Planificateur de runs à budget de temps fixe (limites Cloud Run).
+
+- Durées par URL mémorisées à chaque run (moyenne glissante, SQLite via state_store)
+- plan_items(): ordonne les URLs (codes attendus par seconde) et coupe ce qui ne
+  tiendra pas dans le budget
+- Le runner s'arrête à l'échéance, écrit les résultats partiels et enregistre les
+  URLs non visitées (save_report; publiées dans l'événement source_finished du job)
+- Plusieurs sources sur un même budget: chacune démarre avec sa part du temps restant
+  (share_deadline), sinon la première remplit le budget et les suivantes sont coupées
+"""
+
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+from state_store import get_connection
+
+# Durée supposée d'une URL jamais mesurée (secondes)
+DEFAULT_URL_SECONDS = float(os.environ.get("PLANNER_DEFAULT_URL_SECONDS", "20"))
+
+# Temps réservé en fin de run pour l'écriture Google Sheets (secondes)
+WRITE_MARGIN_SECONDS = float(os.environ.get("PLANNER_WRITE_MARGIN_SECONDS", "60"))
+
+# Poids de la dernière mesure dans la moyenne glissante
+EWMA_ALPHA = 0.3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS url_durations (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    avg_seconds REAL NOT NULL,
+    last_seconds REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+CREATE TABLE IF NOT EXISTS run_reports (
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    deadline TEXT,
+    planned INTEGER NOT NULL,
+    visited INTEGER NOT NULL,
+    unvisited TEXT NOT NULL,
+    PRIMARY KEY (source, run_id)
+);
+"""
+
+
+def _connect():
+    return get_connection("planner", _SCHEMA)
+
+
+def deadline_from_budget(budget_minutes: float = None, deadline: float = None):
+    """Échéance absolue (timestamp epoch) à partir d'un budget en minutes ou d'une échéance existante."""
+    if deadline:
+        return deadline
+    if budget_minutes:
+        return time.time() + budget_minutes * 60
+    return None
+
+
+def share_deadline(deadline: float, sources_left: int, workers: int = 1):
+    """
+    Échéance d'une source qui démarre maintenant, quand plusieurs sources se partagent
+    l'échéance du job: part égale du temps restant entre les vagues de sources restantes
+    (ceil(sources_left / workers)). Le temps qu'une source n'utilise pas profite aux suivantes.
+
+    Args:
+        sources_left: Sources pas encore terminées, celle qui démarre comprise
+        workers: Sources lancées en même temps
+    """
+    waves = math.ceil(sources_left / max(workers, 1))
+    if not deadline or waves <= 1:
+        return deadline
+    now = time.time()
+    return now + max(0.0, deadline - now) / waves
+
+
+def record_duration(source: str, url: str, seconds: float):
+    """Met à jour la durée moyenne d'une URL."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT avg_seconds, samples FROM url_durations WHERE source = ? AND url = ?", (source, url)
+        ).fetchone()
+        avg = seconds if row is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * row["avg_seconds"]
+        samples = 1 if row is None else row["samples"] + 1
+        conn.execute(
+            "INSERT OR REPLACE INTO url_durations (source, url, avg_seconds, last_seconds, samples, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (source, url, avg, seconds, samples, datetime.now().isoformat(timespec="seconds"))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_durations(source: str) -> dict:
+    """Durées moyennes connues d'une source: {url: secondes}."""
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT url, avg_seconds FROM url_durations WHERE source = ?", (source,)).fetchall()
+    finally:
+        conn.close()
+    return {row["url"]: row["avg_seconds"] for row in rows}
+
+
+def plan_items(source: str, items: list, deadline: float, workers: int = 1, codes_by_url: dict = None):
+    """
+    Ordonne et coupe les marchands pour finir avant l'échéance.
+
+    Les URLs qui rapportent le plus de codes par seconde passent en premier; les URLs
+    jamais mesurées prennent la durée médiane de la source (ou DEFAULT_URL_SECONDS).
+
+    Args:
+        source: Nom de la source
+        items: Tuples (index, merchant_row, url)
+        deadline: Échéance (timestamp epoch)
+        workers: Marchands traités en parallèle (shards)
+        codes_by_url: Derniers nombres de codes par URL (ledger), pour la priorité
+
+    Returns:
+        Tuple (items planifiés par priorité décroissante, items coupés)
+    """
+    durations = load_durations(source)
+    known = sorted(durations.values())
+    default = known[len(known) // 2] if known else DEFAULT_URL_SECONDS
+    codes_by_url = codes_by_url or {}
+
+    def estimate(item):
+        return durations.get(item[2], default)
+
+    def priority(item):
+        # Codes attendus par seconde (1 code supposé si jamais scrapé)
+        return codes_by_url.get(item[2], 1) / max(estimate(item), 0.1)
+
+    available = (deadline - time.time() - WRITE_MARGIN_SECONDS) * max(workers, 1)
+    planned, cut = [], []
+    spent = 0.0
+    for item in sorted(items, key=priority, reverse=True):
+        if spent + estimate(item) <= available:
+            planned.append(item)
+            spent += estimate(item)
+        else:
+            cut.append(item)
+
+    # Ordre de priorité conservé: si les estimations sont trop optimistes, ce sont les
+    # URLs les moins rentables qui tombent à l'échéance
+    return planned, cut
+
+
+def save_report(source: str, run_id: str, deadline: float, planned: int, visited: int, unvisited: list):
+    """Enregistre le bilan d'un run à budget (URLs non visitées)."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO run_reports (source, run_id, created_at, deadline, planned, visited, unvisited) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (source, run_id, datetime.now().isoformat(timespec="seconds"),
+             datetime.fromtimestamp(deadline).isoformat(timespec="seconds"), planned, visited,
+             json.dumps(unvisited))
+        )
+        conn.commit()
+    finally:
+        conn.close()
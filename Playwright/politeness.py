@@ -0,0 +1,208 @@
+"""
+Planificateur de politesse par domaine.
+
+Tous les page.goto et les clics qui ouvrent une popup passent par ce module:
+- Un token bucket par domaine (requêtes/seconde + rafale max)
+- Un nombre max de navigations simultanées par domaine
+- Un espacement aléatoire (jitter) quand il faut attendre un jeton
+
+Les navigations lancées à l'avance (prefetch_goto, module prefetch) passent aussi par la
+politesse; polite_goto sur une page préchargée attend seulement la fin de son chargement.
+
+Une attente ne bloque que le thread (ou la coroutine) qui vise ce domaine: les shards
+et les sources des autres domaines continuent pendant ce temps.
+Les buckets sont propres au process (les sources lancées en parallèle tournent dans des
+processus séparés et visent des domaines différents).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+# Désactivable pour le debug (POLITENESS_ENABLED=0)
+POLITENESS_ENABLED = os.environ.get("POLITENESS_ENABLED", "1") != "0"
+
+# Politique par défaut d'un domaine
+DEFAULT_POLICY = {
+    "rps": 1.0,            # Requêtes par seconde (régime établi)
+    "burst": 3,            # Requêtes autorisées d'affilée après une pause
+    "max_in_flight": 4,    # Navigations simultanées max
+    "jitter": 0.5,         # Espacement aléatoire ajouté à une attente (fraction de 1/rps)
+}
+
+# Politiques spécifiques (clé = domaine ou domaine parent)
+DOMAIN_POLICIES = {
+    # Sites Pepper: très sensibles aux rafales
+    "hotukdeals.com": {"rps": 0.5, "burst": 2, "max_in_flight": 2},
+    "mydealz.de": {"rps": 0.5, "burst": 2, "max_in_flight": 2},
+    "chollometro.com": {"rps": 0.5, "burst": 2, "max_in_flight": 2},
+    "retailmenot.com": {"rps": 0.5, "burst": 2, "max_in_flight": 2},
+    "vouchercodes.co.uk": {"rps": 0.5, "burst": 2, "max_in_flight": 2},
+    "cuponation.com.au": {"rps": 0.7, "burst": 2, "max_in_flight": 3},
+    "cuponation.es": {"rps": 0.7, "burst": 2, "max_in_flight": 3},
+    "cuponation.it": {"rps": 0.7, "burst": 2, "max_in_flight": 3},
+}
+
+
+def get_domain(url: str) -> str:
+    """Domaine normalisé d'une URL (sans www.)."""
+    return urlparse(url).netloc.lower().split(":")[0].removeprefix("www.")
+
+
+def get_policy(domain: str) -> dict:
+    """Politique du domaine (ou de son domaine parent), complétée par DEFAULT_POLICY."""
+    for key, policy in DOMAIN_POLICIES.items():
+        if domain == key or domain.endswith("." + key):
+            return {**DEFAULT_POLICY, **policy}
+    return dict(DEFAULT_POLICY)
+
+
+class DomainBucket:
+    """Token bucket d'un domaine, partagé par tous les threads et boucles du process."""
+
+    def __init__(self, policy: dict):
+        self.interval = 1 / policy["rps"]
+        self.burst = policy["burst"]
+        self.jitter = policy["jitter"]
+        self.max_in_flight = policy["max_in_flight"]
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Réserve un jeton et retourne le temps d'attente (s) avant de s'en servir.
+        Les réservations successives s'étalent dans le temps (le solde peut être négatif).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens * self.interval if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            wait += random.uniform(0, self.jitter * self.interval)
+        return wait
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+# Limites "in flight" async: un asyncio.Semaphore est lié à sa boucle
+_async_in_flight = weakref.WeakKeyDictionary()
+
+
+def get_bucket(url: str) -> DomainBucket:
+    domain = get_domain(url)
+    with _buckets_lock:
+        if domain not in _buckets:
+            _buckets[domain] = DomainBucket(get_policy(domain))
+        return _buckets[domain]
+
+
+@contextmanager
+def throttle(url: str):
+    """Context manager sync: attend son tour sur le domaine de `url`."""
+    if not POLITENESS_ENABLED or not url.startswith("http"):
+        yield
+        return
+
+    bucket = get_bucket(url)
+    with bucket.in_flight:
+        wait = bucket.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        yield
+
+
+@asynccontextmanager
+async def throttle_async(url: str):
+    """Version async de throttle (n'occupe pas la boucle pendant l'attente)."""
+    if not POLITENESS_ENABLED or not url.startswith("http"):
+        yield
+        return
+
+    bucket = get_bucket(url)
+    loop = asyncio.get_running_loop()
+    semaphores = _async_in_flight.setdefault(loop, {})
+    domain = get_domain(url)
+    if domain not in semaphores:
+        semaphores[domain] = asyncio.Semaphore(bucket.max_in_flight)
+
+    async with semaphores[domain]:
+        wait = bucket.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        yield
+
+
+# ===================================================================
+# HELPERS POUR LES SCRAPERS
+# ===================================================================
+
+# Pages dont la navigation a été lancée à l'avance: page -> URL demandée
+_prefetched = weakref.WeakKeyDictionary()
+
+
+def prefetch_goto(page, url: str):
+    """Lance la navigation de `page` vers `url` sans attendre son chargement (politesse au lancement)."""
+    with throttle(url):
+        page.evaluate("(url) => { window.location.href = url; }", url)
+    _prefetched[page] = url
+
+
+def _claim_prefetched(page, url: str, wait_until: str = "load", timeout: float = None) -> bool:
+    """True si `page` a été préchargée sur `url` et a fini de charger (sinon: vraie navigation)."""
+    if _prefetched.pop(page, None) != url:
+        return False
+    try:
+        page.wait_for_url(lambda current: current != "about:blank", wait_until="commit", timeout=timeout)
+        if not page.url.startswith("http"):
+            return False
+        if wait_until != "commit":
+            page.wait_for_load_state(wait_until, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def polite_goto(page, url: str, **kwargs):
+    """page.goto soumis à la politesse du domaine de `url` (page préchargée: attend son chargement)."""
+    if _claim_prefetched(page, url, kwargs.get("wait_until", "load"), kwargs.get("timeout")):
+        return None
+    with throttle(url):
+        return page.goto(url, **kwargs)
+
+
+def polite_click(page, locator, js: bool = False, **kwargs):
+    """
+    Clic (qui ouvre une popup ou navigue) soumis à la politesse du domaine de la page.
+
+    Args:
+        page: Page qui contient l'élément (son URL détermine le domaine)
+        locator: Élément à cliquer
+        js: Si True, clic JavaScript (el.click()) au lieu d'un clic Playwright
+    """
+    with throttle(page.url):
+        if js:
+            return page.evaluate("(el) => el.click()", locator.element_handle())
+        return locator.click(**kwargs)
+
+
+async def polite_goto_async(page, url: str, **kwargs):
+    async with throttle_async(url):
+        return await page.goto(url, **kwargs)
+
+
+async def polite_click_async(page, locator, js: bool = False, **kwargs):
+    async with throttle_async(page.url):
+        if js:
+            return await page.evaluate("(el) => el.click()", await locator.element_handle())
+        return await locator.click(**kwargs)
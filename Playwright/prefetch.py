@@ -0,0 +1,85 @@
+"""
+Préchargement des marchands suivants pendant l'extraction du marchand courant.
+
+Chaque marchand était strictement séquentiel: goto, attentes, clics dans les popups,
+puis goto du suivant. Le runner ouvre maintenant une page par marchand à venir (jusqu'à
+PREFETCH_DEPTH) et lance sa navigation sans l'attendre (politeness.prefetch_goto):
+le réseau du marchand i+1 se charge pendant les clics du marchand i.
+- Le scraper reçoit la page préchargée; son polite_goto attend seulement la fin du
+  chargement (ou refait une vraie navigation si le préchargement a échoué)
+- Les navigations préchargées passent par la politesse du domaine, comme les goto
+- Désactivé pour les sources en mode HTTP (http_parse): le navigateur n'est qu'un fallback
+- Désactivé pour les sources qui lisent les codes dans les réponses JSON (clé "xhr_capture"
+  du descripteur): les XHR de la liste des offres partent pendant le préchargement, avant
+  que le scraper du marchand n'installe sa capture; il ne les verrait jamais et finirait
+  toujours par la boucle d'onglets. Le préchargement se ferait en plus dans le même
+  contexte que le marchand courant (xhr_capture ignore ces onglets, voir _owns)
+
+Clé optionnelle du descripteur de source:
+    prefetch_depth    Nombre de marchands préchargés (0 = désactivé)
+    xhr_capture       True si le scraper utilise xhr_capture (préchargement désactivé)
+"""
+
+import os
+from collections import OrderedDict
+
+from politeness import prefetch_goto
+
+# Nombre de marchands préchargés à l'avance (0 = désactivé)
+PREFETCH_DEPTH = int(os.environ.get("PREFETCH_DEPTH", "1"))
+
+
+def depth_for(source: dict, http_mode: bool = False) -> int:
+    """Profondeur de préchargement d'une source (0 en mode HTTP ou avec xhr_capture)."""
+    if http_mode or source.get("xhr_capture"):
+        return 0
+    return source.get("prefetch_depth", PREFETCH_DEPTH)
+
+
+class Prefetcher:
+    """Pages préchargées d'un contexte, dans l'ordre des marchands."""
+
+    def __init__(self, context, depth: int = PREFETCH_DEPTH):
+        self.context = context
+        self.depth = depth
+        self.pending = OrderedDict()    # URL -> page en cours de chargement
+        self.hits = 0
+        self.misses = 0
+
+    def schedule(self, urls: list):
+        """Lance le préchargement des `depth` prochaines URLs (celles déjà en cours sont gardées)."""
+        for url in urls[:self.depth]:
+            if url in self.pending:
+                continue
+            try:
+                page = self.context.new_page()
+            except Exception:
+                return
+            try:
+                prefetch_goto(page, url)
+            except Exception:
+                pass        # polite_goto fera une vraie navigation
+            self.pending[url] = page
+
+    def take(self, url: str):
+        """Page préchargée pour `url` (None si aucune ou si elle a été fermée entre-temps)."""
+        page = self.pending.pop(url, None)
+        if page is None or page.is_closed():
+            if self.depth:
+                self.misses += 1
+            return None
+        self.hits += 1
+        return page
+
+    def pages(self) -> list:
+        """Pages préchargées encore en attente (à ne pas fermer entre deux marchands)."""
+        return list(self.pending.values())
+
+    def reset(self, context):
+        """Nouveau contexte (recyclage): les pages de l'ancien contexte sont perdues."""
+        self.context = context
+        self.pending.clear()
+
+    def format_stats(self) -> str:
+        total = self.hits + self.misses
+        return f"📦 Préchargement: {self.hits}/{total} marchands sur page préchargée"
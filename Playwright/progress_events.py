@@ -0,0 +1,113 @@
+"""
+Événements de progression des jobs (persistés dans SQLite via state_store).
+
+Les runners (threads ou processus workers) écrivent un événement par marchand terminé;
+l'API les relit et les diffuse en Server-Sent Events (GET /jobs/{job_id}/events).
+
+Types d'événements:
+- job_started / job_finished          Début et fin du job
+- source_started / source_finished    Début (nombre d'URLs) et fin (codes, URLs non visitées) d'une source
+- merchant                            Marchand terminé: index, total, codes, latence
+- source_result                       Résultat d'une source au niveau du job (succès / erreur)
+"""
+
+import json
+import threading
+from datetime import datetime
+
+from state_store import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events(job_id, event_id);
+"""
+
+
+def _connect():
+    return get_connection("job_events", _SCHEMA)
+
+
+def emit(job_id: str, event: str, data: dict):
+    """Enregistre un événement (sans effet si le run n'appartient à aucun job)."""
+    if not job_id:
+        return
+    try:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO job_events (job_id, created_at, event, data) VALUES (?, ?, ?, ?)",
+                (job_id, datetime.now().isoformat(timespec="milliseconds"), event, json.dumps(data))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        # La progression ne doit jamais faire échouer un scraping
+        print(f"⚠️ Événement non enregistré: {str(e)[:50]}")
+
+
+def unvisited_urls(job_id: str) -> dict:
+    """URLs non visitées (budget de temps) par source, d'après les événements source_finished du job."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT data FROM job_events WHERE job_id = ? AND event = 'source_finished' ORDER BY event_id", (job_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    unvisited = {}
+    for row in rows:
+        data = json.loads(row["data"])
+        if data.get("unvisited"):
+            unvisited[data["source"]] = data["unvisited"]
+    return unvisited
+
+
+def fetch_events(job_id: str, after_id: int = 0, limit: int = 500) -> list:
+    """Événements d'un job postérieurs à `after_id`, dans l'ordre."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT * FROM job_events WHERE job_id = ? AND event_id > ? ORDER BY event_id LIMIT ?",
+            (job_id, after_id, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {"id": row["event_id"], "event": row["event"], "created_at": row["created_at"], "data": json.loads(row["data"])}
+        for row in rows
+    ]
+
+
+def merchant_progress(job_id: str, source: dict, total: int, already_done: int = 0):
+    """
+    Callback on_merchant (voir scraper_runner) qui émet un événement "merchant".
+    Compte les marchands terminés de tous les shards de la source.
+    """
+    lock = threading.Lock()
+    state = {"done": already_done, "codes": 0}
+
+    def on_merchant(idx, merchant_row, url, rows, ok, duration):
+        with lock:
+            state["done"] += 1
+            state["codes"] += len(rows)
+            done, codes = state["done"], state["codes"]
+        emit(job_id, "merchant", {
+            "source": source["name"],
+            "index": idx,
+            "done": done,
+            "total": total,
+            "merchant": merchant_row.get("Merchant_slug", "Unknown"),
+            "url": url,
+            "ok": ok,
+            "codes": len(rows),
+            "codes_so_far": codes,
+            "latency_ms": int(duration * 1000),
+        })
+    return on_merchant
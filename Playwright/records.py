@@ -0,0 +1,135 @@
+"""
+Lignes de résultat Missing_Code typées et compactes.
+
+Chaque code extrait devenait un dict de 10 clés qui répétait la date, le pays, la source
+et les champs du marchand, puis gsheet_writer reconstruisait une liste par ligne.
+Ici, les champs communs à un marchand sont dans un MerchantInfo partagé par référence
+par tous ses codes (chaînes répétées internées), et chaque CodeRecord (__slots__) ne
+porte que code, titre et lien affilié. Le même objet va de l'extraction au nettoyage
+et à l'écriture; seuls les stockages JSON (checkpoint, ledger) passent par des dicts.
+"""
+
+import sys
+from datetime import datetime
+
+# Colonnes Missing_Code produites par le scraping, dans l'ordre de la sheet
+COLUMNS = (
+    "Date", "Country", "Merchant_ID", "Merchant_slug", "GPN_URL",
+    "Competitor_Source", "Competitor_URL", "Affiliate_Link", "Code", "Title",
+)
+
+
+def today() -> str:
+    """Date du jour au format de la colonne Date."""
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class MerchantInfo:
+    """Champs communs à toutes les lignes d'un marchand (partagés par référence)."""
+
+    __slots__ = ("date", "country", "merchant_id", "merchant_slug", "gpn_url", "competitor_source", "competitor_url")
+
+    def __init__(self, date, country, merchant_id, merchant_slug, gpn_url, competitor_source, competitor_url):
+        # Valeurs répétées sur tout le run: une seule chaîne en mémoire
+        self.date = sys.intern(date)
+        self.country = sys.intern(country)
+        self.merchant_id = merchant_id
+        self.merchant_slug = merchant_slug
+        self.gpn_url = gpn_url
+        self.competitor_source = sys.intern(competitor_source)
+        self.competitor_url = competitor_url
+
+    @classmethod
+    def for_merchant(cls, source: dict, merchant_row: dict, url: str, date: str = None):
+        """Infos d'un marchand de la Google Sheet pour une source."""
+        return cls(
+            date or today(),
+            source["country"],
+            merchant_row.get("Merchant_ID", ""),
+            merchant_row.get("Merchant_slug", "Unknown"),
+            merchant_row.get("GPN_URL", ""),
+            source["competitor_source"],
+            url,
+        )
+
+
+class CodeRecord:
+    """Une ligne Missing_Code: un code d'un marchand."""
+
+    __slots__ = ("merchant", "code", "title", "affiliate_link")
+
+    def __init__(self, merchant: MerchantInfo, code: str, title: str, affiliate_link: str = ""):
+        self.merchant = merchant
+        self.code = code
+        self.title = title
+        self.affiliate_link = affiliate_link
+
+    def to_row(self) -> list:
+        """Valeurs dans l'ordre de COLUMNS."""
+        merchant = self.merchant
+        return [merchant.date, merchant.country, merchant.merchant_id, merchant.merchant_slug, merchant.gpn_url,
+                merchant.competitor_source, merchant.competitor_url, self.affiliate_link, self.code, self.title]
+
+    def to_dict(self) -> dict:
+        """Ligne Missing_Code en dict (stockage JSON)."""
+        return dict(zip(COLUMNS, self.to_row()))
+
+    def __repr__(self):
+        return f"CodeRecord({self.merchant.merchant_slug!r}, {self.code!r}, {self.title!r})"
+
+
+def build_records(source: dict, merchant_row: dict, url: str, codes: list, affiliate_link: str = None) -> list:
+    """Lignes d'un marchand à partir des codes extraits ({code, title, affiliate_link})."""
+    merchant = MerchantInfo.for_merchant(source, merchant_row, url)
+    return [
+        CodeRecord(merchant, code_info.get("code", ""), code_info.get("title", ""),
+                   code_info.get("affiliate_link") or affiliate_link or "")
+        for code_info in codes
+    ]
+
+
+class ScrapeFailed(Exception):
+    """
+    Échec du scraping d'un marchand (levé par les fonctions scrape_*_all).
+
+    Porte les codes récupérés avant l'erreur: ils sont écrits, mais le marchand n'est ni
+    checkpointé ni enregistré au ledger (ok=False), il sera rescrapé au prochain run.
+    """
+
+    def __init__(self, error, codes: list = None, affiliate_link: str = None):
+        super().__init__(str(error))
+        self.codes = codes or []
+        self.affiliate_link = affiliate_link
+
+
+def partial_records(error: Exception, source: dict, merchant_row: dict, url: str) -> list:
+    """Lignes récupérées avant une erreur de scraping (vide si l'erreur n'en porte pas)."""
+    if isinstance(error, ScrapeFailed):
+        return build_records(source, merchant_row, url, error.codes, error.affiliate_link)
+    return []
+
+
+def to_dicts(records: list) -> list:
+    return [record.to_dict() for record in records]
+
+
+def from_dicts(rows: list, date: str = None) -> list:
+    """
+    Lignes stockées (dicts Missing_Code) -> CodeRecord, un MerchantInfo par marchand.
+
+    Args:
+        date: Remplace la date stockée (ex: résultats réutilisés datés du jour)
+    """
+    merchants = {}
+    records = []
+    for row in rows:
+        key = (row.get("Date", ""), row.get("Merchant_ID", ""), row.get("Competitor_URL", ""))
+        merchant = merchants.get(key)
+        if merchant is None:
+            merchant = merchants[key] = MerchantInfo(
+                date or row.get("Date") or today(), row.get("Country", ""), row.get("Merchant_ID", ""),
+                row.get("Merchant_slug", ""), row.get("GPN_URL", ""), row.get("Competitor_Source", ""),
+                row.get("Competitor_URL", ""),
+            )
+        records.append(CodeRecord(merchant, row.get("Code", ""), row.get("Title", ""), row.get("Affiliate_Link", "")))
+    return records
@@ -0,0 +1,215 @@
+"""
+Recyclage des contextes et navigateurs pour borner la mémoire des longs runs.
+
+Un même navigateur / contexte servait toute la liste de marchands: la mémoire des
+renderers Chromium montait sans limite (ralentissements puis OOM en fin de run).
+- Nouveau contexte tous les RECYCLE_CONTEXT_EVERY marchands
+- Nouveau navigateur tous les RECYCLE_BROWSER_EVERY contextes
+- Watchdog: un thread échantillonne le RSS du navigateur (processus principal + enfants);
+  au-dessus de RECYCLE_RSS_MB, contexte ET navigateur sont recyclés
+- Les cookies et le localStorage du domaine concurrent (consentement, session) passent
+  d'un contexte à l'autre via storage_state
+
+Le RSS est lu avec psutil s'il est installé, sinon dans /proc (Linux); ailleurs le
+watchdog est désactivé et seul le recyclage par nombre de marchands s'applique.
+Les navigateurs du pool sont relancés par le pool lui-même (RECYCLE_AFTER): recycler le
+navigateur revient alors à reprendre un navigateur du pool. Le watchdog n'y est pas utilisé:
+le RSS d'un navigateur partagé inclut les contextes des autres shards et ne baisse pas
+quand un shard le quitte.
+Si un recyclage RSS ne ramène pas le RSS sous le seuil, le seuil est ignoré pendant
+RECYCLE_RSS_COOLDOWN marchands (pas de recyclage à chaque marchand).
+
+Clés optionnelles du descripteur de source:
+    recycle_context_every, recycle_browser_every, recycle_rss_mb (0 = désactivé)
+"""
+
+import os
+import threading
+
+from consent_state import filter_state
+from politeness import get_domain
+
+# Nouveau contexte tous les N marchands (0 = jamais)
+RECYCLE_CONTEXT_EVERY = int(os.environ.get("RECYCLE_CONTEXT_EVERY", "50"))
+
+# Nouveau navigateur tous les M contextes (0 = jamais)
+RECYCLE_BROWSER_EVERY = int(os.environ.get("RECYCLE_BROWSER_EVERY", "10"))
+
+# Seuil de RSS du navigateur en Mo (0 = pas de seuil)
+RECYCLE_RSS_MB = int(os.environ.get("RECYCLE_RSS_MB", "1500"))
+
+# Marchands sans recyclage RSS après un recyclage qui n'a pas fait baisser le RSS
+RECYCLE_RSS_COOLDOWN = int(os.environ.get("RECYCLE_RSS_COOLDOWN", "20"))
+
+# Période d'échantillonnage du watchdog (secondes)
+RSS_SAMPLE_SECONDS = float(os.environ.get("RSS_SAMPLE_SECONDS", "5"))
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def browser_pid(browser):
+    """PID du processus principal du navigateur (CDP SystemInfo), ou None."""
+    try:
+        session = browser.new_browser_cdp_session()
+        try:
+            info = session.send("SystemInfo.getProcessInfo")
+        finally:
+            session.detach()
+        return next((proc["id"] for proc in info.get("processInfo", []) if proc.get("type") == "browser"), None)
+    except Exception:
+        return None
+
+
+def _proc_children() -> dict:
+    """{ppid: [pid, ...]} d'après /proc/<pid>/stat."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Le nom du processus (entre parenthèses) peut contenir des espaces
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def _proc_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_rss(pid: int):
+    """RSS cumulé (octets) d'un processus et de ses descendants, ou None si illisible."""
+    try:
+        import psutil
+        root = psutil.Process(pid)
+        total = root.memory_info().rss
+        for child in root.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    if not os.path.isdir("/proc") or not os.path.exists(f"/proc/{pid}"):
+        return None
+    children = _proc_children()
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        total += _proc_rss(current)
+        pending.extend(children.get(current, []))
+    return total
+
+
+class RssWatchdog:
+    """Échantillonne le RSS d'un navigateur dans un thread (lecture seule: pas d'appel Playwright)."""
+
+    def __init__(self, pid, interval: float = RSS_SAMPLE_SECONDS):
+        self.pid = pid
+        self.interval = interval
+        self.rss_mb = None          # dernier échantillon
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = process_tree_rss(self.pid)
+        if rss is None:
+            return False
+        self.rss_mb = rss / (1024 * 1024)
+        self.peak_mb = max(self.peak_mb, self.rss_mb)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self._sample():
+                return
+
+    def start(self):
+        if self.pid and self._sample():
+            self._thread = threading.Thread(target=self._run, name=f"rss-watchdog-{self.pid}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_watchdog(browser) -> RssWatchdog:
+    """Watchdog du navigateur (inactif si son PID ou son RSS est introuvable)."""
+    return RssWatchdog(browser_pid(browser)).start()
+
+
+class Recycler:
+    """Décide quand recycler le contexte et le navigateur d'un shard."""
+
+    def __init__(self, source: dict, pooled: bool = False):
+        """
+        Args:
+            pooled: Navigateur du pool (partagé): pas de seuil RSS, le pool borne sa mémoire
+        """
+        self.context_every = source.get("recycle_context_every", RECYCLE_CONTEXT_EVERY)
+        self.browser_every = source.get("recycle_browser_every", RECYCLE_BROWSER_EVERY)
+        self.rss_limit_mb = 0 if pooled else source.get("recycle_rss_mb", RECYCLE_RSS_MB)
+        self.merchants = 0          # marchands scrapés dans le contexte courant
+        self.contexts = 1           # contextes ouverts sur le navigateur courant
+        self.rss_cooldown = 0       # marchands restants sans recyclage RSS
+
+    def merchant_done(self):
+        self.merchants += 1
+        self.rss_cooldown = max(0, self.rss_cooldown - 1)
+
+    def due(self, watchdog: RssWatchdog):
+        """
+        Recyclage à faire avant le prochain marchand.
+
+        Returns:
+            (raison, recycler_le_navigateur) ou (None, False)
+        """
+        if self.merchants == 0:
+            return None, False
+        rss = watchdog.rss_mb if watchdog else None
+        if self._over_limit(rss) and not self.rss_cooldown:
+            return f"RSS {rss:.0f} Mo", True
+        if self.context_every and self.merchants >= self.context_every:
+            browser_due = bool(self.browser_every) and self.contexts >= self.browser_every
+            return f"{self.merchants} marchands", browser_due
+        return None, False
+
+    def _over_limit(self, rss) -> bool:
+        return bool(self.rss_limit_mb) and rss is not None and rss >= self.rss_limit_mb
+
+    def recycled(self, browser: bool, watchdog: RssWatchdog = None):
+        """
+        Args:
+            watchdog: Watchdog du navigateur courant après recyclage (premier échantillon pris)
+        """
+        self.merchants = 0
+        self.contexts = 1 if browser else self.contexts + 1
+        if self._over_limit(watchdog.rss_mb if watchdog else None):
+            print(f"⚠️ RSS toujours au-dessus du seuil après recyclage: seuil ignoré pendant "
+                  f"{RECYCLE_RSS_COOLDOWN} marchands")
+            self.rss_cooldown = RECYCLE_RSS_COOLDOWN
+
+
+def carry_over(context, context_options: dict, url: str) -> dict:
+    """Options du contexte suivant avec le storage_state du domaine concurrent du contexte courant."""
+    try:
+        state = filter_state(context.storage_state(), get_domain(url))
+    except Exception:
+        return context_options
+    if not state["cookies"] and not state["origins"]:
+        return context_options
+    return {**context_options, "storage_state": state}
@@ -0,0 +1,151 @@
+"""
+Pipeline de résultats en flux: les lignes partent vers Google Sheets pendant le run.
+
+Chaque run gardait toutes les lignes de toute la liste de marchands en mémoire et
+n'écrivait qu'à la fin: la mémoire grossissait avec le run, la première ligne arrivait
+des heures plus tard, et une erreur tardive faisait tout perdre.
+Ici, chaque marchand terminé pousse ses lignes dans une file bornée; un thread
+d'écriture les nettoie au fil de l'eau (gsheet_writer.ResultCleaner, même résultat
+qu'un nettoyage de la liste complète) et les écrit par lots:
+- Lot écrit dès SINK_FLUSH_ROWS lignes ou au bout de SINK_FLUSH_SECONDS
+- File bornée (SINK_QUEUE_SIZE marchands): si l'écriture prend du retard, les scrapers
+  attendent au lieu d'accumuler
+- Après chaque lot, les URLs écrites sont vidées dans le checkpoint (on_written):
+  une reprise ne réécrit pas ce qui est déjà dans la sheet
+- Un lot en échec reste en tampon et est retenté au lot suivant; si le dernier essai
+  échoue, close() relève l'erreur (les lignes non écrites restent dans le checkpoint)
+Les lignes arrivent dans l'ordre de fin des marchands, plus dans l'ordre de la liste.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from gsheet_writer import ResultCleaner
+
+# Écriture en flux (désactivable: SCRAPER_STREAMING=0 -> écriture unique en fin de run)
+STREAMING_ENABLED = os.environ.get("SCRAPER_STREAMING", "1") != "0"
+
+# Taille d'un lot (lignes nettoyées) et délai maximal entre deux lots
+FLUSH_ROWS = int(os.environ.get("SINK_FLUSH_ROWS", "200"))
+FLUSH_SECONDS = float(os.environ.get("SINK_FLUSH_SECONDS", "120"))
+
+# Marchands en attente d'écriture au maximum
+QUEUE_SIZE = int(os.environ.get("SINK_QUEUE_SIZE", "64"))
+
+_DONE = object()
+
+
+class ResultSink:
+    """File de lignes (CodeRecord) nettoyées et écrites par lots dans un thread dédié."""
+
+    def __init__(self, write, on_written=None, flush_rows: int = None, flush_seconds: float = None,
+                 name: str = "result-sink"):
+        """
+        Args:
+            write: Fonction write(lignes) qui écrit un lot (ex: append_to_gsheet sans nettoyage)
+            on_written: Fonction on_written(urls) appelée après chaque lot écrit
+        """
+        self.write = write
+        self.on_written = on_written
+        self.flush_rows = flush_rows or FLUSH_ROWS
+        self.flush_seconds = flush_seconds or FLUSH_SECONDS
+        self.cleaner = ResultCleaner()
+        self.received = 0
+        self.written = 0
+        self.chunks = 0
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._buffer = []
+        self._urls = set()          # URLs des lignes reçues depuis le dernier lot écrit
+        self._last_flush = time.monotonic()
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, rows: list):
+        """Envoie les lignes d'un marchand (bloque si la file est pleine)."""
+        if rows:
+            self._queue.put(list(rows))
+
+    def feed(self, merchant_rows: list):
+        """Envoie des lignes déjà prêtes [(index, lignes)] (reprise, ledger) et les vide."""
+        for _, rows in merchant_rows:
+            self.put(rows)
+            rows.clear()
+
+    def on_merchant(self, idx, merchant_row, url, rows, ok, duration):
+        """
+        Callback on_merchant (voir scraper_runner), à placer en dernier dans la chaîne:
+        le sink prend possession des lignes, vidées chez l'appelant pour ne pas les garder
+        en mémoire jusqu'à la fin du run.
+        """
+        self.put(rows)
+        rows.clear()
+
+    def _run(self):
+        while True:
+            timeout = max(0.1, self.flush_seconds - (time.monotonic() - self._last_flush))
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                break
+            if item:
+                self.received += len(item)
+                self._urls.update(record.merchant.competitor_url for record in item)
+                self._buffer.extend(record for record in item if self.cleaner.accept(record))
+            full = len(self._buffer) >= self.flush_rows and self._error is None
+            if full or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush()
+        self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer and not self._urls:
+            return
+        chunk, urls = self._buffer, self._urls
+        if chunk:
+            try:
+                self.write(chunk)
+            except Exception as e:
+                self._error = e
+                print(f"⚠️ Lot de {len(chunk)} lignes non écrit, nouvel essai au prochain lot: {str(e)[:50]}")
+                return
+            self.written += len(chunk)
+            self.chunks += 1
+        self._error = None
+        self._buffer, self._urls = [], set()
+        if self.on_written:
+            try:
+                self.on_written(urls)
+            except Exception as e:
+                print(f"⚠️ Checkpoint non mis à jour après écriture: {str(e)[:50]}")
+
+    def close(self) -> int:
+        """
+        Écrit le dernier lot et arrête le thread d'écriture (sans effet si déjà fermé).
+
+        Returns:
+            int: Nombre de lignes reçues (avant nettoyage)
+
+        Raises:
+            Exception: Erreur du dernier essai d'écriture, si des lignes n'ont pas pu être écrites
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_DONE)
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+        return self.received
+
+    def report(self):
+        """Affiche le bilan du nettoyage et des lots écrits."""
+        if not self.received:
+            return
+        print(f"\n🧹 Nettoyage en flux de {self.received} résultats...")
+        self.cleaner.report()
+        print(f"📤 {self.written} lignes écrites en {self.chunks} lots")
@@ -0,0 +1,166 @@
+"""
+Module pour lancer plusieurs scrapers en parallèle.
+Chaque scraper tourne dans son propre processus (Playwright sync ne se partage pas
+entre threads), avec un nombre maximum de scrapers simultanés configurable.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Ajouter le dossier courant au path pour les imports (hérité par les processus enfants)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import planner
+
+# Nombre max de scrapers lancés en même temps en mode parallèle
+MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", "4"))
+
+# ===================================================================
+# REGISTRE DES SCRAPERS: (nom, module, fonction)
+# ===================================================================
+
+ALL_SCRAPERS = [
+    ("AU/Lifehacker", "AU.scrap_lifehacker_AU", "main"),
+    ("AU/Cuponation", "AU.scrap_cuponation_AU", "main"),
+    ("US/RetailMeNot", "US.scrap_retailmenot_US", "main"),
+    ("US/SimplyCodes", "US.scrap_simplycodes_US", "main"),
+    ("UK/HotUKDeals", "UK.scrap_hotukdeals_UK", "main"),
+    ("UK/VoucherCodes", "UK.scrap_vouchercodes_UK", "main"),
+    ("DE/MyDealz", "DE.scrap_mydealz_DE", "main"),
+    ("DE/Sparwelt", "DE.scrap_sparwelt_DE", "main"),
+    ("FR/iGraal", "FR.scrap_igraal_FR", "main"),
+    ("FR/Ma-Reduc", "FR.scrap_mareduc_FR", "main"),
+    ("ES/Chollometro", "ES.scrap_chollometro_ES", "main"),
+    ("ES/Cuponation", "ES.scrap_cuponation_ES", "main"),
+    ("IT/Codicescontonet", "IT.scrap_codicescontonet_IT", "main"),
+    ("IT/Cuponation", "IT.scrap_cuponation_IT", "main"),
+]
+
+# Groupes utilisés par Cloud Scheduler (noms des scrapers ci-dessus)
+SCRAPER_GROUPS = {
+    "GROUP1": ["AU/Lifehacker", "AU/Cuponation", "IT/Codicescontonet", "IT/Cuponation"],
+    "GROUP2": ["UK/HotUKDeals", "UK/VoucherCodes", "US/RetailMeNot", "US/SimplyCodes"],
+    "GROUP3": ["DE/MyDealz", "DE/Sparwelt", "FR/iGraal", "FR/Ma-Reduc"],
+    "GROUP4": ["ES/Chollometro", "ES/Cuponation"],
+}
+
+
+def get_scrapers(names: list = None) -> list:
+    """
+    Retourne les tuples (nom, module, fonction) pour les noms demandés.
+
+    Args:
+        names: Liste de noms (ex: "UK/HotUKDeals"). Si None, tous les scrapers.
+
+    Returns:
+        Liste de tuples dans l'ordre du registre
+    """
+    if names is None:
+        return list(ALL_SCRAPERS)
+    return [s for s in ALL_SCRAPERS if s[0] in names]
+
+
+def run_scraper(name: str, module: str, func: str, label: str = None, run_options: dict = None):
+    """
+    Importe et exécute un scraper. Utilisé tel quel dans les processus workers.
+
+    Args:
+        run_options: Options passées au main() du scraper (ex: {"shards": 4})
+
+    Returns:
+        Tuple (succès, erreur, durée en secondes) - succès ou erreur est None
+    """
+    prefix = f"[{label}] " if label else ""
+    print(f"\n{'='*60}")
+    print(f"🚀 {prefix}Lancement de {name}...")
+    print(f"{'='*60}")
+
+    start = time.monotonic()
+    try:
+        mod = __import__(module, fromlist=[func])
+        getattr(mod, func)(**(run_options or {}))
+        return f"✅ {name}", None, time.monotonic() - start
+    except Exception as e:
+        return None, f"❌ {name}: {str(e)[:50]}", time.monotonic() - start
+
+
+def share_run_options(run_options: dict, sources_left: int, workers: int = 1) -> dict:
+    """Options d'une source qui démarre: échéance du job remplacée par sa part (planner.share_deadline)."""
+    if not run_options or not run_options.get("deadline"):
+        return run_options
+    return {**run_options, "deadline": planner.share_deadline(run_options["deadline"], sources_left, workers)}
+
+
+def run_scrapers(scrapers: list, parallel: bool = False, max_workers: int = None, label: str = None, on_result=None,
+                 run_options: dict = None):
+    """
+    Lance une liste de scrapers, séquentiellement ou dans un pool de processus.
+
+    En mode parallèle, chaque scraper tourne dans un processus neuf (spawn) et au plus
+    `max_workers` scrapers tournent en même temps. Les listes renvoyées gardent l'ordre
+    de `scrapers`, quel que soit l'ordre de fin.
+    Avec une échéance (run_options["deadline"]), chaque scraper démarre avec sa part du
+    temps restant (share_run_options).
+
+    Args:
+        scrapers: Liste de tuples (nom, module, fonction)
+        parallel: Si True, lance les scrapers dans des processus séparés
+        max_workers: Nombre max de scrapers simultanés (défaut: MAX_WORKERS)
+        label: Préfixe pour les logs (ex: "GROUP1")
+        on_result: Callback optionnel appelé à la fin de chaque scraper avec
+                   (nom, succès, erreur, durée) - ex: progression d'un job
+        run_options: Options passées au main() de chaque scraper
+
+    Returns:
+        Tuple (results, errors) - listes de messages "✅ nom" / "❌ nom: erreur"
+    """
+    outcomes = {}
+
+    if not parallel or len(scrapers) <= 1:
+        for i, (name, module, func) in enumerate(scrapers):
+            options = share_run_options(run_options, len(scrapers) - i)
+            outcomes[name] = run_scraper(name, module, func, label, options)
+            if on_result:
+                on_result(name, *outcomes[name])
+    else:
+        max_workers = max(1, min(max_workers or MAX_WORKERS, len(scrapers)))
+        prefix = f"[{label}] " if label else ""
+        print(f"\n⚡ {prefix}{len(scrapers)} scrapers en parallèle ({max_workers} workers)")
+
+        # spawn + 1 tâche par processus: chaque scraper part d'un processus propre
+        # (max_tasks_per_child n'existe qu'à partir de Python 3.11; l'image Playwright jammy est en 3.10)
+        pool_options = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, **pool_options) as executor:
+            pending = list(scrapers)
+            futures = {}
+            while pending or futures:
+                # Soumis quand un worker se libère: la part du budget est calculée au démarrage
+                while pending and len(futures) < max_workers:
+                    name, module, func = pending.pop(0)
+                    options = share_run_options(run_options, len(pending) + len(futures) + 1, max_workers)
+                    futures[executor.submit(run_scraper, name, module, func, label, options)] = name
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        outcomes[name] = future.result()
+                    except Exception as e:
+                        # Processus worker mort (OOM, crash Chromium...)
+                        outcomes[name] = (None, f"❌ {name}: {str(e)[:50]}", None)
+                    print(f"🏁 {prefix}{name} terminé")
+                    if on_result:
+                        on_result(name, *outcomes[name])
+
+    results = []
+    errors = []
+    for name, _, _ in scrapers:
+        success, error, _ = outcomes[name]
+        if success:
+            results.append(success)
+        else:
+            errors.append(error)
+
+    return results, errors
@@ -0,0 +1,579 @@
+"""
+Module commun pour exécuter un scraper sur toutes les URLs d'une source.
+Remplace la boucle dupliquée dans chaque main():
+- Charge les URLs depuis Google Sheets
+- Lance Playwright et boucle sur les marchands (retry si la page crashe)
+- Construit les lignes Missing_Code (records.CodeRecord) et les écrit dans Google Sheets
+
+Mode sharding: la liste des marchands est découpée en N shards, chaque shard tourne
+dans son propre thread avec son propre contexte navigateur, puis les résultats sont
+fusionnés avant l'écriture.
+
+Pool de navigateurs: si BROWSER_POOL_SIZE > 0 (ou si le process API a démarré un pool),
+les shards se connectent aux Chromium du pool au lieu de lancer chacun le leur.
+
+Reprise: chaque marchand terminé est checkpointé (module checkpoint). Un run relancé
+le même jour saute les URLs déjà faites et réutilise leurs codes.
+
+Mode incrémental: les URLs scrapées depuis moins de ttl_hours (module ledger) ne sont
+pas rescrapées, leurs derniers codes sont réutilisés.
+
+Budget de temps: avec budget_minutes (ou une échéance), le planner ordonne et coupe les
+URLs d'après leurs durées passées; le run s'arrête à l'échéance et écrit ce qu'il a.
+
+Recyclage: contexte neuf tous les N marchands, navigateur neuf tous les M contextes ou
+au-dessus d'un seuil de RSS (module recycling); le consentement passe au contexte suivant.
+
+Écriture en flux: les lignes de chaque marchand terminé partent dans un ResultSink
+(module result_pipeline) qui les nettoie et les écrit par lots pendant le run, au lieu
+d'une seule écriture de toute la liste en fin de run (SCRAPER_STREAMING=0).
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from playwright.sync_api import sync_playwright
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import checkpoint
+import consent_state
+import http_fastpath
+import ledger
+import network_policy
+import planner
+import prefetch
+import progress_events
+import recycling
+import records
+import result_pipeline
+import selector_cascade
+import tab_manager
+import waits
+from browser_pool import POOL_SIZE, get_pool, open_browser, start_pool, stop_pool, uses_pool
+from gsheet_loader import get_competitor_urls
+from gsheet_writer import append_to_gsheet
+
+# Nombre de shards par défaut (surchargeable par source, par appel ou via l'environnement)
+DEFAULT_SHARDS = int(os.environ.get("SCRAPER_SHARDS", "0")) or None
+
+# Contexte navigateur par défaut de tous les scrapers
+DEFAULT_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1920, "height": 1080},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+# Reprise depuis le checkpoint du jour (désactivable: SCRAPER_RESUME=0 ou resume=False)
+RESUME_ENABLED = os.environ.get("SCRAPER_RESUME", "1") != "0"
+
+# Mode incrémental (désactivé par défaut: SCRAPER_INCREMENTAL=1 ou incremental=True)
+INCREMENTAL_ENABLED = os.environ.get("SCRAPER_INCREMENTAL", "0") == "1"
+
+# Validité d'un résultat en mode incrémental (surchargeable par source: "ttl_hours")
+DEFAULT_TTL_HOURS = float(os.environ.get("SCRAPER_TTL_HOURS", "12"))
+
+# Messages d'erreur Playwright qui justifient de recréer la page et de réessayer
+CRASH_MARKERS = ("Page crashed", "Target closed")
+
+# ===================================================================
+# DESCRIPTEUR DE SOURCE (dict SOURCE dans chaque scraper)
+# ===================================================================
+# Clés obligatoires:
+#   name               Nom pour les logs et Google Sheets (ex: "HotUKDeals UK")
+#   country            Code pays (ex: "UK")
+#   competitor         Filtre d'URL pour get_competitor_urls (ex: "hotukdeals")
+#   competitor_source  Valeur de la colonne Competitor_Source
+# Clés optionnelles:
+#   browser_args           Arguments de lancement Chromium (navigateur dédié, hors pool)
+#   context_options        Options de new_context (fusionnées avec DEFAULT_CONTEXT_OPTIONS)
+#   init_script            Script injecté dans chaque page (ex: stealth)
+#   http_parse             Parseur du HTML statique (voir http_fastpath): scraping sans navigateur
+#   network_policy         Exceptions au blocage des ressources (voir network_policy), False = aucun blocage
+#   page_per_merchant      Nouvelle page pour chaque marchand (défaut: False)
+#   page_refresh_interval  Recréer la page tous les N marchands (défaut: jamais)
+#   prefetch_depth         Marchands préchargés pendant l'extraction du courant (voir prefetch, 0 = aucun)
+#   xhr_capture            Le scraper lit les codes dans les réponses JSON (xhr_capture): pas de préchargement
+#   recycle_context_every  Nouveau contexte tous les N marchands (voir recycling, 0 = jamais)
+#   recycle_browser_every  Nouveau navigateur tous les M contextes (0 = jamais)
+#   recycle_rss_mb         Seuil de RSS d'un navigateur dédié qui force le recyclage (0 = pas de seuil)
+#   max_retries            Tentatives par marchand si la page crashe (défaut: 1)
+#   shards                 Nombre de shards par défaut (défaut: 1)
+#   ttl_hours              Validité d'un résultat en mode incrémental (défaut: DEFAULT_TTL_HOURS)
+
+
+def split_shards(items: list, shards: int) -> list:
+    """
+    Découpe une liste en `shards` sous-listes entrelacées (0, N, 2N... / 1, N+1...).
+    L'entrelacement répartit les gros marchands entre les shards.
+    """
+    shards = max(1, min(shards, len(items)))
+    return [items[i::shards] for i in range(shards)]
+
+
+def _close_extra_pages(context, keep=()):
+    """Ferme tous les onglets du contexte sauf ceux de `keep` (onglets popup laissés ouverts)."""
+    for p_tab in list(context.pages):
+        if any(p_tab is kept for kept in keep):
+            continue
+        try:
+            p_tab.close()
+        except:
+            pass
+
+
+def _new_context(browser, source: dict, context_options: dict, url: str = None, consented: bool = False):
+    """
+    Ouvre un contexte configuré pour la source: (context, stats réseau).
+
+    Args:
+        url: URL concurrente, pour marquer le contexte qui porte le consentement (consent_state)
+        consented: storage_state hérité d'un contexte qui portait le consentement
+    """
+    context = browser.new_context(**context_options)
+    consent_state.tag_context(context, context_options, url, consented)
+    if source.get("init_script"):
+        context.add_init_script(source["init_script"])
+    return context, network_policy.install(context, source)
+
+
+def _scrape_items(source: dict, scrape_func, items: list, total: int, shard_label: str = "", on_merchant=None,
+                  deadline: float = None):
+    """
+    Scrape une liste de marchands dans un contexte isolé (navigateur du pool ou dédié).
+
+    Args:
+        source: Descripteur de la source
+        scrape_func: Fonction scrape_*_all(page, context, url) -> (codes, affiliate_link)
+        items: Liste de tuples (index global, merchant_row, url)
+        total: Nombre total de marchands de la source (pour les logs)
+        shard_label: Préfixe des logs en mode sharding (ex: "[S2] ")
+        on_merchant: Callback (idx, merchant_row, url, rows, ok, durée) appelé après chaque marchand
+                     - ok=False si le scraping a échoué (rows: codes récupérés avant l'erreur)
+        deadline: Échéance (timestamp epoch): plus aucun marchand n'est commencé après
+
+    Returns:
+        Liste de tuples (index global, CodeRecord du marchand) des marchands visités
+    """
+    context_options = {**DEFAULT_CONTEXT_OPTIONS, **source.get("context_options", {})}
+    # Consentement cookies déjà donné sur le domaine concurrent (runs précédents)
+    consent_url = items[0][2] if items else None
+    context_options = consent_state.with_storage_state(context_options, consent_url)
+    page_per_merchant = source.get("page_per_merchant", False)
+    refresh_interval = source.get("page_refresh_interval")
+    max_retries = source.get("max_retries", 1)
+    prefetch_depth = prefetch.depth_for(source, http_fastpath.is_enabled(source))
+
+    merchant_rows = []
+    codes_count = 0
+    recycler = recycling.Recycler(source, pooled=uses_pool(source.get("browser_args")))
+    rss_peak = 0.0
+
+    with sync_playwright() as p, ExitStack() as browser_stack:
+        browser = browser_stack.enter_context(open_browser(p, source.get("browser_args")))
+        watchdog = recycling.start_watchdog(browser) if recycler.rss_limit_mb else None
+        context, net_stats = _new_context(browser, source, context_options, consent_url)
+        page = None if page_per_merchant else context.new_page()
+        prefetcher = prefetch.Prefetcher(context, prefetch_depth)
+
+        for n, (idx, merchant_row, url) in enumerate(items):
+            merchant_slug = merchant_row.get('Merchant_slug', 'Unknown')
+
+            if deadline and time.time() >= deadline - planner.WRITE_MARGIN_SECONDS:
+                print(f"\n{shard_label}⏰ Échéance atteinte: {len(items) - n} marchands non visités")
+                break
+
+            # Recyclage contexte / navigateur (mémoire bornée), consentement conservé
+            reason, browser_due = recycler.due(watchdog)
+            if reason:
+                print(f"\n{shard_label}♻️ Recyclage du {'navigateur' if browser_due else 'contexte'} ({reason})...")
+                consented = consent_state.context_consented(context, url)
+                context_options = recycling.carry_over(context, context_options, url)
+                context.close()
+                if browser_due:
+                    if watchdog:
+                        rss_peak = max(rss_peak, watchdog.peak_mb)
+                        watchdog.stop()
+                    browser_stack.close()
+                    browser = browser_stack.enter_context(open_browser(p, source.get("browser_args")))
+                    watchdog = recycling.start_watchdog(browser) if recycler.rss_limit_mb else None
+                recycler.recycled(browser_due, watchdog)
+                context, net_stats = _new_context(browser, source, context_options, url, consented)
+                page = None if page_per_merchant else context.new_page()
+                prefetcher.reset(context)
+
+            prefetched = prefetcher.take(url)
+            if prefetched:
+                page = prefetched
+            elif page_per_merchant:
+                page = context.new_page()
+            elif refresh_interval and n > 0 and n % refresh_interval == 0:
+                # Recréer la page périodiquement
+                print(f"\n{shard_label}🔄 Refresh de la page (prévention memory leak)...")
+                _close_extra_pages(context)
+                page = context.new_page()
+
+            print(f"\n{shard_label}[{idx}/{total}] 🏪 {merchant_slug}")
+            print(f"{shard_label}   URL: {url[:60]}...")
+
+            # Le marchand suivant se charge pendant l'extraction de celui-ci
+            prefetcher.schedule([item[2] for item in items[n + 1:]])
+
+            rows = []
+            ok = False
+            started = time.monotonic()
+            for attempt in range(max_retries):
+                try:
+                    # Mode HTTP (codes dans le HTML statique): le navigateur n'est qu'un fallback
+                    fast = http_fastpath.scrape(source, url) if attempt == 0 else None
+                    codes, affiliate_link = fast or scrape_func(page, context, url)
+                    print(f"{shard_label}   ✅ {len(codes)} codes trouvés")
+                    if affiliate_link:
+                        print(f"{shard_label}   🔗 Affiliate: {affiliate_link[:50]}...")
+                    rows = records.build_records(source, merchant_row, url, codes, affiliate_link)
+                    ok = True
+                    break
+
+                except Exception as e:
+                    error_msg = str(e)
+                    # Codes récupérés avant l'erreur (records.ScrapeFailed): écrits, marchand non validé
+                    rows = records.partial_records(e, source, merchant_row, url)
+                    if max_retries > 1 and any(marker in error_msg for marker in CRASH_MARKERS):
+                        print(f"{shard_label}   ⚠️ Page crashed (attempt {attempt + 1}/{max_retries}), recréation...")
+                        _close_extra_pages(context)
+                        page = context.new_page()
+                        if attempt == max_retries - 1:
+                            print(f"{shard_label}   ❌ Échec après {max_retries} tentatives")
+                    else:
+                        print(f"{shard_label}   ❌ Erreur: {error_msg[:50]} ({len(rows)} codes avant l'erreur)")
+                        break
+
+            merchant_rows.append((idx, rows))
+            codes_count += len(rows)
+            recycler.merchant_done()
+            if on_merchant:
+                on_merchant(idx, merchant_row, url, rows, ok, time.monotonic() - started)
+            print(f"{shard_label}   📝 Total: {codes_count} codes")
+            if net_stats:
+                print(f"{shard_label}   {network_policy.format_stats(net_stats.take())}")
+            tab_peak = tab_manager.take_peak(context)
+            if tab_peak and tab_peak > 1:
+                print(f"{shard_label}   🗂️ Onglets: pic {tab_peak}")
+
+            # Fermer les onglets popup éventuels (garder la page principale)
+            _close_extra_pages(context, keep=prefetcher.pages() + ([] if page_per_merchant else [page]))
+
+        context.close()
+        if prefetch_depth:
+            print(f"{shard_label}{prefetcher.format_stats()}")
+        if watchdog:
+            watchdog.stop()
+            rss_peak = max(rss_peak, watchdog.peak_mb)
+    if rss_peak:
+        print(f"{shard_label}🧠 RSS navigateur: pic {rss_peak:.0f} Mo")
+
+    return merchant_rows
+
+
+def _run_shards(source: dict, scrape_func, shard_items: list, total: int, on_merchant=None, deadline: float = None) -> list:
+    """Lance les shards (un thread par shard) et retourne les (index, lignes) des marchands visités."""
+    if len(shard_items) == 1:
+        return _scrape_items(source, scrape_func, shard_items[0], total, on_merchant=on_merchant, deadline=deadline)
+
+    print(f"⚡ {len(shard_items)} shards en parallèle (~{len(shard_items[0])} marchands chacun)")
+    merchant_rows = []
+    with ThreadPoolExecutor(max_workers=len(shard_items)) as executor:
+        futures = [
+            executor.submit(_scrape_items, source, scrape_func, chunk, total, f"[S{i}] ", on_merchant, deadline)
+            for i, chunk in enumerate(shard_items, 1)
+        ]
+        for future in futures:
+            try:
+                merchant_rows.extend(future.result())
+            except Exception as e:
+                # Un shard perdu (navigateur crashé) ne fait pas perdre les autres
+                print(f"❌ Shard en erreur: {str(e)[:50]}")
+    return merchant_rows
+
+
+def load_items(source: dict) -> list:
+    """Charge les URLs de la source depuis Google Sheets: liste de tuples (index, merchant_row, url)."""
+    print(f"📖 Chargement depuis Google Sheets...")
+
+    # Charger les URLs depuis Google Sheets
+    competitor_data = get_competitor_urls(source["country"], source["competitor"])
+    print(f"📍 {source['name']}: {len(competitor_data)} URLs uniques")
+
+    if len(competitor_data) == 0:
+        print(f"❌ Aucune URL {source['name']} trouvée")
+        return []
+
+    return [(idx, merchant_row, url) for idx, (merchant_row, url) in enumerate(competitor_data, 1)]
+
+
+def resume_items(source: dict, items: list):
+    """
+    Sépare les marchands déjà terminés aujourd'hui (checkpoint) de ceux qui restent.
+
+    Returns:
+        Tuple (items restants, [(index, lignes)] des marchands repris du checkpoint)
+    """
+    done = checkpoint.load_checkpoint(source["name"])
+    if not done:
+        return items, []
+
+    remaining = [item for item in items if item[2] not in done]
+    resumed = [(idx, records.from_dicts(done[url]["rows"])) for idx, _, url in items if url in done]
+    print(f"♻️ Reprise: {len(resumed)} URLs déjà terminées aujourd'hui, {len(remaining)} restantes")
+    return remaining, resumed
+
+
+def skip_fresh_items(source: dict, items: list, ttl_hours: float = None):
+    """
+    Mode incrémental: sépare les URLs scrapées depuis moins de ttl_hours des autres.
+
+    Returns:
+        Tuple (items à scraper, [(index, lignes)] réutilisées depuis le ledger)
+    """
+    ttl_hours = ttl_hours or source.get("ttl_hours", DEFAULT_TTL_HOURS)
+    fresh = ledger.load_fresh(source["name"], ttl_hours)
+    if not fresh:
+        return items, []
+
+    today = records.today()
+    remaining = [item for item in items if item[2] not in fresh]
+    cached = [
+        (idx, records.from_dicts(fresh[url]["rows"], date=today))
+        for idx, _, url in items if url in fresh
+    ]
+    print(f"⏭️ Incrémental: {len(cached)} URLs scrapées depuis moins de {ttl_hours:g}h (codes réutilisés), "
+          f"{len(remaining)} à scraper")
+    return remaining, cached
+
+
+def record_merchant(source: dict, run_id: str):
+    """
+    Callback on_merchant: durée (planner) pour chaque marchand,
+    checkpoint + ledger pour chaque marchand scrapé avec succès.
+    Un marchand en échec (ok=False, même avec des codes partiels) n'est ni checkpointé
+    ni enregistré au ledger: il reste à scraper en reprise et en mode incrémental.
+    """
+    def on_merchant(idx, merchant_row, url, rows, ok, duration):
+        try:
+            planner.record_duration(source["name"], url, duration)
+            if ok:
+                stored = records.to_dicts(rows)
+                checkpoint.save_url(source["name"], url, run_id, stored)
+                ledger.record(source["name"], url, stored)
+        except Exception as e:
+            print(f"⚠️ Checkpoint non enregistré: {str(e)[:50]}")
+    return on_merchant
+
+
+def chain_callbacks(*callbacks):
+    """Combine plusieurs callbacks on_merchant en un seul (les None sont ignorés)."""
+    callbacks = [callback for callback in callbacks if callback]
+
+    def on_merchant(*args):
+        for callback in callbacks:
+            callback(*args)
+    return on_merchant
+
+
+def plan_for_deadline(source: dict, items: list, deadline: float, workers: int = 1):
+    """Planifie les marchands pour l'échéance (voir planner.plan_items) et affiche le plan."""
+    planned, cut = planner.plan_items(
+        source["name"], items, deadline, workers=workers, codes_by_url=ledger.load_codes_counts(source["name"])
+    )
+    minutes = max(0, (deadline - time.time()) / 60)
+    print(f"⏱️ Budget: {minutes:.0f} min -> {len(planned)} URLs planifiées, {len(cut)} coupées")
+    return planned, cut
+
+
+def report_unvisited(source: dict, run_id: str, deadline: float, planned: list, cut: list, merchant_rows: list) -> list:
+    """Enregistre et affiche les URLs non visitées d'un run à budget (retourne leur liste)."""
+    visited = {idx for idx, _ in merchant_rows}
+    unvisited = cut + [item for item in planned if item[0] not in visited]
+    unvisited_urls = [url for _, _, url in sorted(unvisited, key=lambda item: item[0])]
+    planner.save_report(source["name"], run_id, deadline, len(planned), len(visited), unvisited_urls)
+    if unvisited_urls:
+        print(f"\n⚠️ {len(unvisited_urls)} URLs non visitées (budget de temps):")
+        for url in unvisited_urls[:10]:
+            print(f"   - {url[:80]}")
+        if len(unvisited_urls) > 10:
+            print(f"   ... et {len(unvisited_urls) - 10} autres")
+    return unvisited_urls
+
+
+def open_sink(source: dict):
+    """
+    Sink d'écriture en flux de la source (None si SCRAPER_STREAMING=0).
+    Chaque lot est écrit sans renettoyage (le sink nettoie au fil de l'eau), puis ses
+    URLs sont vidées dans le checkpoint.
+    """
+    if not result_pipeline.STREAMING_ENABLED:
+        return None
+    return result_pipeline.ResultSink(
+        write=lambda chunk: append_to_gsheet(chunk, source_name=source["name"], skip_cleaning=True),
+        on_written=lambda urls: checkpoint.mark_written(source["name"], urls=urls),
+        name=f"sink-{source['name']}"
+    )
+
+
+def write_results(source: dict, merchant_rows: list, complete: bool = True, sink=None) -> int:
+    """
+    Fusionne les lignes des marchands dans l'ordre d'origine et les écrit dans Google Sheets.
+    Avec un sink, les lignes sont déjà parties pendant le run: seul le dernier lot est écrit.
+
+    Args:
+        source: Descripteur de la source
+        merchant_rows: Liste de tuples (index global, CodeRecord du marchand)
+        complete: False si des URLs restent à visiter (budget): le checkpoint est gardé
+        sink: ResultSink du run (voir open_sink)
+
+    Returns:
+        int: Nombre de codes récupérés (avant nettoyage)
+    """
+    if sink is not None:
+        codes = sink.close()
+        sink.report()
+    else:
+        # Fusionner dans l'ordre d'origine des marchands
+        merchant_rows.sort(key=lambda item: item[0])
+        all_results = [row for _, rows in merchant_rows for row in rows]
+        codes = len(all_results)
+        if all_results:
+            # Écriture directe dans Google Sheets
+            append_to_gsheet(all_results, source_name=source["name"])
+
+    if codes:
+        print(f"\n{'='*60}")
+        print(f"✅ {source['name'].upper()} TERMINÉ!")
+        print(f"📊 {codes} codes récupérés et envoyés à Google Sheets")
+        print(f"{'='*60}")
+    else:
+        print(f"\n⚠️ Aucun code trouvé")
+
+    if complete:
+        # Run complet et écrit: le prochain run repart de zéro
+        checkpoint.clear_checkpoint(source["name"])
+    else:
+        # Run partiel: la reprise ne fera que les URLs restantes
+        checkpoint.mark_written(source["name"])
+
+    # Checkpoints des jours précédents jamais repris (toutes sources)
+    try:
+        purged = checkpoint.purge_checkpoints()
+        if purged:
+            print(f"🧹 {purged} checkpoints de plus de {checkpoint.KEEP_DAYS} jours supprimés")
+    except Exception as e:
+        print(f"⚠️ Purge des checkpoints impossible: {str(e)[:50]}")
+
+    return codes
+
+
+def run_source(source: dict, scrape_func, shards: int = None, resume: bool = None, incremental: bool = None,
+               ttl_hours: float = None, budget_minutes: float = None, deadline: float = None, job_id: str = None):
+    """
+    Scrape toutes les URLs d'une source et écrit les résultats dans Google Sheets.
+
+    Args:
+        source: Descripteur de la source (voir en-tête du module)
+        scrape_func: Fonction scrape_*_all(page, context, url) -> (codes, affiliate_link)
+        shards: Nombre de contextes navigateur en parallèle (défaut: SCRAPER_SHARDS ou source["shards"])
+        resume: Reprendre le checkpoint du jour (défaut: RESUME_ENABLED)
+        incremental: Sauter les URLs encore valides dans le ledger (défaut: INCREMENTAL_ENABLED)
+        ttl_hours: Validité d'un résultat en mode incrémental (défaut: source["ttl_hours"])
+        budget_minutes: Budget de temps du run (résultats partiels écrits avant l'échéance)
+        deadline: Échéance absolue (timestamp epoch), prioritaire sur budget_minutes (ex: budget d'un job)
+        job_id: Job API du run: la progression est publiée dans ses événements (progress_events)
+
+    Returns:
+        int: Nombre de codes récupérés (avant nettoyage)
+    """
+    items = load_items(source)
+    if not items:
+        progress_events.emit(job_id, "source_finished", {"source": source["name"], "codes": 0})
+        return 0
+
+    total = len(items)
+    if resume is None:
+        resume = RESUME_ENABLED
+    if incremental is None:
+        incremental = INCREMENTAL_ENABLED
+    deadline = planner.deadline_from_budget(budget_minutes, deadline)
+
+    run_id = checkpoint.new_run_id()
+    resumed_rows = []
+    if resume:
+        items, resumed_rows = resume_items(source, items)
+    if incremental:
+        items, cached_rows = skip_fresh_items(source, items, ttl_hours)
+        resumed_rows += cached_rows
+
+    shards = shards or DEFAULT_SHARDS or source.get("shards", 1)
+    planned, cut = items, []
+    if deadline and items:
+        planned, cut = plan_for_deadline(source, items, deadline, workers=shards)
+
+    progress_events.emit(job_id, "source_started", {
+        "source": source["name"], "total": total, "reused": len(resumed_rows), "to_scrape": len(planned)
+    })
+    # Lignes réutilisées (reprise, ledger) écrites dès le premier lot
+    sink = open_sink(source)
+    if sink is not None:
+        sink.feed(resumed_rows)
+    if not planned:
+        unvisited = report_unvisited(source, run_id, deadline, planned, cut, []) if deadline else []
+        return _finish_source(source, resumed_rows, unvisited, job_id, sink)
+
+    shard_items = split_shards(planned, shards)
+    # Sink en dernier: il prend possession des lignes après checkpoint et progression
+    on_merchant = chain_callbacks(
+        record_merchant(source, run_id),
+        progress_events.merchant_progress(job_id, source, total, already_done=len(resumed_rows)) if job_id else None,
+        sink.on_merchant if sink is not None else None
+    )
+
+    print(f"\n🚀 Lancement de Playwright...")
+
+    # Pool démarré pour ce run uniquement (run standalone sans pool API)
+    run_pool = None
+    if POOL_SIZE > 0 and get_pool() is None and not source.get("browser_args"):
+        try:
+            run_pool = start_pool(min(POOL_SIZE, len(shard_items)))
+        except Exception as e:
+            print(f"⚠️ Pool de navigateurs indisponible, navigateurs dédiés: {str(e)[:50]}")
+
+    try:
+        merchant_rows = _run_shards(source, scrape_func, shard_items, total, on_merchant, deadline)
+    except BaseException:
+        # Les lignes déjà reçues sont écrites malgré l'erreur
+        if sink is not None:
+            sink.close()
+        raise
+    finally:
+        if run_pool is not None:
+            stop_pool()
+
+    unvisited = report_unvisited(source, run_id, deadline, planned, cut, merchant_rows) if deadline else []
+
+    return _finish_source(source, resumed_rows + merchant_rows, unvisited, job_id, sink)
+
+
+def _finish_source(source: dict, merchant_rows: list, unvisited: list, job_id: str = None, sink=None) -> int:
+    """Écrit les résultats (dernier lot du sink) et publie la fin de la source (avec les URLs non visitées)."""
+    complete = not unvisited
+    codes = write_results(source, merchant_rows, complete=complete, sink=sink)
+    print(waits.format_wait_stats(waits.get_wait_stats(reset=True)))
+    tab_stats = tab_manager.get_tab_stats(reset=True)
+    if tab_stats["merchants"]:
+        print(tab_manager.format_tab_stats(tab_stats))
+    selector_cascade.flush()
+    cascade_stats = selector_cascade.get_cascade_stats(reset=True)
+    if cascade_stats["resolutions"]:
+        print(selector_cascade.format_cascade_stats(cascade_stats))
+    progress_events.emit(job_id, "source_finished", {
+        "source": source["name"], "codes": codes, "complete": complete, "unvisited": unvisited
+    })
+    return codes
@@ -0,0 +1,153 @@
+"""
+Cascades de sélecteurs adaptatives: le sélecteur gagnant d'un domaine est essayé en premier.
+
+Les scrapers essaient souvent plusieurs variantes dans l'ordre (boutons "See code" /
+"Ver código" / "Get Code"...): chaque variante vide coûte un count() sur tout le
+document, à chaque marchand et à chaque tour de boucle.
+Ici, chaque sélecteur qui trouve des éléments est compté par (domaine, cascade), et les
+cascades suivantes du domaine commencent par les sélecteurs qui ont le plus servi:
+le cas courant coûte une requête au lieu de cinq.
+- Compteurs persistés dans SQLite (state_store, table selector_stats): l'ordre appris
+  survit aux redémarrages; écrits par lot (flush) en fin de source
+- keep_last: le dernier sélecteur d'une cascade est souvent un fallback générique plus
+  large que les autres; il reste en dernier pour ne pas changer les résultats
+- Réservé aux variantes mutuellement exclusives (une seule trouve des éléments sur une
+  page donnée): sinon l'ordre appris changerait les éléments choisis. Les boutons de
+  fermeture de popup ne s'y prêtent pas (plusieurs visibles à la fois, voir dom_extract)
+"""
+
+import threading
+from datetime import datetime
+
+from politeness import get_domain
+from state_store import get_connection
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS selector_stats (
+    domain TEXT NOT NULL,
+    cascade TEXT NOT NULL,
+    selector TEXT NOT NULL,
+    hits INTEGER NOT NULL,
+    last_hit TEXT NOT NULL,
+    PRIMARY KEY (domain, cascade, selector)
+);
+"""
+
+_lock = threading.Lock()
+_hits = {}          # (domaine, cascade) -> {sélecteur: hits}, chargé depuis SQLite au premier accès
+_pending = {}       # (domaine, cascade, sélecteur) -> hits pas encore écrits
+_stats = {"resolutions": 0, "queries": 0}
+
+
+def _connect():
+    return get_connection("selector_stats", _SCHEMA)
+
+
+def page_domain(page) -> str:
+    """Domaine de la page courante ("" si l'URL est illisible)."""
+    try:
+        return get_domain(page.url)
+    except Exception:
+        return ""
+
+
+def _load(domain: str, cascade: str) -> dict:
+    key = (domain, cascade)
+    with _lock:
+        if key in _hits:
+            return _hits[key]
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT selector, hits FROM selector_stats WHERE domain = ? AND cascade = ?", (domain, cascade)
+            ).fetchall()
+        finally:
+            conn.close()
+        loaded = {row["selector"]: row["hits"] for row in rows}
+    except Exception:
+        loaded = {}
+    with _lock:
+        return _hits.setdefault(key, loaded)
+
+
+def ordered(domain: str, cascade: str, selectors: list, keep_last: bool = True) -> list:
+    """Sélecteurs triés par nombre de hits sur le domaine (ordre d'origine à égalité)."""
+    if len(selectors) < 2:
+        return list(selectors)
+    hits = _load(domain, cascade)
+    movable = selectors[:-1] if keep_last else selectors
+    with _lock:
+        order = sorted(movable, key=lambda selector: -hits.get(selector, 0))
+    return order + [selectors[-1]] if keep_last else order
+
+
+def record_hit(domain: str, cascade: str, selector: str):
+    """Compte un sélecteur gagnant (en mémoire; écrit dans SQLite au prochain flush)."""
+    hits = _load(domain, cascade)
+    with _lock:
+        hits[selector] = hits.get(selector, 0) + 1
+        key = (domain, cascade, selector)
+        _pending[key] = _pending.get(key, 0) + 1
+
+
+def resolve(page, cascade: str, selectors: list, keep_last: bool = True):
+    """
+    Premier sélecteur de la cascade qui trouve des éléments, dans l'ordre appris pour le domaine.
+
+    Returns:
+        (locator, count, sélecteur) - count = 0 et sélecteur None si aucun ne trouve rien
+    """
+    domain = page_domain(page)
+    locator, queries = None, 0
+    for selector in ordered(domain, cascade, selectors, keep_last):
+        locator = page.locator(selector)
+        count = locator.count()
+        queries += 1
+        if count:
+            record_hit(domain, cascade, selector)
+            break
+    else:
+        count, selector = 0, None
+    with _lock:
+        _stats["resolutions"] += 1
+        _stats["queries"] += queries
+    return locator, count, selector
+
+
+def flush():
+    """Écrit les hits en attente dans SQLite (appelé en fin de source)."""
+    with _lock:
+        pending = list(_pending.items())
+        _pending.clear()
+    if not pending:
+        return
+    now = datetime.now().isoformat(timespec="seconds")
+    try:
+        conn = _connect()
+        try:
+            conn.executemany(
+                "INSERT INTO selector_stats (domain, cascade, selector, hits, last_hit) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (domain, cascade, selector) DO UPDATE SET hits = hits + excluded.hits, "
+                "last_hit = excluded.last_hit",
+                [(domain, cascade, selector, hits, now) for (domain, cascade, selector), hits in pending]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Stats de sélecteurs non sauvegardées: {str(e)[:50]}")
+
+
+def get_cascade_stats(reset: bool = False) -> dict:
+    """Résolutions de cascades du process: {resolutions, queries}."""
+    with _lock:
+        stats = dict(_stats)
+        if reset:
+            _stats.update(resolutions=0, queries=0)
+    return stats
+
+
+def format_cascade_stats(stats: dict) -> str:
+    per_resolution = stats["queries"] / stats["resolutions"] if stats["resolutions"] else 0
+    return f"🎯 Sélecteurs: {stats['resolutions']} cascades, {per_resolution:.2f} requêtes par cascade"
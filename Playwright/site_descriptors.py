@@ -0,0 +1,121 @@
+"""
+Descripteurs de sites déclaratifs (sites/<nom>.json), compilés une fois par processus.
+
+Les connaissances propres à chaque site (sélecteurs, cascades de fallbacks, marqueurs
+d'expiration, exclusions "marchands similaires", timeouts) sont des données: un nouveau
+site ou un sélecteur cassé se corrige dans le JSON, sans toucher au code des scrapers.
+La compilation transforme le descripteur en ce qu'attendent les moteurs:
+- Références $nom remplacées par les marqueurs partagés (MARKERS), ex: ${card_description}
+- Boutons {"title", "condition", "exclude"} -> XPath (vouchers_ui.button_xpath)
+- Cartes {"card", "expired", "has", "within", "fields"} -> spec du script d'extraction
+  groupée (dom_extract.extract_cards): un seul evaluate pour toute la liste
+Le résultat est mis en cache: aucune chaîne XPath n'est reconstruite dans les boucles.
+
+Format:
+    {
+        "engine": "vouchers_ui" | "cards",
+        ...clés du moteur (voir vouchers_ui.py pour "vouchers_ui"),
+        "buttons": ["css ou xpath", {"title": "See code", "exclude": ["expired", "similar"]}, ...],
+        "next_buttons": [...],                  # même format que buttons
+        "cards": {                              # moteur "cards"
+            "card": "css des cartes",
+            "expired": ["classe", ...],         # cartes expirées (classe sur la carte)
+            "has": ["css", ...],                # cartes exclues si elles contiennent ce sélecteur
+            "within": "css",                    # cartes exclues dans ces conteneurs
+            "fields": {"code": [règle, ...], "title": [règle, ...]}   # règles dom_extract
+        }
+    }
+"""
+
+import json
+import os
+from string import Template
+
+from vouchers_ui import (CARD_DESCRIPTION_SELECTOR, CARD_SELECTOR, CLOSE_ICON_SELECTOR, EXPIRED_CLASS,
+                         SIMILAR_CLASS, button_xpath)
+
+SITES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sites")
+
+# Marqueurs partagés, utilisables dans les descripteurs via $nom / ${nom}
+MARKERS = {
+    "card": CARD_SELECTOR,
+    "card_description": CARD_DESCRIPTION_SELECTOR,
+    "close_icon": CLOSE_ICON_SELECTOR,
+    "expired": EXPIRED_CLASS,
+    "similar": SIMILAR_CLASS,
+}
+
+# Clés obligatoires par moteur
+REQUIRED_KEYS = {
+    "vouchers_ui": ("tag", "competitor", "ready_selector", "cookie_buttons", "buttons",
+                    "popup_code_selector", "popup_spec"),
+    "cards": ("competitor", "cards"),
+}
+
+_compiled = {}
+
+
+def _substitute(value):
+    """Remplace les références $nom dans toutes les chaînes du descripteur."""
+    if isinstance(value, str):
+        return Template(value).safe_substitute(MARKERS)
+    if isinstance(value, list):
+        return [_substitute(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _substitute(item) for key, item in value.items()}
+    return value
+
+
+def _compile_button(button) -> str:
+    """Bouton: sélecteur brut, ou {"title", "condition", "exclude"} compilé en XPath."""
+    if isinstance(button, str):
+        return button
+    exclude = tuple(MARKERS.get(name, name) for name in button.get("exclude", ("expired", "similar")))
+    return button_xpath(button.get("title"), exclude=exclude, condition=button.get("condition"))
+
+
+def _compile_cards(cards: dict) -> dict:
+    """Cartes: classes d'expiration repliées dans le sélecteur CSS de la carte."""
+    selector = cards["card"] + "".join(f":not(.{css_class})" for css_class in cards.get("expired", []))
+    return {
+        "card": selector,
+        "has": cards.get("has", []),
+        "within": cards.get("within"),
+        "fields": cards["fields"],
+    }
+
+
+def compile_site(descriptor: dict, name: str = "?") -> dict:
+    """
+    Compile un descripteur brut.
+
+    Raises:
+        ValueError: moteur inconnu ou clé obligatoire manquante
+    """
+    engine = descriptor.get("engine", "vouchers_ui")
+    if engine not in REQUIRED_KEYS:
+        raise ValueError(f"Site {name}: moteur inconnu '{engine}'")
+    missing = [key for key in REQUIRED_KEYS[engine] if key not in descriptor]
+    if missing:
+        raise ValueError(f"Site {name}: clés manquantes {', '.join(missing)}")
+
+    site = _substitute(descriptor)
+    for key in ("buttons", "next_buttons"):
+        if key in site:
+            site[key] = [_compile_button(button) for button in site[key]]
+    if "cards" in site:
+        site["cards"] = _compile_cards(site["cards"])
+    return site
+
+
+def load_site(name: str) -> dict:
+    """Descripteur compilé de sites/<name>.json (compilé au premier appel, puis en cache)."""
+    if name not in _compiled:
+        with open(os.path.join(SITES_DIR, f"{name}.json"), encoding="utf-8") as f:
+            _compiled[name] = compile_site(json.load(f), name)
+    return _compiled[name]
+
+
+def list_sites() -> list:
+    """Noms des descripteurs disponibles."""
+    return sorted(entry[:-5] for entry in os.listdir(SITES_DIR) if entry.endswith(".json"))
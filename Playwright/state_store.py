@@ -0,0 +1,45 @@
+"""
+Module commun pour l'état local persistant des scrapers (base SQLite).
+Utilisé par le registre des jobs et les autres données qui doivent survivre
+à un redémarrage du process.
+"""
+
+import os
+import sqlite3
+
+# Dossier de l'état local - surchargeable (ex: volume monté sur Cloud Run)
+STATE_DIR = os.environ.get(
+    "SCRAPER_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "state")
+)
+STATE_DB_PATH = os.path.join(STATE_DIR, "scraper_state.db")
+
+# Schémas déjà créés dans ce process (évite de rejouer les CREATE à chaque appel)
+_initialized_schemas = set()
+
+
+def get_connection(schema_name: str = None, schema_sql: str = None):
+    """
+    Ouvre une connexion SQLite sur la base d'état.
+
+    Une connexion par appel: la base est partagée entre threads et processus workers,
+    SQLite gère le verrouillage (mode WAL).
+
+    Args:
+        schema_name: Nom du schéma à garantir (ex: "jobs")
+        schema_sql: Script SQL (CREATE TABLE IF NOT EXISTS ...) exécuté une fois par process
+
+    Returns:
+        sqlite3.Connection avec row_factory = sqlite3.Row
+    """
+    os.makedirs(STATE_DIR, exist_ok=True)
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+
+    if schema_name and schema_name not in _initialized_schemas:
+        conn.executescript(schema_sql)
+        conn.commit()
+        _initialized_schemas.add(schema_name)
+
+    return conn
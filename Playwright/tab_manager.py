@@ -0,0 +1,170 @@
+"""
+Gestion des onglets ouverts par les scrapers à chaîne de popups.
+
+VoucherCodes, Cuponation, Pepper (HotUKDeals, Chollometro, mydealz), Sparwelt et
+Codice-Sconto ouvrent un onglet par code. Les onglets étaient suivis à la main
+(context.pages[-1], new_page.close(), context.pages[1:]) et restaient ouverts quand une
+exception cassait la boucle: la mémoire montait au fil d'un long run.
+
+TabManager possède tous les onglets ouverts dans le contexte après sa création (écouteur
+context.on("page")), sauf la page d'origine:
+- open(click) clique et renvoie le nouvel onglet, en fermant celui qu'il remplace
+- au-delà de TAB_MANAGER_MAX_TABS onglets possédés, les plus anciens sont fermés
+- close() ferme tous les onglets possédés (à appeler dans le finally du scraper)
+- le pic d'onglets ouverts (page d'origine comprise) est enregistré par marchand
+
+Usage dans un scraper:
+    tabs = TabManager(context, page)                       # avant polite_goto
+    new_page = tabs.open(lambda: polite_click(page, btn))  # None si aucun onglet
+    new_page = tabs.open(lambda: polite_click(new_page, next_btn), replace=new_page)
+    ...
+    tabs.close()                                           # dans le finally du scraper
+"""
+
+import os
+import threading
+import time
+import weakref
+
+from waits import record_wait, scaled_timeout
+
+# Onglets possédés ouverts simultanément au maximum (hors page d'origine)
+MAX_TABS = int(os.environ.get("TAB_MANAGER_MAX_TABS", "2"))
+
+# Pic du dernier marchand par contexte (lu par le runner) et pics de la source
+_last_peaks = weakref.WeakKeyDictionary()
+_peaks = []
+_stats_lock = threading.Lock()
+
+
+class TabManager:
+    """Onglets ouverts par un scraper pour un marchand."""
+
+    def __init__(self, context, page, max_tabs: int = None):
+        self.context = context
+        self.page = page
+        self.max_tabs = max_tabs or MAX_TABS
+        self.tabs = []              # onglets possédés encore ouverts, du plus ancien au plus récent
+        self.peak = 1
+        self._lock = threading.Lock()
+        try:
+            context.on("page", self._on_page)
+        except Exception:
+            pass
+
+    def _on_page(self, new_page):
+        if new_page is self.page:
+            return
+        with self._lock:
+            self.tabs.append(new_page)
+            self.peak = max(self.peak, len(self.tabs) + 1)
+        try:
+            new_page.on("close", self._on_close)
+        except Exception:
+            pass
+
+    def _on_close(self, closed_page):
+        with self._lock:
+            if closed_page in self.tabs:
+                self.tabs.remove(closed_page)
+
+    def _newest(self):
+        with self._lock:
+            return self.tabs[-1] if self.tabs else None
+
+    def close_tab(self, tab):
+        """Ferme un onglet possédé (jamais la page d'origine)."""
+        if tab is None or tab is self.page:
+            return
+        try:
+            tab.close()
+        except Exception:
+            pass
+        self._on_close(tab)
+
+    def trim(self, keep=None):
+        """Ferme les onglets les plus anciens au-delà de max_tabs (`keep` n'est jamais fermé)."""
+        while True:
+            with self._lock:
+                extra = [tab for tab in self.tabs if tab is not keep][:max(0, len(self.tabs) - self.max_tabs)]
+            if not extra:
+                return
+            for tab in extra:
+                self.close_tab(tab)
+
+    def open(self, click, timeout: int = 3000, replace=None, name: str = "new_page"):
+        """
+        Clique (click: fonction sans argument) et attend l'onglet ouvert par le clic.
+
+        Les erreurs du clic remontent; l'attente ne lève jamais. Si un onglet s'ouvre,
+        `replace` est fermé et les onglets en trop sont fermés.
+
+        Returns:
+            Le nouvel onglet (chargé jusqu'à domcontentloaded), ou None
+        """
+        before = self._newest()
+        click()
+
+        started = time.monotonic()
+        new_page = None
+        try:
+            new_page = self._newest()
+            if new_page is before:
+                new_page = self.context.wait_for_event("page", predicate=lambda p: p is not self.page,
+                                                       timeout=scaled_timeout(timeout))
+            new_page.wait_for_load_state("domcontentloaded", timeout=scaled_timeout(timeout))
+        except Exception:
+            if new_page is before:
+                new_page = None
+        record_wait(name, started, new_page is not None)
+
+        if new_page is not None:
+            if replace is not new_page:
+                self.close_tab(replace)
+            self.trim(keep=new_page)
+        return new_page
+
+    def close(self) -> int:
+        """
+        Ferme tous les onglets possédés et retire l'écouteur du contexte.
+
+        Returns:
+            Pic d'onglets ouverts pendant le marchand (page d'origine comprise)
+        """
+        try:
+            self.context.remove_listener("page", self._on_page)
+        except Exception:
+            pass
+        with self._lock:
+            tabs = list(self.tabs)
+        for tab in tabs:
+            self.close_tab(tab)
+        with _stats_lock:
+            _last_peaks[self.context] = self.peak
+            _peaks.append(self.peak)
+        return self.peak
+
+
+def take_peak(context):
+    """Pic d'onglets du dernier marchand scrapé dans `context` (None si pas de TabManager)."""
+    with _stats_lock:
+        return _last_peaks.pop(context, None)
+
+
+def get_tab_stats(reset: bool = False) -> dict:
+    """Pics d'onglets du process: {"merchants", "max_peak", "avg_peak"}."""
+    with _stats_lock:
+        peaks = list(_peaks)
+        if reset:
+            _peaks.clear()
+    if not peaks:
+        return {"merchants": 0, "max_peak": 0, "avg_peak": 0.0}
+    return {"merchants": len(peaks), "max_peak": max(peaks), "avg_peak": sum(peaks) / len(peaks)}
+
+
+def format_tab_stats(stats: dict) -> str:
+    """Résumé d'une ligne des pics d'onglets (pour les logs de fin de source)."""
+    if not stats["merchants"]:
+        return "🗂️ Onglets: aucun suivi"
+    return (f"🗂️ Onglets: pic max {stats['max_peak']}, moyenne {stats['avg_peak']:.1f} "
+            f"({stats['merchants']} marchands)")
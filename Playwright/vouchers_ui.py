@@ -0,0 +1,232 @@
+"""
+Moteur commun des sites "vouchers-ui" (plateforme Pepper / Cuponation).
+
+HotUKDeals, Chollometro, mydealz et Cuponation AU/ES/IT partagent le même front:
+cartes vouchers-ui-voucher-card, popup de code (h4.b8qpi79), CloseIcon, sections
+exclues (jkau50 = offres expirées, _1hla7140 = marchands similaires). Le déroulé est
+le même pour tous:
+1. Page du marchand, consentement, boutons de code valides (hors expirés / similaires)
+2. Titres des cartes en un evaluate, clic sur le premier bouton -> nouvel onglet
+3. Lien affilié (redirection de la page d'origine); codes lus en JSON si la capture
+   couvre toutes les cartes (pas de boucle d'onglets)
+4. Boucle: état de la popup en un evaluate, fermeture, bouton suivant -> nouvel onglet
+
+Chaque scraper ne fournit que la configuration de son site (SITE), décrite dans
+sites/<site>.json et compilée par site_descriptors.load_site.
+
+Clés obligatoires:
+    tag                   Préfixe des logs (ex: "[HotUKDeals]")
+    competitor            Marqueur d'URL du site (capture du lien affilié)
+    ready_selector        Élément attendu au chargement de la page
+    cookie_buttons        Boutons du bandeau cookies
+    buttons               Sélecteurs des boutons de code, essayés dans l'ordre (premier non vide)
+    popup_code_selector   Code de la popup (attente d'ouverture / de fermeture)
+    popup_spec            Descripteur dom_extract de la popup (code, titre, fermeture)
+Clés optionnelles:
+    next_buttons          Sélecteurs des boutons dans l'onglet de la popup (défaut: buttons)
+    adaptive_buttons      Essayer d'abord le sélecteur qui a le plus servi sur le domaine
+                          (variantes interchangeables uniquement, voir selector_cascade)
+    dismiss_selector      Popup à fermer après le consentement
+    card_title_selector   Titre d'une carte, cherché depuis le bouton (défaut: "h3")
+    click_js              Clic JavaScript (el.click()) au lieu d'un clic Playwright
+    first_tab_required    Sans nouvel onglet au premier clic: abandon (défaut) ou page d'origine
+    next_tab_required     Sans nouvel onglet au clic suivant: arrêt (défaut) ou onglet courant
+    card_title_fallback   Titre de la carte si la popup n'en a pas
+    title_placeholder     Titre par défaut, ex: "Offre {n}" (sinon le code est ignoré)
+    dedupe_titles         Ignorer les titres déjà vus (défaut: True)
+    max_iterations        Plafond de popups par marchand (défaut: 50)
+    ready_timeout, cookie_timeout, cookie_hidden_timeout, first_tab_timeout,
+    next_tab_timeout, popup_timeout, close_timeout, close_hidden_timeout (ms)
+"""
+
+from affiliate_capture import AffiliateCapture
+from consent_state import accept_consent
+from dom_extract import close_popup, popup_state
+from politeness import polite_click, polite_goto
+from records import ScrapeFailed
+from selector_cascade import resolve
+from tab_manager import TabManager
+from waits import wait_hidden, wait_visible
+from xhr_capture import card_titles, start_capture
+
+CARD_SELECTOR = "div[data-testid='vouchers-ui-voucher-card']"
+CARD_DESCRIPTION_SELECTOR = "div[data-testid='vouchers-ui-voucher-card-description']"
+CLOSE_ICON_SELECTOR = "span[data-testid='CloseIcon']"
+
+# Conteneurs exclus: offres expirées et offres de marchands similaires
+EXPIRED_CLASS = "jkau50"
+SIMILAR_CLASS = "_1hla7140"
+
+
+def button_xpath(title: str = None, exclude: tuple = (EXPIRED_CLASS, SIMILAR_CLASS), condition: str = None) -> str:
+    """
+    XPath des boutons de code (div[role=button]) hors des conteneurs exclus.
+
+    Args:
+        title: Attribut title exact du bouton (ex: "See code")
+        exclude: Classes des conteneurs ancêtres à exclure
+        condition: Prédicat XPath supplémentaire sur le bouton
+    """
+    xpath = "xpath=//div[@role='button']"
+    if title:
+        xpath += f"[@title='{title}']"
+    if condition:
+        xpath += f"[{condition}]"
+    for css_class in exclude:
+        xpath += f"[not(ancestor::div[contains(@class, '{css_class}')])]"
+    return xpath
+
+
+def find_buttons(page, selectors: list, cascade: str = None):
+    """
+    Premier sélecteur qui trouve des boutons: (locator, count), count = 0 si aucun.
+
+    Args:
+        cascade: Nom de cascade adaptative (ordre appris par domaine), None = ordre fixe
+    """
+    if cascade:
+        return resolve(page, cascade, selectors)[:2]
+    buttons, count = None, 0
+    for selector in selectors:
+        buttons = page.locator(selector)
+        count = buttons.count()
+        if count:
+            break
+    return buttons, count
+
+
+def _popup_title(state: dict, site: dict, titles: list, iteration: int):
+    """Titre de la popup, sinon titre de la carte ou titre par défaut selon le site."""
+    title = state["title"]
+    if not title and site.get("card_title_fallback") and iteration < len(titles):
+        title = titles[iteration]
+    if not title and site.get("title_placeholder"):
+        title = site["title_placeholder"].format(n=iteration + 1)
+    return title
+
+
+def scrape_vouchers_ui(page, context, url, site: dict):
+    """
+    Scrape tous les codes d'une page d'un site vouchers-ui.
+
+    Returns:
+        (liste de {"code", "title", "affiliate_link"}, lien affilié)
+    """
+    tag = site["tag"]
+    popup_selector = site["popup_code_selector"]
+    click_js = site.get("click_js", False)
+    results = []
+    affiliate_link = None
+    affiliate = AffiliateCapture(page, site["competitor"])
+    tabs = TabManager(context, page)
+    # Écoute des réponses JSON (liste des offres, payload des popups) de cette page et de ses onglets
+    capture = start_capture(context, url, page)
+
+    try:
+        polite_goto(page, url, wait_until="domcontentloaded", timeout=30000)
+        wait_visible(page, site["ready_selector"], timeout=site.get("ready_timeout", 4000), name="page_ready")
+
+        accept_consent(page, site["cookie_buttons"], timeout=site.get("cookie_timeout", 3000),
+                       hidden_timeout=site.get("cookie_hidden_timeout", 1000))
+        if site.get("dismiss_selector"):
+            try:
+                page.click(site["dismiss_selector"], timeout=1000)
+            except:
+                pass
+
+        adaptive = site.get("adaptive_buttons", False)
+        buttons, count = find_buttons(page, site["buttons"], "buttons" if adaptive else None)
+        if count == 0:
+            print(f"{tag} Aucun code disponible sur cette page")
+            return results, affiliate_link
+        print(f"{tag} {count} boutons de code trouvés")
+
+        # Titres des cartes valides (avant le clic: la page d'origine part ensuite chez le marchand)
+        titles = card_titles(buttons, site.get("card_title_selector", "h3"))
+        if titles and titles[0]:
+            print(f"{tag} Clic sur le premier code: {titles[0][:50]}...")
+
+        # === Premier clic -> nouvel onglet avec la popup ===
+        first_btn = buttons.first
+        first_btn.scroll_into_view_if_needed()
+        work_page = tabs.open(lambda: polite_click(page, first_btn, js=click_js),
+                              timeout=site.get("first_tab_timeout", 30000))
+        if work_page is None:
+            if site.get("first_tab_required", True):
+                print(f"{tag} Aucun nouvel onglet ouvert")
+                return results, affiliate_link
+            work_page = page
+
+        # === Lien affilié: la page d'origine se redirige vers le marchand ===
+        affiliate_link = affiliate.wait(timeout=5000)
+        if affiliate_link:
+            print(f"{tag} 🔗 Affiliate captured: {affiliate_link[:60]}...")
+        else:
+            print(f"{tag} ⚠️ No affiliate link captured (page stayed on {site['competitor']})")
+
+        # === Codes reçus en JSON: toutes les cartes couvertes -> pas de boucle d'onglets ===
+        captured = capture.vouchers_for(titles)
+        if captured:
+            print(f"{tag} 📡 {len(captured)} codes lus dans les réponses JSON")
+            return [{**voucher, "affiliate_link": affiliate_link} for voucher in captured], affiliate_link
+
+        # === Boucle sur les popups: un onglet par code ===
+        processed_codes = set()
+        processed_titles = set()
+        dedupe_titles = site.get("dedupe_titles", True)
+        next_selectors = site.get("next_buttons", site["buttons"])
+
+        for iteration in range(min(count + 5, site.get("max_iterations", 50))):
+            wait_visible(work_page, popup_selector, timeout=site.get("popup_timeout", 4000), name="popup_code")
+
+            # Code, titre et bouton de fermeture de la popup (un seul evaluate)
+            state = popup_state(work_page, site["popup_spec"])
+            code = state["code"]
+            title = _popup_title(state, site, titles, iteration)
+
+            # N'ajouter que si code ET titre sont trouvés, sans doublon
+            if code and title and code not in processed_codes and not (dedupe_titles and title in processed_titles):
+                processed_codes.add(code)
+                processed_titles.add(title)
+                results.append({"code": code, "title": title, "affiliate_link": affiliate_link})
+                print(f"{tag} ✅ Code: {code} -> {title[:40]}...")
+            else:
+                print(f"{tag} ⚠️ Code ou titre non trouvé, ou doublon")
+
+            if close_popup(work_page, state, timeout=site.get("close_timeout", 3000)):
+                wait_hidden(work_page, popup_selector, timeout=site.get("close_hidden_timeout", 1000),
+                            name="popup_close")
+
+            # Bouton suivant: index = nombre de boutons déjà cliqués
+            next_index = iteration + 1
+            next_buttons, next_count = find_buttons(work_page, next_selectors, "next_buttons" if adaptive else None)
+            if next_index >= next_count:
+                print(f"{tag} Plus de boutons disponibles")
+                break
+
+            next_btn = next_buttons.nth(next_index)
+            try:
+                next_btn.scroll_into_view_if_needed()
+                # Nouvel onglet pour le code suivant (l'ancien onglet est fermé)
+                next_page = tabs.open(lambda: polite_click(work_page, next_btn, js=click_js),
+                                      timeout=site.get("next_tab_timeout", 30000), replace=work_page)
+            except Exception as e:
+                print(f"{tag} Erreur clic suivant: {str(e)[:30]}")
+                break
+
+            if next_page is not None:
+                work_page = next_page
+            elif site.get("next_tab_required", True):
+                print(f"{tag} Aucun nouvel onglet ouvert")
+                break
+
+        print(f"{tag} Total: {len(results)} codes récupérés")
+
+    except Exception as e:
+        raise ScrapeFailed(e, results, affiliate_link or affiliate.link) from e
+    finally:
+        capture.stop()
+        affiliate.stop()
+        tabs.close()
+
+    return results, affiliate_link or affiliate.link
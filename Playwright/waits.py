@@ -0,0 +1,226 @@
+"""
+Attentes événementielles pour les scrapers (remplacent les wait_for_timeout fixes).
+
+Chaque helper attend la condition réelle (sélecteur visible, popup fermée, nouvel onglet,
+changement d'URL, contenu chargé...) avec un timeout, puis rend la main dès qu'elle est
+remplie. Aucun helper ne lève d'exception: ils retournent False / None au timeout, comme
+l'ancienne attente fixe suivie d'une vérification.
+
+La durée de chaque attente est enregistrée par nom (get_wait_stats) et résumée en fin de
+source par scraper_runner.
+"""
+
+import os
+import threading
+import time
+
+# Multiplicateur des timeouts (machines lentes: WAIT_TIMEOUT_SCALE=2)
+WAIT_TIMEOUT_SCALE = float(os.environ.get("WAIT_TIMEOUT_SCALE", "1"))
+
+_COUNT_JS = """
+([selector, previous]) => {
+    const count = selector.startsWith('xpath=')
+        ? document.evaluate(selector.slice(6), document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength
+        : document.querySelectorAll(selector).length;
+    return count > previous;
+}
+"""
+
+_TEXT_CHANGED_JS = """
+([selector, previous]) => {
+    const el = document.querySelector(selector);
+    const text = el ? el.innerText.trim() : '';
+    return text !== '' && text !== previous;
+}
+"""
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def scaled_timeout(timeout_ms: int) -> int:
+    return int(timeout_ms * WAIT_TIMEOUT_SCALE)
+
+
+def record_wait(name: str, started: float, ok: bool):
+    elapsed = time.monotonic() - started
+    with _stats_lock:
+        entry = _stats.setdefault(name, {"count": 0, "timeouts": 0, "seconds": 0.0, "max_seconds": 0.0})
+        entry["count"] += 1
+        entry["timeouts"] += 0 if ok else 1
+        entry["seconds"] += elapsed
+        entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+
+def get_wait_stats(reset: bool = False) -> dict:
+    """Durées des attentes du process par nom: {nom: {count, timeouts, seconds, max_seconds}}."""
+    with _stats_lock:
+        stats = {name: dict(entry) for name, entry in _stats.items()}
+        if reset:
+            _stats.clear()
+    return stats
+
+
+def format_wait_stats(stats: dict) -> str:
+    """Résumé pour les logs, attentes les plus coûteuses d'abord."""
+    parts = [
+        f"{name} {entry['count']}x moy {entry['seconds'] / entry['count']:.2f}s"
+        + (f" ({entry['timeouts']} timeouts)" if entry["timeouts"] else "")
+        for name, entry in sorted(stats.items(), key=lambda item: -item[1]["seconds"])
+    ]
+    return "⏱️ Attentes: " + (", ".join(parts) if parts else "aucune")
+
+
+# ===================================================================
+# HELPERS SYNC
+# ===================================================================
+
+def wait_until(page, js: str, arg=None, timeout: int = 5000, name: str = "condition") -> bool:
+    """Attend qu'une condition JS soit vraie dans la page. Retourne False au timeout."""
+    started = time.monotonic()
+    try:
+        page.wait_for_function(js, arg=arg, timeout=scaled_timeout(timeout))
+        ok = True
+    except Exception:
+        ok = False
+    record_wait(name, started, ok)
+    return ok
+
+
+def wait_state(page, selector: str, state: str, timeout: int = 5000, name: str = None) -> bool:
+    """Attend que le premier élément du sélecteur (tout sélecteur Playwright) soit dans l'état `state`."""
+    started = time.monotonic()
+    try:
+        page.locator(selector).first.wait_for(state=state, timeout=scaled_timeout(timeout))
+        ok = True
+    except Exception:
+        ok = False
+    record_wait(name or state, started, ok)
+    return ok
+
+
+def wait_visible(page, selector: str, timeout: int = 5000, name: str = "visible") -> bool:
+    """Attend qu'un élément soit visible (popup du code, boutons de la page)."""
+    return wait_state(page, selector, "visible", timeout, name)
+
+
+def wait_hidden(page, selector: str, timeout: int = 2000, name: str = "hidden") -> bool:
+    """Attend qu'un élément soit masqué ou retiré (popup ou bannière fermée)."""
+    return wait_state(page, selector, "hidden", timeout, name)
+
+
+def wait_count_above(page, selector: str, previous: int, timeout: int = 3000, name: str = "count") -> bool:
+    """Attend que le sélecteur compte plus de `previous` éléments (ex: après "Show more")."""
+    return wait_until(page, _COUNT_JS, [selector, previous], timeout, name)
+
+
+def wait_text_change(page, selector: str, previous: str, timeout: int = 3000, name: str = "text_change") -> bool:
+    """Attend que le texte du premier élément (CSS) soit non vide et différent de `previous`."""
+    return wait_until(page, _TEXT_CHANGED_JS, [selector, previous or ""], timeout, name)
+
+
+def wait_scroll_growth(page, previous_height: int, timeout: int = 1500, name: str = "scroll") -> bool:
+    """Attend que la page s'allonge après un scroll (chargement infini)."""
+    return wait_until(page, "(h) => document.body.scrollHeight > h", previous_height, timeout, name)
+
+
+def wait_new_page(context, pages_before: int, timeout: int = 3000, name: str = "new_page"):
+    """
+    Attend l'ouverture d'un onglet après un clic.
+
+    Returns:
+        Le nouvel onglet (chargé jusqu'à domcontentloaded), ou None
+    """
+    started = time.monotonic()
+    new_page = None
+    try:
+        if len(context.pages) > pages_before:
+            new_page = context.pages[-1]
+        else:
+            new_page = context.wait_for_event("page", timeout=scaled_timeout(timeout))
+        new_page.wait_for_load_state("domcontentloaded", timeout=scaled_timeout(timeout))
+    except Exception:
+        pass
+    record_wait(name, started, new_page is not None)
+    return new_page
+
+
+def wait_url_change(page, exclude: str, timeout: int = 5000, name: str = "url_change"):
+    """
+    Attend que la page quitte le site (redirection d'affiliation): URL sans `exclude`
+    (comparaison insensible à la casse).
+
+    Returns:
+        L'URL atteinte (ne contenant plus `exclude`), ou None
+    """
+    started = time.monotonic()
+    url = None
+    try:
+        if exclude.lower() not in page.url.lower():
+            url = page.url
+        else:
+            page.wait_for_url(lambda current: exclude.lower() not in current.lower(), wait_until="commit",
+                              timeout=scaled_timeout(timeout))
+            url = page.url
+    except Exception:
+        pass
+    record_wait(name, started, url is not None)
+    return url
+
+
+# ===================================================================
+# HELPERS ASYNC (mêmes conditions, pour les scrapers async)
+# ===================================================================
+
+async def wait_until_async(page, js: str, arg=None, timeout: int = 5000, name: str = "condition") -> bool:
+    started = time.monotonic()
+    try:
+        await page.wait_for_function(js, arg=arg, timeout=scaled_timeout(timeout))
+        ok = True
+    except Exception:
+        ok = False
+    record_wait(name, started, ok)
+    return ok
+
+
+async def wait_state_async(page, selector: str, state: str, timeout: int = 5000, name: str = None) -> bool:
+    started = time.monotonic()
+    try:
+        await page.locator(selector).first.wait_for(state=state, timeout=scaled_timeout(timeout))
+        ok = True
+    except Exception:
+        ok = False
+    record_wait(name or state, started, ok)
+    return ok
+
+
+async def wait_visible_async(page, selector: str, timeout: int = 5000, name: str = "visible") -> bool:
+    return await wait_state_async(page, selector, "visible", timeout, name)
+
+
+async def wait_hidden_async(page, selector: str, timeout: int = 2000, name: str = "hidden") -> bool:
+    return await wait_state_async(page, selector, "hidden", timeout, name)
+
+
+async def wait_count_above_async(page, selector: str, previous: int, timeout: int = 3000, name: str = "count") -> bool:
+    return await wait_until_async(page, _COUNT_JS, [selector, previous], timeout, name)
+
+
+async def wait_scroll_growth_async(page, previous_height: int, timeout: int = 1500, name: str = "scroll") -> bool:
+    return await wait_until_async(page, "(h) => document.body.scrollHeight > h", previous_height, timeout, name)
+
+
+async def wait_url_change_async(page, exclude: str, timeout: int = 5000, name: str = "url_change"):
+    started = time.monotonic()
+    url = None
+    try:
+        if exclude.lower() not in page.url.lower():
+            url = page.url
+        else:
+            await page.wait_for_url(lambda current: exclude.lower() not in current.lower(), wait_until="commit",
+                                    timeout=scaled_timeout(timeout))
+            url = page.url
+    except Exception:
+        pass
+    record_wait(name, started, url is not None)
+    return url
@@ -0,0 +1,205 @@
+"""
+Capture des codes dans les réponses JSON (XHR / fetch) des sites Pepper et Cuponation.
+
+Ces sites ouvrent un onglet par code et affichent le code dans une popup; les données
+arrivent pourtant en JSON (liste des offres, payload de la popup). Un écouteur
+context.on("response") lit ces réponses pendant le chargement et le premier clic:
+- Seules les réponses des pages du marchand sont lues: sa page et les onglets qu'elle
+  ouvre (opener). Les autres onglets du contexte (pages préchargées, onglets restants
+  d'un marchand précédent) sont ignorés
+- Seules les réponses xhr/fetch JSON du domaine concurrent sont lues
+- Tout objet JSON avec un champ code (code, voucherCode, couponCode...) et un titre est retenu
+- Les codes ne sont utilisés que si CHAQUE carte valide de la page (hors expirées /
+  marchands similaires) a son titre dans la capture; sinon la boucle DOM prend le relais
+
+Usage dans un scraper:
+    capture = start_capture(context, url, page)  # avant polite_goto
+    titles = card_titles(buttons, "h3")          # titres des cartes valides, avant le 1er clic
+    ...
+    captured = capture.vouchers_for(titles)      # après le 1er clic: liste complète ou None
+    ...
+    capture.stop()                               # dans le finally du scraper
+"""
+
+import json
+import os
+import re
+import threading
+
+from politeness import get_domain
+
+# Désactivable pour le debug (XHR_CAPTURE_ENABLED=0)
+XHR_CAPTURE_ENABLED = os.environ.get("XHR_CAPTURE_ENABLED", "1") != "0"
+
+# Taille max d'une réponse JSON lue (les gros bundles ne contiennent pas d'offres)
+MAX_BODY_BYTES = 2_000_000
+
+CODE_KEYS = ("code", "vouchercode", "couponcode", "promocode", "voucher_code", "coupon_code", "discountcode")
+TITLE_KEYS = ("title", "name", "headline", "description")
+EXPIRED_KEYS = ("isexpired", "expired")
+
+# Titre de la carte de chaque bouton: premier ancêtre qui contient le sélecteur de titre
+_CARD_TITLES_JS = """
+(buttons, titleSelector) => buttons.map((btn) => {
+    for (let el = btn.parentElement; el; el = el.parentElement) {
+        const title = el.querySelector(titleSelector);
+        if (title) return title.innerText.trim();
+    }
+    return null;
+})
+"""
+
+
+def _normalize(title: str) -> str:
+    return re.sub(r"\s+", " ", title or "").strip().lower()
+
+
+def _valid_code(code: str) -> bool:
+    return 3 <= len(code) <= 30 and " " not in code
+
+
+def find_vouchers(node, found: list):
+    """Parcourt un JSON et ajoute les (code, titre) trouvés à `found` (offres expirées ignorées)."""
+    if isinstance(node, dict):
+        fields = {key.lower(): value for key, value in node.items() if isinstance(key, str)}
+        code = next((fields[key].strip() for key in CODE_KEYS if isinstance(fields.get(key), str)), None)
+        if code and _valid_code(code) and not any(fields.get(key) is True for key in EXPIRED_KEYS):
+            title = next((fields[key].strip() for key in TITLE_KEYS
+                          if isinstance(fields.get(key), str) and fields[key].strip()), None)
+            if title:
+                found.append((code, title))
+        for value in node.values():
+            find_vouchers(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            find_vouchers(value, found)
+
+
+class VoucherCapture:
+    """Codes lus dans les réponses JSON des pages d'un marchand (sa page et ses onglets)."""
+
+    def __init__(self, context, domain: str, page):
+        self.context = context
+        self.domain = domain
+        self.pages = [page]         # pages du marchand: la sienne, puis les onglets qu'elle ouvre
+        self.vouchers = {}          # titre normalisé -> {"code", "title"}, pour ce marchand uniquement
+        self.responses = 0
+        self._lock = threading.Lock()
+
+    def _owns(self, page) -> bool:
+        """True si la page est celle du marchand ou un onglet ouvert depuis l'une de ses pages."""
+        with self._lock:
+            if any(page is owned for owned in self.pages):
+                return True
+        try:
+            opener = page.opener()
+        except Exception:
+            return False
+        if opener is None or not self._owns(opener):
+            return False
+        with self._lock:
+            self.pages.append(page)
+        return True
+
+    def handle_page(self, page):
+        """Nouvel onglet du contexte: adopté à sa création si une page du marchand l'a ouvert
+        (l'opener est encore ouvert à ce moment-là, il peut être fermé ensuite)."""
+        try:
+            self._owns(page)
+        except Exception:
+            pass
+
+    def _wanted(self, response) -> bool:
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return False
+        try:
+            if not self._owns(response.frame.page):
+                return False
+        except Exception:
+            return False
+        host = get_domain(response.url)
+        if host != self.domain and not host.endswith("." + self.domain):
+            return False
+        headers = response.headers
+        if "json" not in headers.get("content-type", ""):
+            return False
+        return int(headers.get("content-length") or 0) <= MAX_BODY_BYTES
+
+    def _add(self, body: bytes):
+        found = []
+        find_vouchers(json.loads(body), found)
+        with self._lock:
+            self.responses += 1
+            for code, title in found:
+                self.vouchers.setdefault(_normalize(title), {"code": code, "title": re.sub(r"\s+", " ", title)})
+
+    def handle(self, response):
+        try:
+            if self._wanted(response):
+                self._add(response.body())
+        except Exception:
+            pass
+
+    def vouchers_for(self, titles: list):
+        """
+        Codes des cartes `titles` (dans leur ordre), uniquement si toutes sont couvertes.
+
+        Returns:
+            Liste [{"code", "title"}], ou None (capture incomplète: boucle DOM)
+        """
+        if not titles or any(not title for title in titles):
+            return None
+        with self._lock:
+            matched = [self.vouchers.get(_normalize(title)) for title in titles]
+        if any(voucher is None for voucher in matched):
+            return None
+
+        results = []
+        seen = set()
+        for voucher in matched:
+            if voucher["code"] not in seen:
+                seen.add(voucher["code"])
+                results.append(dict(voucher))
+        return results
+
+    def stop(self):
+        """Retire l'écouteur du contexte (réutilisé pour le marchand suivant) et oublie ses codes."""
+        for event, listener in (("response", self.handle), ("page", self.handle_page)):
+            try:
+                self.context.remove_listener(event, listener)
+            except Exception:
+                pass
+        with self._lock:
+            self.vouchers.clear()
+            self.pages.clear()
+
+
+class _NoCapture:
+    """Capture désactivée: même interface, ne trouve jamais rien."""
+
+    def vouchers_for(self, titles):
+        return None
+
+    def stop(self):
+        pass
+
+
+def start_capture(context, url: str, page):
+    """
+    Installe l'écouteur de réponses sur le contexte, limité à `page` (page du marchand)
+    et aux onglets ouverts depuis elle par les clics.
+    """
+    if not XHR_CAPTURE_ENABLED:
+        return _NoCapture()
+    capture = VoucherCapture(context, get_domain(url), page)
+    context.on("page", capture.handle_page)
+    context.on("response", capture.handle)
+    return capture
+
+
+def card_titles(buttons, title_selector: str = "h3") -> list:
+    """Titres des cartes de chaque bouton d'un locator, en un seul aller-retour ([] en cas d'erreur)."""
+    try:
+        return buttons.evaluate_all(_CARD_TITLES_JS, title_selector)
+    except Exception:
+        return []